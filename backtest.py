@@ -1,52 +1,155 @@
 import argparse
+import time
 import pandas as pd
-from utils.data_loader import load_data
+from utils.data_loader import load_data, iter_data
 from backtester.backtest_engine import BacktestEngine
+from backtester.result_cache import ResultCache, data_fingerprint
+from backtester.execution import load_depth_model
+from backtester.client import BacktestClient
 from strategy.signal import SignalGenerator
+from strategy.indicator_kernel import check_kernel
+from utils.intervals import INTERVAL_MINUTES
+from utils.profiler import stage, staged, profiling, add_profile_arguments
 from config.logging_config import setup_logging, get_logger
 from config.settings import (
-    TARGET_COIN, RSI_OVERSOLD, 
+    TARGET_COIN, RSI_OVERSOLD, TICKER_INTERVAL, BACKTEST_SERVER_SOCKET,
     STOP_LOSS_PCT, TAKE_PROFIT_PCT, MAX_HOLD_DAYS
 )
 
 setup_logging()
 logger = get_logger("Backtester")
 
-def fetch_data(market, days):
-    logger.info(f"Loading {days} days of data for {market}...")
-    df = load_data(market, days)
+def fetch_data(market, days, interval=TICKER_INTERVAL):
+    logger.info(f"Loading {days} days of {interval} data for {market}...")
+    with stage("load"):
+        df = load_data(market, days, interval=interval)
     if df is None or df.empty:
         logger.error("No data loaded. Did you run 'python collect_data.py'?")
         return None
     logger.info(f"Loaded {len(df)} rows.")
     return df
 
+def run_kernel_check(args):
+    """Compare the fused indicator kernel with the pandas indicators on the market's data"""
+    df = fetch_data(args.market, args.days, args.interval)
+    if df is None:
+        return False
+    report = check_kernel(SignalGenerator(rsi_oversold=args.rsi),
+                          *(df[c].to_numpy(dtype='float64') for c in ('high', 'low', 'close', 'volume')))
+    print(f"\nIndicator kernel vs pandas ({args.market}, {len(df)} {args.interval} bars)")
+    for name, (deviation, ok) in report.items():
+        print(f"{name:<12} {deviation:10.2e}  {'ok' if ok else 'FAIL'}")
+    return all(ok for _, ok in report.values())
+
 def run_backtest(args):
-    df = fetch_data(args.market, args.days)
+    if args.check_kernel:
+        if not run_kernel_check(args):
+            raise SystemExit(1)
+        return
+    if args.server:
+        return run_remote_backtest(args)
+    if args.stream:
+        return run_stream_backtest(args)
+
+    df = fetch_data(args.market, args.days, args.interval)
     if df is None:
         return
 
     logger.info(f"Running Backtest: RSI<{args.rsi}")
     
     signal_gen = SignalGenerator(rsi_oversold=args.rsi)
+    execution = execution_model(args, df['datetime'].iloc[0], df['datetime'].iloc[-1])
     engine = BacktestEngine(
         df, 
-        signal_generator=signal_gen
+        signal_generator=signal_gen,
+        bar_interval=args.interval,
+        execution=execution
     )
     
-    result = engine.run()
+    cached = False
+    if args.no_cache:
+        result = engine.run()
+    else:
+        with stage("fingerprint"):
+            fingerprint = data_fingerprint(df)
+        result, cached = ResultCache().get_or_run(engine, fingerprint, market=args.market)
     
+    with stage("report"):
+        print_results(args, result)
+        report_execution(execution)
+        
+        if cached:
+            # Only the summary is cached; trade details need a fresh run
+            logger.info("Loaded from result cache. Use --no-cache to regenerate trade details.")
+        else:
+            engine.save_results(filename=f"backtest_details_{args.market}.csv")
+
+def run_remote_backtest(args):
+    """
+    Client mode: the run goes to the resident backtest server (backtest_server.py),
+    which already holds the candles and indicators in memory.
+    """
+    if args.stream:
+        logger.warning("--stream is ignored in --server mode (the server keeps the data in memory)")
+    started = time.perf_counter()
+    with BacktestClient(args.server) as client:
+        result = client.backtest(args.market, days=args.days, interval=args.interval, rsi=args.rsi,
+                                 depth=args.depth, no_cache=args.no_cache, details=True)
+    logger.info(f"Server run: {client.last_elapsed_ms:.1f} ms on the server, "
+                f"{(time.perf_counter() - started) * 1000:.1f} ms round trip")
+    print_results(args, result)
+    if result['cached']:
+        logger.info("Loaded from result cache. Use --no-cache to regenerate trade details.")
+    elif result['trades']:
+        details = f"backtest_details_{args.market}.csv"
+        pd.DataFrame(result['trades']).to_csv(details, index=False)
+        logger.info(f"Backtest results saved to {details}")
+    else:
+        logger.info("No trades executed.")
+
+def run_stream_backtest(args):
+    """
+    Chunked run for long histories: candles are read partition by partition and
+    trades are written as they happen. Not cached (the data is never fingerprinted as a whole).
+    """
+    logger.info(f"Streaming {args.days} days of data for {args.market} (RSI<{args.rsi})...")
+    execution = execution_model(args)
+    engine = BacktestEngine(None, signal_generator=SignalGenerator(rsi_oversold=args.rsi), bar_interval=args.interval,
+                            execution=execution)
+    chunks = staged("load", iter_data(args.market, args.days, interval=args.interval, chunk_rows=args.chunk_rows))
+    details = f"backtest_details_{args.market}.csv"
+    result = engine.run_stream(chunks, trade_log=details)
+    print_results(args, result)
+    report_execution(execution)
+    if len(result['trades']):
+        logger.info(f"Backtest results saved to {details}")
+
+def execution_model(args, start=None, end=None):
+    """Depth-aware fills from stored order books with --depth, else None (flat SLIPPAGE_RATE)"""
+    if not args.depth:
+        return None
+    with stage("load"):
+        model = load_depth_model(args.market, start, end)
+    if model is None:
+        logger.warning(f"No order book snapshots for {args.market}. Using flat slippage. Collect with 'python collect_data.py --mode orderbook'.")
+    return model
+
+def report_execution(model):
+    if model is not None and model.book_fills + model.fallback_fills:
+        logger.info(f"Fills priced from order book depth: {model.book_fills}, flat slippage (no snapshot nearby): {model.fallback_fills}")
+
+def print_results(args, result):
     print("\n" + "="*40)
     print(f" BACKTEST RESULTS ({args.market})")
     print("="*40)
-    print(f"Period: {args.days} days")
+    print(f"Period: {args.days} days ({args.interval} bars)")
     print(f"Initial Balance: {result['initial_balance']:,.0f} KRW")
     print(f"Final Balance:   {result['final_balance']:,.0f} KRW")
     print(f"Return:          {result['return_pct']:.2f}%")
     print(f"Total Trades:    {result['total_trades']}")
+    print(f"Max Drawdown:    {result['metrics']['max_drawdown_pct']:.2f}%")
+    print(f"Sharpe:          {result['metrics']['sharpe']:.2f}")
     print("-" * 40)
-    
-    engine.save_results(filename=f"backtest_details_{args.market}.csv")
 
 def main():
     parser = argparse.ArgumentParser(description="Run a single backtest simulation.")
@@ -55,10 +158,19 @@ def main():
     parser.add_argument("--days", type=int, default=365, help="Days to backtest (default: 365)")
     
     parser.add_argument("--rsi", type=float, default=RSI_OVERSOLD, help=f"RSI Oversold Threshold (default: {RSI_OVERSOLD})")
+    parser.add_argument("--interval", type=str, default=TICKER_INTERVAL, choices=list(INTERVAL_MINUTES), help=f"Bar interval, loaded from the store's rollups (default: {TICKER_INTERVAL})")
+    parser.add_argument("--no-cache", action="store_true", help="Recompute even if a cached result exists")
+    parser.add_argument("--depth", action="store_true", help="Price fills from stored order book depth instead of flat SLIPPAGE_RATE")
+    parser.add_argument("--stream", action="store_true", help="Process the data in chunks (for long minute-level histories)")
+    parser.add_argument("--chunk-rows", type=int, default=None, help="Max candles per chunk in --stream mode (default: one monthly partition)")
+    parser.add_argument("--check-kernel", action="store_true", help="Check the fused indicator kernel against the pandas indicators on this data and exit")
+    parser.add_argument("--server", type=str, nargs="?", const=BACKTEST_SERVER_SOCKET, default=None, metavar="SOCKET", help=f"Run on the resident backtest server (default socket: {BACKTEST_SERVER_SOCKET})")
+    add_profile_arguments(parser)
     # Removed SL/TP/MaxHold args as they are now hardcoded in Strategy V2 settings or derived from ATR
     
     args = parser.parse_args()
-    run_backtest(args)
+    with profiling("backtest", args):
+        run_backtest(args)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,44 @@
+import argparse
+from backtester.server import BacktestServer
+from strategy.signal import SignalGenerator
+from utils.intervals import INTERVAL_MINUTES
+from config.logging_config import setup_logging, get_logger
+from config.settings import (
+    RSI_OVERSOLD, TICKER_INTERVAL, BACKTEST_SERVER_SOCKET, BACKTEST_SERVER_WORKERS, BACKTEST_SERVER_CACHE_ENTRIES
+)
+
+setup_logging()
+logger = get_logger("BacktestServer")
+
+def main():
+    parser = argparse.ArgumentParser(description="Resident backtest server: keeps candles and indicators in memory and runs backtest/optimize requests from a local socket.")
+    parser.add_argument("--socket", type=str, default=BACKTEST_SERVER_SOCKET, help=f"Unix socket path (default: {BACKTEST_SERVER_SOCKET})")
+    parser.add_argument("--workers", type=int, default=BACKTEST_SERVER_WORKERS, help=f"Runs executed concurrently (default: {BACKTEST_SERVER_WORKERS})")
+    parser.add_argument("--cache-entries", type=int, default=BACKTEST_SERVER_CACHE_ENTRIES, help=f"Candle / indicator frames kept in memory (default: {BACKTEST_SERVER_CACHE_ENTRIES})")
+    parser.add_argument("--preload", type=str, default=None, help="Comma-separated markets to load (with default indicators) before serving")
+    parser.add_argument("--days", type=int, default=365, help="Days of history for --preload (default: 365)")
+    parser.add_argument("--interval", type=str, default=TICKER_INTERVAL, choices=list(INTERVAL_MINUTES), help=f"Bar interval for --preload (default: {TICKER_INTERVAL})")
+    parser.add_argument("--no-result-cache", action="store_true", help="Do not consult or fill the SQLite result cache")
+    args = parser.parse_args()
+
+    server = BacktestServer(args.socket, workers=args.workers, cache_entries=args.cache_entries,
+                            use_result_cache=not args.no_result_cache)
+    if args.preload:
+        for market in [m.strip() for m in args.preload.split(",") if m.strip()]:
+            try:
+                server.cache.indicators(SignalGenerator(rsi_oversold=RSI_OVERSOLD), market, args.days, args.interval)
+                logger.info(f"Preloaded {market} ({args.days} days, {args.interval})")
+            except ValueError as e:
+                logger.warning(f"Could not preload {market}: {e}")
+
+    logger.info(f"Backtest server listening on {args.socket} ({args.workers} workers). Ctrl+C to stop.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        logger.info("Backtest server stopped")
+
+if __name__ == "__main__":
+    main()
@@ -1,206 +1,338 @@
+import numpy as np
 import pandas as pd
-from strategy.signal import SignalGenerator
-from config.settings import STOP_LOSS_PCT, TAKE_PROFIT_PCT, MAX_HOLD_DAYS, MIN_PROFIT_PCT, TRADE_FEE_RATE, SLIPPAGE_RATE, ATR_K, RISK_PER_TRADE_PCT, MAX_CONSECUTIVE_LOSSES, COOLDOWN_CANDLES
-import datetime
+from strategy.signal import SignalGenerator, ENTRY_RULES
+from backtester.ledger import TradeLedger, BUY, SELL
+from backtester.metrics import compute_metrics, MetricsAccumulator
+from backtester.execution import FlatSlippage
+from config import settings
+from config.settings import STOP_LOSS_PCT, TAKE_PROFIT_PCT, MAX_HOLD_DAYS, MIN_PROFIT_PCT, TRADE_FEE_RATE, SLIPPAGE_RATE, ATR_K, RISK_PER_TRADE_PCT, MAX_CONSECUTIVE_LOSSES, COOLDOWN_CANDLES, TICKER_INTERVAL
+from utils.intervals import interval_to_timedelta, bars_per_day
+from utils.profiler import stage
 import logging
+import os
 
 logger = logging.getLogger("BacktestEngine")
 
+# Settings that change simulation results; part of the result cache key
+STRATEGY_SETTINGS = (
+    'TRADE_FEE_RATE', 'SLIPPAGE_RATE', 'ATR_PERIOD', 'ATR_K', 'RISK_PER_TRADE_PCT',
+    'EMA_FAST', 'EMA_SLOW', 'BB_PERIOD', 'BB_STD', 'ATR_VOLATILITY_THRESHOLD',
+    'MAX_CONSECUTIVE_LOSSES', 'COOLDOWN_CANDLES', 'RSI_OVERBOUGHT'
+)
+
 class BacktestEngine:
+    # Bump whenever simulation logic changes so cached results are invalidated
+    VERSION = "2.2"
+
     def __init__(self, df, initial_capital=1000000, signal_generator=None, 
                  stop_loss_pct=STOP_LOSS_PCT, take_profit_pct=TAKE_PROFIT_PCT, 
-                 max_hold_days=MAX_HOLD_DAYS, min_profit_pct=MIN_PROFIT_PCT):
+                 max_hold_days=MAX_HOLD_DAYS, min_profit_pct=MIN_PROFIT_PCT, bar_interval=TICKER_INTERVAL,
+                 execution=None, indicators=None, entry_rule='trend'):
+        # Candles are read-only; indicators (signal_generator.indicator_frame(df))
+        # may be shared by any number of runs over the same candles
         self.df = df
+        self.indicators = indicators
         self.initial_capital = initial_capital
         self.balance = initial_capital
         self.signal_generator = signal_generator if signal_generator else SignalGenerator()
-        self.trades = []
+        self.trades = TradeLedger()
         self.position = None # { 'entry_price': float, 'quantity': float, 'entry_time': datetime }
+        self.equity_curve = None
+        self.in_position = None
+        # Cooldown State
+        self.consecutive_losses = 0
+        self.cooldown_until = None
         
         # Risk Management Params (Dynamic for optimization)
         self.stop_loss_pct = stop_loss_pct
         self.take_profit_pct = take_profit_pct
         self.max_hold_days = max_hold_days
         self.min_profit_pct = min_profit_pct
+
+        # Bar length of df: cooldown is COOLDOWN_CANDLES bars, Sharpe/Sortino annualize by bars per year
+        self.bar_interval = bar_interval
+        self.bar_length = interval_to_timedelta(bar_interval)
+        self.periods_per_year = 365 * bars_per_day(bar_interval)
+
+        # Fill price model (backtester/execution.py); fills happen at the candle close
+        self.execution = execution if execution is not None else FlatSlippage(SLIPPAGE_RATE)
+
+        # Entry signal (strategy.signal.ENTRY_RULES); exits are the ATR stops for every rule
+        if entry_rule not in ENTRY_RULES:
+            raise ValueError(f"Unknown entry rule '{entry_rule}' (expected one of {', '.join(ENTRY_RULES)})")
+        self.entry_rule = entry_rule
         
-        # Validation checks
-        if self.df is None or self.df.empty:
+        # Validation checks (df is None for streaming runs, see run_stream)
+        if self.df is not None and self.df.empty:
             logger.warning("Backtest initialized with empty dataframe")
 
+    def params(self):
+        """
+        Full parameter set of this run (engine, signal generator and strategy settings)
+        """
+        params = {
+            'initial_capital': self.initial_capital,
+            'stop_loss_pct': self.stop_loss_pct,
+            'take_profit_pct': self.take_profit_pct,
+            'max_hold_days': self.max_hold_days,
+            'min_profit_pct': self.min_profit_pct,
+            'bar_interval': self.bar_interval,
+            'execution': self.execution.name,
+            'entry_rule': self.entry_rule,
+            **self.signal_generator.params(),
+        }
+        for name in STRATEGY_SETTINGS:
+            params[name] = getattr(settings, name)
+        return params
+
     def run(self):
         """
         Run the backtest simulation (Strategy V2)
         """
-        # 1. Process Indicators
-        self.df = self.signal_generator.process(self.df)
-        
-        # State Variables
-        consecutive_losses = 0
-        cooldown_until = None
+        # 1. Process Indicators (into a new frame; self.df is left as it was)
+        with stage("indicators"):
+            df = self.signal_generator.process(self.df, self.indicators)
         
         # 2. Iterate through candles
-        for index, row in self.df.iterrows():
-            # Skip if indicators are NaN (start of data)
-            if pd.isna(row['rsi']) or pd.isna(row['atr']):
-                continue
-                
-            current_price = row['close']
-            current_time = row['datetime']
-            
-            # --- Sell Logic (Check existing position) ---
-            if self.position:
-                entry_price = self.position['entry_price']
-                entry_time = self.position['entry_time']
-                quantity = self.position['quantity']
-                atr_at_entry = self.position['atr']
-                highest_price = self.position['highest_price']
-                
-                # Update Highest Price for Trailing Stop
-                if current_price > highest_price:
-                    highest_price = current_price
-                    self.position['highest_price'] = highest_price
-
-                # Calculate Stops
-                # Note: atr_at_entry is fixed at entry.
-                # Stop Loss = Entry - (ATR * K)
-                # Trailing = Highest - (ATR * K)
-                
-                stop_loss_price = entry_price - (atr_at_entry * ATR_K)
-                trailing_stop_price = highest_price - (atr_at_entry * ATR_K)
-                
-                sell_reason = None
-                
-                # PnL Pct (for logging/analysis/min_profit checks if needed - V2 relies on ATR)
-                pnl_pct = (current_price - entry_price) / entry_price * 100
-                
-                # Check Exits
-                if current_price <= stop_loss_price:
-                    sell_reason = "Stop Loss"
-                elif current_price <= trailing_stop_price:
-                    sell_reason = "Trailing Stop"
-                
-                if sell_reason:
-                    # Execute Sell
-                    execution_price = current_price * (1 - SLIPPAGE_RATE)
-                    sell_amount = quantity * execution_price
-                    fee = sell_amount * TRADE_FEE_RATE
-                    self.balance += (sell_amount - fee)
-                    
-                    real_pnl_amount = (sell_amount - fee) - (quantity * entry_price) # Approx cost basis
-                    
-                    # Update Cooldown State
-                    if sell_reason == "Stop Loss":
-                        consecutive_losses += 1
-                        if consecutive_losses >= MAX_CONSECUTIVE_LOSSES:
-                             # Activate Cooldown
-                             # 5 Candles from NOW. 
-                             # Assuming row['datetime'] is hourly close or open? 
-                             # If hourly data, +5 hours.
-                             cooldown_until = current_time + datetime.timedelta(hours=COOLDOWN_CANDLES)
-                    else:
-                        consecutive_losses = 0
-
-                    self.trades.append({
-                        'type': 'sell',
-                        'time': current_time,
-                        'price': current_price,
-                        'execution_price': execution_price,
-                        'quantity': quantity,
-                        'reason': sell_reason,
-                        'pnl_pct': pnl_pct, 
-                        'real_pnl_amount': real_pnl_amount,
-                        'fee': fee,
-                        'slippage_cost': (current_price - execution_price) * quantity,
-                        'balance': self.balance
-                    })
-                    self.position = None
-                    continue 
-
-            # --- Buy Logic ---
-            if not self.position:
-                # Check Cooldown
-                if cooldown_until:
-                    if current_time < cooldown_until:
-                        continue # Skip
-                    else:
-                        cooldown_until = None
-                
-                # Use Trend Following Signal
-                if self.signal_generator.check_trend_following_buy_signal(row):
-                    # Use Prev ATR for sizing (Rule 3.2.2: ATR = ATR[t-1])
-                    # We added 'prev_atr' to DF in signal generator.
-                    atr = row.get('prev_atr', row['atr']) # Fallback to current if prev not found
-                    if pd.isna(atr) or atr == 0:
-                         continue
-
-                    # Position Sizing
-                    # Risk Amount = Capital * risk_pct
-                    # Size = Risk Amount / (ATR * K)
-                    
-                    capital = self.balance
-                    risk_amount = capital * (RISK_PER_TRADE_PCT / 100)
-                    stop_distance = atr * ATR_K
-                    
-                    if stop_distance == 0: continue
-                        
-                    target_qty = risk_amount / stop_distance
-                    
-                    # Ensure we don't buy more than we have cash for
-                    # Max Qty = (Capital * 0.999) / Price
-                    max_qty = (capital * 0.999) / (current_price * (1 + SLIPPAGE_RATE))
-                    quantity = min(target_qty, max_qty)
-                    
-                    # Min Value Check (e.g. 5000 KRW)
-                    if (quantity * current_price) < 5000:
-                        continue
-
-                    # Execute Buy
-                    execution_price = current_price * (1 + SLIPPAGE_RATE)
-                    cost = quantity * execution_price
-                    fee = cost * TRADE_FEE_RATE
-                    
-                    self.balance -= (cost + fee)
-                    
-                    self.position = {
-                        'entry_price': execution_price,
-                        'quantity': quantity,
-                        'entry_time': current_time,
-                        'atr': atr, # Store entry ATR for fixed stop distance
-                        'highest_price': execution_price
-                    }
-                    
-                    self.trades.append({
-                        'type': 'buy',
-                        'time': current_time,
-                        'price': current_price,
-                        'execution_price': execution_price,
-                        'quantity': quantity,
-                        'fee': fee,
-                        'slippage_cost': (execution_price - current_price) * quantity,
-                        'balance': self.balance
-                    })
+        with stage("simulate"):
+            self.equity_curve, self.in_position = self._simulate(df)
+            return self.result(df.iloc[-1]['close'] if len(df) else None)
 
+    def result(self, last_price):
+        """Result of a simulation whose equity_curve / in_position are filled (also used by backtester/ensemble.py)"""
         # End of Backtest: Force close position if open? 
         # Usually better to leave it open or mark as 'open' in report.
         # For simple PnL calc, we can value it at last price.
-        final_balance = self.balance
-        if self.position:
-            last_price = self.df.iloc[-1]['close']
-            quantity = self.position['quantity']
-            value = quantity * last_price
-            fee = value * TRADE_FEE_RATE
-            final_balance += (value - fee)
+        final_balance = self._final_balance(last_price)
             
+        metrics = compute_metrics(
+            self.equity_curve, self.in_position, self.trades, self.initial_capital,
+            final_balance=final_balance, periods_per_year=self.periods_per_year
+        )
         return {
             'initial_balance': self.initial_capital,
             'final_balance': final_balance,
-            'return_pct': (final_balance - self.initial_capital) / self.initial_capital * 100,
+            'return_pct': metrics['return_pct'],
             'trades': self.trades,
-            'total_trades': len([t for t in self.trades if t['type'] == 'sell'])
+            'equity_curve': self.equity_curve,
+            'metrics': metrics,
+            'total_trades': metrics['total_trades']
         }
 
+    def run_stream(self, chunks, trade_log=None):
+        """
+        Run the backtest over an iterable of OHLCV chunks (e.g. utils.data_loader.iter_data).
+        Indicator state, position and cooldown carry across chunks, so trades and
+        balances are identical to run() on the concatenated data, while only one
+        chunk is held in memory. The equity curve is not kept (metrics are
+        accumulated per chunk); trades are appended to the trade_log CSV as they happen.
+        """
+        state = self.signal_generator.indicator_state()
+        accumulator = MetricsAccumulator()
+        last_close = None
+        written = 0
+        if trade_log and os.path.exists(trade_log):
+            os.remove(trade_log)
+
+        for chunk in chunks:
+            if chunk.empty:
+                continue
+            with stage("indicators"):
+                chunk = self.signal_generator.process_chunk(chunk, state)
+            with stage("simulate"):
+                equity, in_position = self._simulate(chunk)
+                accumulator.update(equity, in_position, chunk['datetime'].to_numpy())
+            last_close = chunk.iloc[-1]['close']
+            if trade_log and len(self.trades) > written:
+                with stage("report"):
+                    self.trades.to_frame(start=written).to_csv(trade_log, mode='a', header=written == 0, index=False)
+                written = len(self.trades)
+
+        final_balance = self._final_balance(last_close)
+        metrics = accumulator.result(self.trades, self.initial_capital, final_balance,
+                                     periods_per_year=self.periods_per_year)
+        return {
+            'initial_balance': self.initial_capital,
+            'final_balance': final_balance,
+            'return_pct': metrics['return_pct'],
+            'trades': self.trades,
+            'equity_curve': None,
+            'metrics': metrics,
+            'total_trades': metrics['total_trades']
+        }
+
+    def _simulate(self, df):
+        """
+        Step through candles; returns the per-candle equity curve (cash + position marked at close).
+        Entry signals come from the vectorized mask. Candles with no open position and
+        no entry signal cannot change any state, so they are not stepped at all.
+        """
+        n = len(df)
+        equity_curve = np.empty(n)
+        in_position = np.zeros(n, dtype=bool)
+        close = df['close'].to_numpy(dtype=np.float64)
+        entries = self.signal_generator.entry_mask(df, self.entry_rule)
+
+        for i in range(n):
+            if not self.position and not entries[i]:
+                equity_curve[i] = self.balance
+                continue
+            self._step(df.iloc[i], entry=bool(entries[i]))
+            if self.position:
+                in_position[i] = True
+                equity_curve[i] = self.balance + self.position['quantity'] * close[i]
+            else:
+                equity_curve[i] = self.balance
+        return equity_curve, in_position
+
+    def _final_balance(self, last_price):
+        """Cash plus the open position (if any) sold at last_price after fees"""
+        final_balance = self.balance
+        if self.position and last_price is not None:
+            quantity = self.position['quantity']
+            value = quantity * last_price
+            fee = value * TRADE_FEE_RATE
+            final_balance += (value - fee)
+        return float(final_balance)
+
+    def _fill_time(self, candle_time):
+        """Fill time (candle close) as nanoseconds, the execution model's clock"""
+        return (candle_time + self.bar_length).value
+
+    def _step(self, row, entry=None):
+        """
+        Process a single candle: exits first, then entries.
+        entry: precomputed entry signal for this row (checked row-wise if None).
+        """
+        # Skip if indicators are NaN (start of data)
+        if pd.isna(row['rsi']) or pd.isna(row['atr']):
+            return
+            
+        current_price = row['close']
+        current_time = row['datetime']
+        
+        # --- Sell Logic (Check existing position) ---
+        if self.position:
+            entry_price = self.position['entry_price']
+            entry_time = self.position['entry_time']
+            quantity = self.position['quantity']
+            atr_at_entry = self.position['atr']
+            highest_price = self.position['highest_price']
+            
+            # Update Highest Price for Trailing Stop
+            if current_price > highest_price:
+                highest_price = current_price
+                self.position['highest_price'] = highest_price
+
+            # Calculate Stops
+            # Note: atr_at_entry is fixed at entry.
+            # Stop Loss = Entry - (ATR * K)
+            # Trailing = Highest - (ATR * K)
+            
+            stop_loss_price = entry_price - (atr_at_entry * ATR_K)
+            trailing_stop_price = highest_price - (atr_at_entry * ATR_K)
+            
+            sell_reason = None
+            
+            # PnL Pct (for logging/analysis/min_profit checks if needed - V2 relies on ATR)
+            pnl_pct = (current_price - entry_price) / entry_price * 100
+            
+            # Check Exits
+            if current_price <= stop_loss_price:
+                sell_reason = "Stop Loss"
+            elif current_price <= trailing_stop_price:
+                sell_reason = "Trailing Stop"
+            
+            if sell_reason:
+                # Execute Sell
+                execution_price = self.execution.sell_price(self._fill_time(current_time), current_price, quantity)
+                sell_amount = quantity * execution_price
+                fee = sell_amount * TRADE_FEE_RATE
+                self.balance += (sell_amount - fee)
+                
+                real_pnl_amount = (sell_amount - fee) - (quantity * entry_price) # Approx cost basis
+                
+                # Update Cooldown State
+                if sell_reason == "Stop Loss":
+                    self.consecutive_losses += 1
+                    if self.consecutive_losses >= MAX_CONSECUTIVE_LOSSES:
+                         # Activate Cooldown: COOLDOWN_CANDLES bars from now
+                         self.cooldown_until = current_time + COOLDOWN_CANDLES * self.bar_length
+                else:
+                    self.consecutive_losses = 0
+
+                self.trades.append(
+                    SELL, current_time, current_price, execution_price, quantity,
+                    fee, (current_price - execution_price) * quantity, self.balance,
+                    reason=sell_reason, pnl_pct=pnl_pct, real_pnl_amount=real_pnl_amount
+                )
+                self.position = None
+                return 
+
+        # --- Buy Logic ---
+        if not self.position:
+            # Check Cooldown
+            if self.cooldown_until:
+                if current_time < self.cooldown_until:
+                    return # Skip
+                else:
+                    self.cooldown_until = None
+            
+            # Use the entry rule's signal (Trend Following by default)
+            if entry is None:
+                entry = self.signal_generator.check_entry(row, self.entry_rule)
+            if entry:
+                # Use Prev ATR for sizing (Rule 3.2.2: ATR = ATR[t-1])
+                # We added 'prev_atr' to DF in signal generator.
+                atr = row.get('prev_atr', row['atr']) # Fallback to current if prev not found
+                if pd.isna(atr) or atr == 0:
+                     return
+
+                # Position Sizing
+                # Risk Amount = Capital * risk_pct
+                # Size = Risk Amount / (ATR * K)
+                
+                capital = self.balance
+                risk_amount = capital * (RISK_PER_TRADE_PCT / 100)
+                stop_distance = atr * ATR_K
+                
+                if stop_distance == 0: return
+                    
+                target_qty = risk_amount / stop_distance
+                
+                # Ensure we don't buy more than we have cash for
+                # Max Qty = (Capital * 0.999) / Price
+                max_qty = (capital * 0.999) / (current_price * (1 + SLIPPAGE_RATE))
+                quantity = min(target_qty, max_qty)
+                
+                # Min Value Check (e.g. 5000 KRW)
+                if (quantity * current_price) < 5000:
+                    return
+
+                # Execute Buy (a depth-aware fill can cost more than the sizing estimate above)
+                execution_price = self.execution.buy_price(self._fill_time(current_time), current_price, quantity)
+                if quantity * execution_price > capital * 0.999:
+                    quantity = (capital * 0.999) / execution_price
+                cost = quantity * execution_price
+                fee = cost * TRADE_FEE_RATE
+                
+                self.balance -= (cost + fee)
+                
+                self.position = {
+                    'entry_price': execution_price,
+                    'quantity': quantity,
+                    'entry_time': current_time,
+                    'atr': atr, # Store entry ATR for fixed stop distance
+                    'highest_price': execution_price
+                }
+                
+                self.trades.append(
+                    BUY, current_time, current_price, execution_price, quantity,
+                    fee, (execution_price - current_price) * quantity, self.balance
+                )
+
     def save_results(self, filename="backtest_results.csv"):
-        trades_df = pd.DataFrame(self.trades)
+        trades_df = self.trades.to_frame()
         if not trades_df.empty:
             trades_df.to_csv(filename, index=False)
             logger.info(f"Backtest results saved to {filename}")
@@ -0,0 +1,78 @@
+import json
+import socket
+from config.settings import BACKTEST_SERVER_SOCKET
+
+# Client of the resident backtest server (backtester/server.py). Only the
+# standard library is needed, so notebooks and scripts can import it without
+# paying for pandas on every call.
+# Protocol: one JSON object per line each way over a Unix socket,
+#   {"op": "backtest" | "optimize" | "stats" | "reload" | "shutdown", ...}
+#   -> {"ok": true, "result": ..., "elapsed_ms": ...} or {"ok": false, "error": "..."}
+
+class ServerError(Exception):
+    """The server received the request but could not run it"""
+
+class BacktestClient:
+    def __init__(self, socket_path=BACKTEST_SERVER_SOCKET, timeout=None):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._sock = None
+        self._reader = None
+
+    def _connect(self):
+        if self._sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.socket_path)
+            except (FileNotFoundError, ConnectionRefusedError) as e:
+                sock.close()
+                raise ConnectionError(f"No backtest server at {self.socket_path} (start it with 'python backtest_server.py')") from e
+            self._sock = sock
+            self._reader = sock.makefile('r', encoding='utf-8')
+        return self._sock
+
+    def request(self, op, **fields):
+        """Send one request on the (kept-open) connection; returns the response's result"""
+        sock = self._connect()
+        try:
+            sock.sendall((json.dumps({'op': op, **fields}) + "\n").encode('utf-8'))
+            line = self._reader.readline()
+        except OSError:
+            self.close()
+            raise
+        if not line:
+            self.close()
+            raise ConnectionError("Backtest server closed the connection")
+        response = json.loads(line)
+        if not response.get('ok'):
+            raise ServerError(response.get('error', 'unknown error'))
+        self.last_elapsed_ms = response.get('elapsed_ms')
+        return response.get('result')
+
+    def backtest(self, market, **params):
+        """
+        Summary of one backtest (as ResultCache stores it). Keyword fields:
+        days, interval, rsi, stop_loss_pct, take_profit_pct, max_hold_days,
+        depth, no_cache, details (also return the trade ledger as records).
+        """
+        return self.request('backtest', market=market, **params)
+
+    def optimize(self, market, mode='rsi', **params):
+        """Rows of an optimize.py grid (days, interval, rsi, depth, no_cache)"""
+        return self.request('optimize', market=market, mode=mode, **params)
+
+    def stats(self):
+        return self.request('stats')
+
+    def close(self):
+        if self._sock is not None:
+            self._reader.close()
+            self._sock.close()
+            self._sock = self._reader = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,165 @@
+import numpy as np
+from backtester.backtest_engine import BacktestEngine
+from strategy.signal import SignalGenerator, ENTRY_RULES
+from trade.snapshot import OHLCV_COLUMNS
+from utils.profiler import stage
+from config.logging_config import get_logger, log_event
+from config.settings import ENSEMBLE_STRATEGIES, TICKER_INTERVAL
+
+logger = get_logger("Ensemble")
+
+# Strategy definitions are dicts: 'name', 'entry' (a strategy.signal.ENTRY_RULES
+# key, default 'trend') and any SignalGenerator / BacktestEngine keyword below.
+SIGNAL_PARAMS = ('rsi_oversold', 'rsi_period', 'macd_fast', 'macd_slow', 'macd_signal')
+ENGINE_PARAMS = ('stop_loss_pct', 'take_profit_pct', 'max_hold_days', 'min_profit_pct')
+
+def _indicator_key(signal_gen):
+    return tuple(sorted(signal_gen.indicator_params().items()))
+
+def _forward_fill(values, first):
+    """NaNs replaced by the last value before them (`first` before any value)"""
+    idx = np.where(np.isnan(values), 0, np.arange(len(values)))
+    np.maximum.accumulate(idx, out=idx)
+    filled = values[idx]
+    filled[np.isnan(filled)] = first
+    return filled
+
+class StrategyEnsemble:
+    """
+    N strategy definitions evaluated over one indicator pass. Strategies are
+    grouped by indicator parameters; each group's indicator columns (and each
+    distinct entry mask) are computed once, and the candles are stepped once
+    for the whole group, every strategy keeping its own position book (a
+    BacktestEngine). Results equal separate BacktestEngine runs.
+    """
+    def __init__(self, definitions=ENSEMBLE_STRATEGIES, bar_interval=TICKER_INTERVAL, execution=None,
+                 initial_capital=1000000):
+        self.definitions = [dict(d) for d in definitions]
+        names = [d.get('name') for d in self.definitions]
+        if None in names or len(set(names)) != len(names):
+            raise ValueError("Every ensemble strategy needs a unique 'name'")
+        for d in self.definitions:
+            unknown = set(d) - {'name', 'entry', *SIGNAL_PARAMS, *ENGINE_PARAMS}
+            if unknown:
+                raise ValueError(f"Strategy '{d['name']}': unknown keys {', '.join(sorted(unknown))}")
+            if d.get('entry', 'trend') not in ENTRY_RULES:
+                raise ValueError(f"Strategy '{d['name']}': unknown entry rule '{d['entry']}'")
+        self.bar_interval = bar_interval
+        self.execution = execution
+        self.initial_capital = initial_capital
+        self.books = None # live shadow books, created by step_live()
+        self.last_time = None
+
+    @property
+    def names(self):
+        return [d['name'] for d in self.definitions]
+
+    def engine(self, definition, df=None, indicators=None):
+        """A standalone BacktestEngine for one definition (what run() is equivalent to)"""
+        return BacktestEngine(
+            df, initial_capital=self.initial_capital, bar_interval=self.bar_interval, execution=self.execution,
+            signal_generator=SignalGenerator(**{k: v for k, v in definition.items() if k in SIGNAL_PARAMS}),
+            entry_rule=definition.get('entry', 'trend'), indicators=indicators,
+            **{k: v for k, v in definition.items() if k in ENGINE_PARAMS}
+        )
+
+    def groups(self, engines):
+        """Engine indices per indicator parameter set"""
+        groups = {}
+        for j, engine in enumerate(engines):
+            groups.setdefault(_indicator_key(engine.signal_generator), []).append(j)
+        return groups
+
+    def run(self, df):
+        """Backtest every strategy over df; {name: result} in BacktestEngine.run() format"""
+        engines = [self.engine(d, df) for d in self.definitions]
+        last_price = df.iloc[-1]['close'] if len(df) else None
+        results = {}
+        for members in self.groups(engines).values():
+            group = [engines[j] for j in members]
+            with stage("indicators"):
+                frame = group[0].signal_generator.process(df)
+            with stage("simulate"):
+                self._simulate(frame, group)
+                for j, engine in zip(members, group):
+                    results[self.definitions[j]['name']] = engine.result(last_price)
+        return {name: results[name] for name in self.names}
+
+    def _simulate(self, frame, engines):
+        """
+        BacktestEngine._simulate() for several engines over one frame: each
+        candle's row is built once for all strategies that hold a position or
+        have an entry signal on it; the others skip the candle, as they would alone.
+        """
+        n = len(frame)
+        close = frame['close'].to_numpy(dtype=np.float64)
+        masks = {}
+        entries = np.empty((len(engines), n), dtype=bool)
+        for j, engine in enumerate(engines):
+            key = (engine.entry_rule, tuple(sorted(engine.signal_generator.params().items())))
+            if key not in masks:
+                masks[key] = engine.signal_generator.entry_mask(frame, engine.entry_rule)
+            entries[j] = masks[key]
+
+        entering = {}
+        for i, j in zip(*np.nonzero(entries.T)):
+            entering.setdefault(i, []).append(j)
+        equity = np.full((len(engines), n), np.nan)
+        in_position = np.zeros((len(engines), n), dtype=bool)
+        holding = set()
+        for i in range(n):
+            starting = entering.get(i)
+            if not holding and starting is None:
+                continue
+            row = frame.iloc[i]
+            for j in holding.union(starting or ()):
+                engine = engines[j]
+                engine._step(row, entry=bool(entries[j, i]))
+                if engine.position:
+                    holding.add(j)
+                    in_position[j, i] = True
+                    equity[j, i] = engine.balance + engine.position['quantity'] * close[i]
+                else:
+                    holding.discard(j)
+                    equity[j, i] = engine.balance
+
+        # A strategy that skipped a candle held no position, so its equity was its unchanged balance
+        for j, engine in enumerate(engines):
+            engine.equity_curve = _forward_fill(equity[j], self.initial_capital)
+            engine.in_position = in_position[j]
+
+    def step_live(self, candles, indicators=None, indicator_params=None, market=None):
+        """
+        Live shadow mode: step every strategy's virtual book on the newest candle
+        of a CandleBuffer (no orders are placed). indicators: arrays already
+        computed for this buffer with `indicator_params`, reused by the strategies
+        sharing them. A candle is only stepped once, however often the job runs.
+        """
+        if len(candles) == 0 or candles.last_timestamp() == self.last_time:
+            return
+        if self.books is None:
+            self.books = [self.engine(d) for d in self.definitions]
+        base = {column: candles.view(column)[-1] for column in OHLCV_COLUMNS}
+        base['datetime'] = self.last_time = candles.last_timestamp()
+
+        for key, members in self.groups(self.books).items():
+            if indicators is not None and key == tuple(sorted((indicator_params or {}).items())):
+                arrays = indicators
+            else:
+                arrays = self.books[members[0]].signal_generator.compute_indicators(
+                    candles.view('high'), candles.view('low'), candles.view('close'), candles.view('volume')
+                )
+            row = {name: values[-1] for name, values in arrays.items()}
+            row.update(base)
+            for j in members:
+                book = self.books[j]
+                trades = len(book.trades)
+                book._step(row)
+                equity = book.balance + (book.position['quantity'] * row['close'] if book.position else 0)
+                log_event(
+                    "shadow", market=market, time=row['datetime'], strategy=self.definitions[j]['name'],
+                    in_position=bool(book.position), equity=equity, trades=len(book.trades)
+                )
+                if len(book.trades) > trades:
+                    logger.info(f"[shadow {self.definitions[j]['name']}] {'BUY' if book.position else 'SELL'} "
+                                f"at {row['close']:,.0f} (equity {equity:,.0f})")
@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+from config.settings import SLIPPAGE_RATE, ORDERBOOK_MAX_AGE_SECONDS
+from utils.orderbook_store import load_orderbook
+
+# Execution models: fill price of a market order for `quantity` coins when the
+# candle price is `price`. `time` is the fill time as naive-KST nanoseconds.
+
+class FlatSlippage:
+    """Fixed slippage rate on every fill, regardless of size (the engine's default)"""
+    def __init__(self, rate=SLIPPAGE_RATE):
+        self.rate = rate
+        self.name = f"flat:{rate}"
+
+    def buy_price(self, time, price, quantity):
+        return price * (1 + self.rate)
+
+    def sell_price(self, time, price, quantity):
+        return price * (1 - self.rate)
+
+class DepthSlippage:
+    """
+    Fill price from the stored order book (utils/orderbook_store.load_orderbook)
+    nearest in time to the fill: the order walks the book level by level and
+    pays the volume-weighted price, relative to the snapshot's mid price. That
+    ratio is applied to the candle price, so spread and depth are priced in
+    but the snapshot's own price level is not. An order larger than the whole
+    book fills the rest at the deepest level's price. Fills with no snapshot
+    within `max_age` seconds fall back to `fallback`.
+    Cumulative size/value per level are precomputed, so each fill is two binary
+    searches.
+    """
+    def __init__(self, book, max_age=ORDERBOOK_MAX_AGE_SECONDS, fallback=None):
+        self.times = book['time'].astype(np.int64) * 1_000_000 # ms -> ns
+        self.max_age = int(max_age * 1e9)
+        self.fallback = fallback if fallback is not None else FlatSlippage()
+
+        best_ask = book['ask_price'][:, 0]
+        best_bid = book['bid_price'][:, 0]
+        self.mid = (best_ask + best_bid) / 2
+        self.asks = self._levels(book['ask_price'], book['ask_size'])
+        self.bids = self._levels(book['bid_price'], book['bid_size'])
+
+        self.book_fills = 0
+        self.fallback_fills = 0
+        first = int(book['time'][0]) if len(self.times) else 0
+        last = int(book['time'][-1]) if len(self.times) else 0
+        self.name = f"depth:{len(self.times)}:{first}:{last}:{max_age}:{self.fallback.name}"
+
+    @staticmethod
+    def _levels(prices, sizes):
+        sizes = sizes.astype(np.float64)
+        # Empty (padded) levels take the last real price so the deepest-level fallback stays valid
+        last_real = np.maximum.accumulate(np.where(sizes > 0, np.arange(sizes.shape[1]), 0), axis=1)
+        prices = np.take_along_axis(prices, last_real, axis=1)
+        return prices, np.cumsum(sizes, axis=1), np.cumsum(prices * sizes, axis=1)
+
+    def _nearest(self, time):
+        i = int(np.searchsorted(self.times, time))
+        candidates = [j for j in (i - 1, i) if 0 <= j < len(self.times)]
+        if not candidates:
+            return None
+        j = min(candidates, key=lambda k: abs(int(self.times[k]) - time))
+        if abs(int(self.times[j]) - time) > self.max_age or not self.mid[j] > 0:
+            return None
+        return j
+
+    @staticmethod
+    def _vwap(levels, i, quantity):
+        prices, cum_size, cum_value = levels[0][i], levels[1][i], levels[2][i]
+        k = int(np.searchsorted(cum_size, quantity))
+        filled_size = cum_size[k - 1] if k > 0 else 0.0
+        filled_value = cum_value[k - 1] if k > 0 else 0.0
+        level_price = prices[min(k, len(prices) - 1)]
+        return (filled_value + (quantity - filled_size) * level_price) / quantity
+
+    def _fill(self, time, price, quantity, levels, fallback):
+        i = self._nearest(time) if quantity > 0 else None
+        if i is None:
+            self.fallback_fills += 1
+            return fallback(time, price, quantity)
+        self.book_fills += 1
+        return price * self._vwap(levels, i, quantity) / self.mid[i]
+
+    def buy_price(self, time, price, quantity):
+        return self._fill(time, price, quantity, self.asks, self.fallback.buy_price)
+
+    def sell_price(self, time, price, quantity):
+        return self._fill(time, price, quantity, self.bids, self.fallback.sell_price)
+
+def load_depth_model(market, start=None, end=None, data_dir="data", max_age=ORDERBOOK_MAX_AGE_SECONDS):
+    """DepthSlippage over the stored snapshots around [start, end], or None if there are none"""
+    margin = pd.Timedelta(seconds=max_age)
+    book = load_orderbook(
+        market, data_dir,
+        start=pd.Timestamp(start) - margin if start is not None else None,
+        end=pd.Timestamp(end) + margin if end is not None else None,
+    )
+    if book is None or len(book['time']) == 0:
+        return None
+    return DepthSlippage(book, max_age=max_age)
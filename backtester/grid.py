@@ -0,0 +1,18 @@
+import itertools
+from config.settings import RSI_OVERSOLD, RSI_OPT_MIN, RSI_OPT_MAX, RSI_OPT_STEP
+
+# Optimization grids, shared by optimize.py, sweep.py, ensemble.py and the backtest server
+
+# PnL & MaxHold grid: 5 * 5 * 4 = 100 runs
+STOP_LOSS_RANGE = [1.0, 2.0, 3.0, 4.0, 5.0]
+TAKE_PROFIT_RANGE = [10.0, 20.0, 30.0, 40.0, 50.0]
+MAX_HOLD_RANGE = [3, 5, 7, 10]
+
+def grid_points(mode, rsi_val=RSI_OVERSOLD):
+    """Parameter sets of an optimization mode, as SignalGenerator/BacktestEngine keyword values"""
+    if mode == 'rsi':
+        return [{'rsi_oversold': rsi} for rsi in range(RSI_OPT_MIN, RSI_OPT_MAX, RSI_OPT_STEP)]
+    return [
+        {'rsi_oversold': rsi_val, 'stop_loss_pct': sl, 'take_profit_pct': tp, 'max_hold_days': mh}
+        for sl, tp, mh in itertools.product(STOP_LOSS_RANGE, TAKE_PROFIT_RANGE, MAX_HOLD_RANGE)
+    ]
@@ -0,0 +1,231 @@
+import os
+import json
+import time
+import socket
+import sqlite3
+import datetime
+from config.settings import JOB_LEASE_SECONDS, JOB_MAX_ATTEMPTS
+from config.logging_config import get_logger
+
+logger = get_logger("JobQueue")
+
+DEFAULT_DB_PATH = os.path.join("results", "sweeps.db")
+
+# A sweep is a named set of work units (one backtest each). Workers on any host
+# that can open the database claim units under a time-limited lease, renew it
+# while running and mark the unit done with its result summary. A unit whose
+# lease runs out (worker crashed or lost) is handed to the next claimer.
+# Every completed unit is committed immediately, so a sweep resumes where it
+# stopped by starting workers again.
+#
+# Unit status: pending -> leased -> done, or back to pending on a failure or an
+# expired lease, until JOB_MAX_ATTEMPTS attempts have been made (then failed).
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sweeps (
+    name TEXT PRIMARY KEY,
+    spec TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS units (
+    sweep TEXT NOT NULL,
+    unit INTEGER NOT NULL,
+    market TEXT NOT NULL,
+    fold INTEGER NOT NULL,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires REAL,
+    data_fingerprint TEXT,
+    result TEXT,
+    error TEXT,
+    updated_at TEXT,
+    PRIMARY KEY (sweep, unit)
+);
+CREATE INDEX IF NOT EXISTS idx_units_status ON units (sweep, status);
+"""
+
+def worker_id():
+    """Lease owner name of this process (host:pid)"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def _now():
+    return datetime.datetime.now().isoformat()
+
+class JobQueue:
+    """
+    SQLite-backed sweep queue. The database may live on a directory shared
+    between hosts as long as the filesystem supports SQLite's file locks;
+    leases compare wall clocks, so hosts need roughly synchronized time.
+    """
+    def __init__(self, db_path=DEFAULT_DB_PATH, lease_seconds=JOB_LEASE_SECONDS, max_attempts=JOB_MAX_ATTEMPTS):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        db_dir = os.path.dirname(db_path)
+        if db_dir and not os.path.exists(db_dir):
+            os.makedirs(db_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        # Autocommit mode; claims open their own IMMEDIATE transaction
+        return sqlite3.connect(self.db_path, timeout=60, isolation_level=None)
+
+    def create_sweep(self, name, spec, units):
+        """
+        Store a sweep and its units [(market, fold, params)]. Creating an
+        existing sweep with the same spec is a no-op (returns False); a
+        different spec under the same name is an error.
+        """
+        spec_json = json.dumps(spec, sort_keys=True)
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT spec FROM sweeps WHERE name = ?", (name,)).fetchone()
+            if row:
+                conn.execute("ROLLBACK")
+                if row[0] != spec_json:
+                    raise ValueError(f"Sweep '{name}' already exists with a different spec")
+                return False
+            conn.execute("INSERT INTO sweeps VALUES (?, ?, ?)", (name, spec_json, _now()))
+            conn.executemany(
+                "INSERT INTO units (sweep, unit, market, fold, params, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                [(name, i, market, fold, json.dumps(params, sort_keys=True), _now())
+                 for i, (market, fold, params) in enumerate(units)]
+            )
+            conn.execute("COMMIT")
+            return True
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def get_spec(self, name):
+        with self._connect() as conn:
+            row = conn.execute("SELECT spec FROM sweeps WHERE name = ?", (name,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def claim(self, sweep, owner):
+        """
+        Lease the next runnable unit (pending, or leased with an expired
+        lease) to `owner`. Returns {unit, market, fold, params, attempts} or None.
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE") # one claimer at a time, across processes and hosts
+            row = conn.execute(
+                "SELECT unit, market, fold, params, attempts, status FROM units "
+                "WHERE sweep = ? AND (status = 'pending' OR (status = 'leased' AND lease_expires < ?)) "
+                "ORDER BY unit LIMIT 1",
+                (sweep, now)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            unit, market, fold, params, attempts, status = row
+            if status == 'leased':
+                logger.warning(f"Unit {sweep}/{unit} lease expired (attempt {attempts}); re-leasing to {owner}")
+            if attempts >= self.max_attempts:
+                # The last attempt's worker died without reporting back
+                conn.execute(
+                    "UPDATE units SET status = 'failed', lease_owner = NULL, lease_expires = NULL, "
+                    "error = COALESCE(error, 'lease expired'), updated_at = ? WHERE sweep = ? AND unit = ?",
+                    (_now(), sweep, unit)
+                )
+                conn.execute("COMMIT")
+                return self.claim(sweep, owner)
+            conn.execute(
+                "UPDATE units SET status = 'leased', lease_owner = ?, lease_expires = ?, attempts = attempts + 1, "
+                "updated_at = ? WHERE sweep = ? AND unit = ?",
+                (owner, now + self.lease_seconds, _now(), sweep, unit)
+            )
+            conn.execute("COMMIT")
+            return {'unit': unit, 'market': market, 'fold': fold, 'params': json.loads(params), 'attempts': attempts + 1}
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def renew(self, sweep, unit, owner):
+        """Extend a held lease; False if it was lost (expired and taken over)"""
+        with self._connect() as conn:
+            cur = conn.execute(
+                "UPDATE units SET lease_expires = ? WHERE sweep = ? AND unit = ? AND status = 'leased' AND lease_owner = ?",
+                (time.time() + self.lease_seconds, sweep, unit, owner)
+            )
+        return cur.rowcount == 1
+
+    def complete(self, sweep, unit, owner, result, fingerprint=None):
+        """
+        Record a unit's result. Accepted from the lease holder, or from an
+        earlier holder if the unit has not been completed since (runs are
+        deterministic, so either result is the same). Returns True if stored.
+        """
+        with self._connect() as conn:
+            cur = conn.execute(
+                "UPDATE units SET status = 'done', result = ?, data_fingerprint = ?, error = NULL, "
+                "lease_owner = ?, lease_expires = NULL, updated_at = ? "
+                "WHERE sweep = ? AND unit = ? AND status != 'done'",
+                (json.dumps(result), fingerprint, owner, _now(), sweep, unit)
+            )
+        return cur.rowcount == 1
+
+    def fail(self, sweep, unit, owner, error):
+        """Release a unit after an error; it is retried until max_attempts, then marked failed"""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE units SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "error = ?, lease_owner = NULL, lease_expires = NULL, updated_at = ? "
+                "WHERE sweep = ? AND unit = ? AND status = 'leased' AND lease_owner = ?",
+                (self.max_attempts, str(error)[:2000], _now(), sweep, unit, owner)
+            )
+
+    def reset_failed(self, sweep):
+        """Give failed units a fresh set of attempts; returns how many"""
+        with self._connect() as conn:
+            cur = conn.execute(
+                "UPDATE units SET status = 'pending', attempts = 0, updated_at = ? WHERE sweep = ? AND status = 'failed'",
+                (_now(), sweep)
+            )
+        return cur.rowcount
+
+    def counts(self, sweep):
+        """{status: units}, with expired leases counted as 'expired'"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT CASE WHEN status = 'leased' AND lease_expires < ? THEN 'expired' ELSE status END, COUNT(*) "
+                "FROM units WHERE sweep = ? GROUP BY 1",
+                (time.time(), sweep)
+            ).fetchall()
+        return dict(rows)
+
+    def is_finished(self, sweep):
+        """True when no unit is pending or leased"""
+        counts = self.counts(sweep)
+        return not any(counts.get(status) for status in ('pending', 'leased', 'expired'))
+
+    def units(self, sweep, status=None):
+        """Units of a sweep as dicts (result/params decoded)"""
+        sql = ("SELECT unit, market, fold, params, status, attempts, lease_owner, lease_expires, "
+               "data_fingerprint, result, error, updated_at FROM units WHERE sweep = ?")
+        args = [sweep]
+        if status:
+            sql += " AND status = ?"
+            args.append(status)
+        with self._connect() as conn:
+            rows = conn.execute(sql + " ORDER BY unit", args).fetchall()
+        keys = ('unit', 'market', 'fold', 'params', 'status', 'attempts', 'lease_owner', 'lease_expires',
+                'data_fingerprint', 'result', 'error', 'updated_at')
+        units = []
+        for row in rows:
+            unit = dict(zip(keys, row))
+            unit['params'] = json.loads(unit['params'])
+            unit['result'] = json.loads(unit['result']) if unit['result'] else None
+            units.append(unit)
+        return units
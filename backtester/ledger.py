@@ -0,0 +1,139 @@
+import numpy as np
+import pandas as pd
+
+BUY = 1
+SELL = -1
+
+FLOAT_COLUMNS = (
+    'price', 'execution_price', 'quantity', 'fee', 'slippage_cost',
+    'balance', 'pnl_pct', 'real_pnl_amount'
+)
+
+class TradeLedger:
+    """
+    Columnar trade ledger backed by preallocated NumPy arrays.
+    Arrays grow by doubling, so appending stays amortized O(1) and
+    metrics can read whole columns without building per-trade dicts.
+    """
+    def __init__(self, capacity=256):
+        capacity = max(int(capacity), 1)
+        self._size = 0
+        self._side = np.zeros(capacity, dtype=np.int8)
+        self._time = np.empty(capacity, dtype='datetime64[ns]')
+        self._reason = np.zeros(capacity, dtype=np.int16)
+        self._floats = {name: np.full(capacity, np.nan) for name in FLOAT_COLUMNS}
+        # Reason strings are stored as codes; code 0 means "no reason" (buys)
+        self.reason_labels = ['']
+        self._reason_codes = {'': 0}
+
+    def __len__(self):
+        return self._size
+
+    def _grow(self):
+        capacity = len(self._side) * 2
+        self._side = np.resize(self._side, capacity)
+        self._time = np.resize(self._time, capacity)
+        self._reason = np.resize(self._reason, capacity)
+        for name, values in self._floats.items():
+            grown = np.full(capacity, np.nan)
+            grown[:self._size] = values[:self._size]
+            self._floats[name] = grown
+
+    def _reason_code(self, reason):
+        reason = reason or ''
+        code = self._reason_codes.get(reason)
+        if code is None:
+            code = len(self.reason_labels)
+            self.reason_labels.append(reason)
+            self._reason_codes[reason] = code
+        return code
+
+    def append(self, side, time, price, execution_price, quantity, fee, slippage_cost,
+               balance, reason=None, pnl_pct=np.nan, real_pnl_amount=np.nan):
+        if self._size == len(self._side):
+            self._grow()
+        i = self._size
+        self._side[i] = side
+        self._time[i] = np.datetime64(pd.Timestamp(time).to_datetime64(), 'ns')
+        self._reason[i] = self._reason_code(reason)
+        floats = self._floats
+        floats['price'][i] = price
+        floats['execution_price'][i] = execution_price
+        floats['quantity'][i] = quantity
+        floats['fee'][i] = fee
+        floats['slippage_cost'][i] = slippage_cost
+        floats['balance'][i] = balance
+        floats['pnl_pct'][i] = pnl_pct
+        floats['real_pnl_amount'][i] = real_pnl_amount
+        self._size += 1
+
+    # --- Column views (no copies) ---
+    @property
+    def side(self):
+        return self._side[:self._size]
+
+    @property
+    def time(self):
+        return self._time[:self._size]
+
+    @property
+    def reason_code(self):
+        return self._reason[:self._size]
+
+    def column(self, name):
+        return self._floats[name][:self._size]
+
+    def __getitem__(self, name):
+        if name == 'side':
+            return self.side
+        if name == 'time':
+            return self.time
+        return self.column(name)
+
+    @property
+    def buys(self):
+        return self.side == BUY
+
+    @property
+    def sells(self):
+        return self.side == SELL
+
+    def reason_mask(self, reason, prefix=False):
+        """
+        Boolean mask of rows whose reason equals `reason`
+        (or starts with it when prefix=True, e.g. "Stop Loss (-1.2%)")
+        """
+        if prefix:
+            codes = [c for c, label in enumerate(self.reason_labels) if label and label.startswith(reason)]
+        else:
+            codes = [self._reason_codes[reason]] if reason in self._reason_codes else []
+        return np.isin(self.reason_code, codes)
+
+    def reasons(self):
+        labels = np.array(self.reason_labels, dtype=object)
+        return labels[self.reason_code]
+
+    def to_frame(self, start=0):
+        """
+        Export to a DataFrame with the same columns as the legacy per-trade dicts.
+        Only meant for reporting (CSV export), not for the hot path.
+        start: first row to export (for incremental writes).
+        """
+        if self._size <= start:
+            return pd.DataFrame()
+        rows = slice(start, self._size)
+        sells = self.sells[rows]
+        df = pd.DataFrame({
+            'type': np.where(sells, 'sell', 'buy'),
+            'time': self.time[rows],
+            'price': self.column('price')[rows],
+            'execution_price': self.column('execution_price')[rows],
+            'quantity': self.column('quantity')[rows],
+            'fee': self.column('fee')[rows],
+            'slippage_cost': self.column('slippage_cost')[rows],
+            'balance': self.column('balance')[rows],
+            'reason': np.where(sells, self.reasons()[rows], None),
+            'pnl_pct': self.column('pnl_pct')[rows],
+            'real_pnl_amount': self.column('real_pnl_amount')[rows],
+        })
+        return df
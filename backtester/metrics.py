@@ -0,0 +1,225 @@
+import numpy as np
+
+# Metrics that optimizers can rank on. Value: True if higher is better.
+METRICS = {
+    'return_pct': True,
+    'max_drawdown_pct': False,
+    'sharpe': True,
+    'sortino': True,
+    'exposure_pct': True,
+    'win_rate_pct': True,
+    'fee_drag_pct': False,
+    'total_trades': True,
+}
+
+HOURS_PER_YEAR = 24 * 365
+
+def infer_periods_per_year(times):
+    """
+    Infer the number of bars per year from a datetime64 array (median bar spacing).
+    Falls back to hourly bars when it cannot be inferred.
+    """
+    times = np.asarray(times)
+    if len(times) < 2:
+        return HOURS_PER_YEAR
+    step = np.median(np.diff(times).astype('timedelta64[s]').astype(np.float64))
+    if not step > 0:
+        return HOURS_PER_YEAR
+    return 365 * 24 * 3600 / step
+
+def period_returns(equity):
+    equity = np.asarray(equity, dtype=np.float64)
+    if len(equity) < 2:
+        return np.empty(0)
+    return np.diff(equity) / equity[:-1]
+
+def max_drawdown_pct(equity):
+    """Largest peak-to-trough decline of the equity curve, as a positive percentage"""
+    equity = np.asarray(equity, dtype=np.float64)
+    if len(equity) == 0:
+        return 0.0
+    peaks = np.maximum.accumulate(equity)
+    drawdowns = (peaks - equity) / peaks
+    return float(drawdowns.max() * 100)
+
+def sharpe_ratio(returns, periods_per_year=HOURS_PER_YEAR):
+    returns = np.asarray(returns, dtype=np.float64)
+    if len(returns) < 2:
+        return 0.0
+    std = returns.std(ddof=1)
+    if std == 0:
+        return 0.0
+    return float(returns.mean() / std * np.sqrt(periods_per_year))
+
+def sortino_ratio(returns, periods_per_year=HOURS_PER_YEAR):
+    returns = np.asarray(returns, dtype=np.float64)
+    if len(returns) < 2:
+        return 0.0
+    # Downside deviation uses all periods, with positive returns counted as zero
+    downside = np.sqrt(np.mean(np.minimum(returns, 0.0) ** 2))
+    if downside == 0:
+        return 0.0
+    return float(returns.mean() / downside * np.sqrt(periods_per_year))
+
+def exposure_pct(in_position):
+    in_position = np.asarray(in_position, dtype=bool)
+    if len(in_position) == 0:
+        return 0.0
+    return float(in_position.mean() * 100)
+
+def win_rate_pct(ledger):
+    pnl = ledger.column('real_pnl_amount')[ledger.sells]
+    if len(pnl) == 0:
+        return 0.0
+    return float((pnl > 0).mean() * 100)
+
+def fee_drag_pct(ledger, initial_capital):
+    """Total fees paid as a percentage of initial capital"""
+    if initial_capital == 0:
+        return 0.0
+    return float(ledger.column('fee').sum() / initial_capital * 100)
+
+def compute_metrics(equity, in_position, ledger, initial_capital, final_balance=None, times=None, periods_per_year=None):
+    """
+    Compute the full metric set from an equity curve and a TradeLedger.
+    All metrics are computed on whole arrays; nothing iterates per trade.
+    periods_per_year (bars per year for Sharpe/Sortino) is inferred from times if not given.
+    """
+    equity = np.asarray(equity, dtype=np.float64)
+    if final_balance is None:
+        final_balance = equity[-1] if len(equity) else initial_capital
+    if periods_per_year is None:
+        periods_per_year = infer_periods_per_year(times) if times is not None else HOURS_PER_YEAR
+    returns = period_returns(equity)
+
+    return {
+        'return_pct': (final_balance - initial_capital) / initial_capital * 100,
+        'max_drawdown_pct': max_drawdown_pct(equity),
+        'sharpe': sharpe_ratio(returns, periods_per_year),
+        'sortino': sortino_ratio(returns, periods_per_year),
+        'exposure_pct': exposure_pct(in_position),
+        'win_rate_pct': win_rate_pct(ledger),
+        'fee_drag_pct': fee_drag_pct(ledger, initial_capital),
+        'total_trades': int(ledger.sells.sum()),
+    }
+
+class MetricsAccumulator:
+    """
+    Single-pass version of compute_metrics() for streamed equity curves.
+    Feed it the equity/in_position/times of each chunk; only a handful of
+    running values are kept (carried peak and last equity, merged mean/variance
+    of returns, bar spacing counts). Drawdown, exposure and bar spacing are exact;
+    Sharpe/Sortino use a pairwise mean/variance merge and agree with the
+    whole-array result to floating-point rounding.
+    """
+    def __init__(self):
+        self.bars = 0
+        self.bars_in_position = 0
+        self.last_equity = None
+        self.peak = -np.inf
+        self.max_drawdown = 0.0
+        self.n_returns = 0
+        self.mean_return = 0.0
+        self.m2_return = 0.0
+        self.downside_sq = 0.0
+        self.last_time = None
+        self.step_counts = {}
+
+    def update(self, equity, in_position, times=None):
+        equity = np.asarray(equity, dtype=np.float64)
+        if len(equity) == 0:
+            return
+        self.bars += len(equity)
+        self.bars_in_position += int(np.count_nonzero(in_position))
+
+        peaks = np.maximum.accumulate(np.concatenate([[self.peak], equity]))[1:]
+        self.max_drawdown = max(self.max_drawdown, float(((peaks - equity) / peaks).max()))
+        self.peak = peaks[-1]
+
+        joined = equity if self.last_equity is None else np.concatenate([[self.last_equity], equity])
+        returns = period_returns(joined)
+        self.last_equity = equity[-1]
+        if len(returns):
+            # Chan et al. merge of (count, mean, M2)
+            n, mean = len(returns), returns.mean()
+            m2 = float(((returns - mean) ** 2).sum())
+            total = self.n_returns + n
+            delta = mean - self.mean_return
+            self.mean_return += delta * n / total
+            self.m2_return += m2 + delta ** 2 * self.n_returns * n / total
+            self.n_returns = total
+            self.downside_sq += float((np.minimum(returns, 0.0) ** 2).sum())
+
+        if times is not None:
+            times = np.asarray(times)
+            joined = times if self.last_time is None else np.concatenate([[self.last_time], times])
+            steps = np.diff(joined).astype('timedelta64[s]').astype(np.float64)
+            for step, count in zip(*np.unique(steps, return_counts=True)):
+                self.step_counts[step] = self.step_counts.get(step, 0) + int(count)
+            self.last_time = times[-1]
+
+    def periods_per_year(self):
+        """Same result as infer_periods_per_year() on the full time array"""
+        total = sum(self.step_counts.values())
+        if total == 0:
+            return HOURS_PER_YEAR
+        steps = sorted(self.step_counts)
+        counts = np.cumsum([self.step_counts[s] for s in steps])
+        lower = steps[int(np.searchsorted(counts, (total - 1) // 2, side='right'))]
+        upper = steps[int(np.searchsorted(counts, total // 2, side='right'))]
+        step = (lower + upper) / 2
+        if not step > 0:
+            return HOURS_PER_YEAR
+        return 365 * 24 * 3600 / step
+
+    def result(self, ledger, initial_capital, final_balance=None, periods_per_year=None):
+        if final_balance is None:
+            final_balance = self.last_equity if self.last_equity is not None else initial_capital
+        if periods_per_year is None:
+            periods_per_year = self.periods_per_year()
+
+        sharpe = sortino = 0.0
+        if self.n_returns >= 2:
+            std = np.sqrt(self.m2_return / (self.n_returns - 1))
+            if std != 0:
+                sharpe = float(self.mean_return / std * np.sqrt(periods_per_year))
+            downside = np.sqrt(self.downside_sq / self.n_returns)
+            if downside != 0:
+                sortino = float(self.mean_return / downside * np.sqrt(periods_per_year))
+
+        return {
+            'return_pct': (final_balance - initial_capital) / initial_capital * 100,
+            'max_drawdown_pct': float(self.max_drawdown * 100) if self.bars else 0.0,
+            'sharpe': sharpe,
+            'sortino': sortino,
+            'exposure_pct': float(self.bars_in_position / self.bars * 100) if self.bars else 0.0,
+            'win_rate_pct': win_rate_pct(ledger),
+            'fee_drag_pct': fee_drag_pct(ledger, initial_capital),
+            'total_trades': int(ledger.sells.sum()),
+        }
+
+def exit_breakdown(ledger):
+    """
+    Count exit types on the ledger (masks only, no per-trade loop).
+    Returns the columns reported by batch_backtest.py.
+    """
+    sells = ledger.sells
+    is_profit = ledger.column('real_pnl_amount') > 0
+
+    stop_loss = ledger.reason_mask('Stop Loss') # SL is typically a loss
+    # TP is a win; Trailing Stop is essentially a winning exit (usually)
+    take_profit = ledger.reason_mask('Take Profit') | ledger.reason_mask('Trailing Stop')
+    # Legacy check, but keeping just in case
+    max_hold = ledger.reason_mask('Max Hold Days', prefix=True)
+    other = sells & ~(stop_loss | take_profit | max_hold)
+
+    tp_count = int(take_profit.sum())
+    mh_win = int((max_hold & is_profit).sum())
+    return {
+        'wins': tp_count + mh_win + int((other & is_profit).sum()),
+        'stop_loss': int(stop_loss.sum()),
+        'trailing_stop': tp_count,
+        'max_hold_win': mh_win,
+        'max_hold_loss': int((max_hold & ~is_profit).sum()),
+        'fees': float(ledger.column('fee').sum()),
+    }
@@ -0,0 +1,140 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from backtester.metrics import period_returns
+from config.settings import SLIPPAGE_RATE, TRADE_FEE_RATE, MC_SIMULATIONS, MC_BLOCK_SIZE, MC_COST_JITTER
+
+PERCENTILES = (5, 25, 50, 75, 95)
+METHODS = ('shuffle', 'bootstrap', 'cost_jitter')
+MAX_ELEMENTS_PER_PASS = 4_000_000 # simulated path values held at once per worker (~32 MB)
+
+# Robustness of a backtest result:
+#   shuffle      random order of the same round trips (final balance is fixed, drawdown is not)
+#   bootstrap    block bootstrap of the per-candle strategy returns
+#   cost_jitter  every trade re-priced with slippage/fee rates drawn around the configured ones
+# Shuffle and cost jitter work at trade resolution (drawdown between trades only).
+
+def round_trips(ledger, initial_capital, final_balance):
+    """
+    Per round trip: balance factor (balance after the sell / before the buy),
+    gross price ratio (sell close / buy close) and invested fraction of the
+    balance (quantity * buy close / balance before the buy). `tail` is the
+    factor of a position still open at the end.
+    """
+    sells = np.flatnonzero(ledger.sells)
+    buys = np.flatnonzero(ledger.buys)[:len(sells)]
+    price = ledger.column('price')
+    balance = ledger.column('balance')
+    quantity = ledger.column('quantity')
+
+    before = balance[buys] + quantity[buys] * ledger.column('execution_price')[buys] + ledger.column('fee')[buys]
+    factors = balance[sells] / before
+    last = balance[sells[-1]] if len(sells) else initial_capital
+    return {
+        'factors': factors,
+        'gross': price[sells] / price[buys],
+        'weights': quantity[buys] * price[buys] / before,
+        'tail': final_balance / last,
+    }
+
+def max_drawdown_paths(paths, start):
+    """Max drawdown (%) of each row of `paths`, with `start` as the first equity value"""
+    peaks = np.maximum.accumulate(np.maximum(paths, start), axis=1)
+    return ((peaks - paths) / peaks).max(axis=1) * 100
+
+def _shuffle(rng, n, data):
+    factors = data['factors']
+    shuffled = rng.permuted(np.tile(factors, (n, 1)), axis=1)
+    return np.cumprod(shuffled, axis=1)
+
+def _bootstrap(rng, n, data):
+    returns, block = data['returns'], data['block_size']
+    length = len(returns)
+    n_blocks = -(-length // block)
+    starts = rng.integers(0, length - block + 1, size=(n, n_blocks))
+    idx = (starts[:, :, None] + np.arange(block)).reshape(n, -1)[:, :length]
+    return np.cumprod(1 + returns[idx], axis=1)
+
+def _cost_jitter(rng, n, data):
+    shape = (n, len(data['gross']))
+    jitter = data['jitter']
+    slippage = SLIPPAGE_RATE * rng.uniform(1 - jitter, 1 + jitter, size=shape)
+    fee = TRADE_FEE_RATE * rng.uniform(1 - jitter, 1 + jitter, size=shape)
+    # Same arithmetic as the engine: buy at close * (1 + slippage) plus fee, sell at close * (1 - slippage) minus fee
+    factors = 1 + data['weights'] * (data['gross'] * (1 - slippage) * (1 - fee) - (1 + slippage) * (1 + fee))
+    return np.cumprod(factors, axis=1)
+
+SIMULATORS = {'shuffle': _shuffle, 'bootstrap': _bootstrap, 'cost_jitter': _cost_jitter}
+
+def _simulate(method, data, n, seed):
+    """Worker: n resamples of one method -> (final balance, max drawdown %) arrays"""
+    rng = np.random.default_rng(seed)
+    start = data['start']
+    length = max(len(data['returns']) if method == 'bootstrap' else len(data['factors']), 1)
+    per_pass = max(1, MAX_ELEMENTS_PER_PASS // length)
+
+    finals, drawdowns = [], []
+    for offset in range(0, n, per_pass):
+        rows = min(per_pass, n - offset)
+        paths = start * SIMULATORS[method](rng, rows, data)
+        if paths.shape[1] == 0:
+            finals.append(np.full(rows, start))
+            drawdowns.append(np.zeros(rows))
+            continue
+        finals.append(paths[:, -1])
+        drawdowns.append(max_drawdown_paths(paths, start))
+    final = np.concatenate(finals)
+    if method != 'bootstrap':
+        final = final * data['tail']
+    return final, np.concatenate(drawdowns)
+
+def bands(values):
+    return {f"p{p}": float(v) for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))}
+
+def run_monte_carlo(result, n_sims=MC_SIMULATIONS, block_size=MC_BLOCK_SIZE, cost_jitter=MC_COST_JITTER,
+                    methods=METHODS, workers=None, seed=None):
+    """
+    Resample an engine result (needs the ledger and equity curve, i.e. a fresh
+    BacktestEngine.run(), not a cached summary). Returns percentile bands of
+    final balance and max drawdown per method, plus the probability of a loss.
+    Resamples are split across `workers` processes (1 = in-process).
+    """
+    initial = result['initial_balance']
+    equity = result['equity_curve']
+    data = round_trips(result['trades'], initial, result['final_balance'])
+    data['returns'] = period_returns(equity)
+    data['start'] = float(equity[0]) if len(equity) else initial
+    data['block_size'] = max(1, min(int(block_size), len(data['returns']) or 1))
+    data['jitter'] = cost_jitter
+
+    jobs = []
+    if 'bootstrap' in methods and len(data['returns']) == 0:
+        methods = [m for m in methods if m != 'bootstrap']
+    workers = workers or os.cpu_count() or 1
+    seeds = np.random.SeedSequence(seed).spawn(len(methods) * workers)
+    for i, method in enumerate(methods):
+        sizes = [n_sims // workers + (1 if w < n_sims % workers else 0) for w in range(workers)]
+        jobs += [(method, size, seeds[i * workers + w]) for w, size in enumerate(sizes) if size]
+
+    if workers == 1:
+        outputs = [_simulate(method, data, size, s) for method, size, s in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_simulate, method, data, size, s) for method, size, s in jobs]
+            outputs = [f.result() for f in futures]
+
+    report = {
+        'n_sims': n_sims,
+        'actual': {'final_balance': float(result['final_balance']), 'max_drawdown_pct': float(result['metrics']['max_drawdown_pct'])},
+    }
+    for method in methods:
+        parts = [out for (m, _, _), out in zip(jobs, outputs) if m == method]
+        final = np.concatenate([p[0] for p in parts])
+        drawdown = np.concatenate([p[1] for p in parts])
+        report[method] = {
+            'final_balance': bands(final),
+            'return_pct': bands((final - initial) / initial * 100),
+            'max_drawdown_pct': bands(drawdown),
+            'prob_loss': float((final < initial).mean()),
+        }
+    return report
@@ -0,0 +1,264 @@
+import asyncio
+import heapq
+import numpy as np
+import pandas as pd
+from backtester.ledger import TradeLedger, BUY, SELL
+from backtester.metrics import compute_metrics
+from config.settings import TRADE_FEE_RATE, SLIPPAGE_RATE, LIVE_CANDLE_CAPACITY
+from config.logging_config import get_logger
+from data_fetcher.upbit_api import UpbitAPI
+from data_fetcher.candle_feed import LiveCandleFeed
+from trade.trader import Trader
+from trade.live_loop import schedule_jobs
+from utils.intervals import interval_to_timedelta
+from utils.scheduler import CandleScheduler
+
+logger = get_logger("Replay")
+
+# Simulated time is "candle time": seconds since epoch of the naive (KST) candle
+# timestamps read as UTC, so candle closes line up with the scheduler's grid.
+
+def to_seconds(ts):
+    return pd.Timestamp(ts).value / 1e9
+
+def to_datetime(seconds):
+    return pd.Timestamp(int(round(seconds * 1e9))).to_pydatetime()
+
+class ReplayClock:
+    """
+    Virtual clock for CandleScheduler. sleep() parks the caller until the
+    driver advances time; time only moves when every job is asleep, so runs
+    take zero simulated time and a year of candles replays in seconds.
+    """
+    def __init__(self, start):
+        self.seconds = float(start)
+        self._waiters = [] # heap of (due, seq, future)
+        self._seq = 0
+        self._idle = None
+        self._expected = 0
+
+    def time(self):
+        return self.seconds
+
+    def now(self):
+        return to_datetime(self.seconds)
+
+    async def sleep(self, delay):
+        future = asyncio.get_running_loop().create_future()
+        self._seq += 1
+        heapq.heappush(self._waiters, (self.seconds + max(delay, 0), self._seq, future))
+        if len(self._waiters) >= self._expected:
+            self._idle.set()
+        await future
+
+    async def run(self, scheduler, until):
+        """Run the scheduler's jobs until simulated time passes `until`"""
+        self._idle = asyncio.Event()
+        self._expected = len(scheduler.jobs)
+        jobs = asyncio.ensure_future(scheduler.run())
+        try:
+            while True:
+                await self._idle.wait()
+                self._idle.clear()
+                due, _, future = heapq.heappop(self._waiters)
+                if due > until:
+                    break
+                self.seconds = max(self.seconds, due)
+                future.set_result(None)
+        finally:
+            jobs.cancel()
+            try:
+                await jobs
+            except asyncio.CancelledError:
+                pass
+
+class ReplayExchange(UpbitAPI):
+    """
+    Stand-in for UpbitAPI serving stored candles as of the replay clock.
+    Only completed candles are visible; the forming candle is built from the
+    part of its price path that has elapsed. Intra-candle prices follow
+    open -> low -> high -> close (open -> high -> low -> close for down candles),
+    piecewise linear. Orders fill at that price with SLIPPAGE_RATE and
+    TRADE_FEE_RATE and are recorded in a TradeLedger like the backtester's.
+    """
+    def __init__(self, df, clock, market, interval, initial_krw=1000000,
+                 fee_rate=TRADE_FEE_RATE, slippage_rate=SLIPPAGE_RATE):
+        self.clock = clock
+        self.market = market
+        self.currency = market.split("-")[1]
+        self.interval = interval
+        self.interval_seconds = interval_to_timedelta(interval).total_seconds()
+        self.fee_rate = fee_rate
+        self.slippage_rate = slippage_rate
+
+        self.starts = df['datetime'].to_numpy(dtype='datetime64[ns]').view(np.int64) / 1e9
+        self.times = df['datetime'].to_numpy(dtype='datetime64[ns]')
+        self.ohlcv = np.column_stack([df[c].to_numpy(dtype=np.float64) for c in ('open', 'high', 'low', 'close', 'volume')])
+        self.initial_krw = float(initial_krw)
+        self.balances = {'KRW': self.initial_krw, self.currency: 0.0}
+        self.trades = TradeLedger()
+        self.holdings = [] # coin balance after each ledger row
+        self.entry_price = None
+        self.pending_reason = None
+        self.requests = 0
+
+    # --- Market data ---
+    def _forming(self, now):
+        """(index, partial OHLCV) of the candle containing `now`, or (index of last closed + 1, None)"""
+        i = int(np.searchsorted(self.starts, now, side='right')) - 1
+        if i < 0:
+            return 0, None
+        elapsed = (now - self.starts[i]) / self.interval_seconds
+        if elapsed >= 1:
+            return i + 1, None
+        open_, high, low, close, volume = self.ohlcv[i]
+        path = [open_, low, high, close] if close >= open_ else [open_, high, low, close]
+        position = elapsed * 3
+        k = min(int(position), 2)
+        price = path[k] + (path[k + 1] - path[k]) * (position - k)
+        seen = path[:k + 1] + [price]
+        return i, (open_, max(seen), min(seen), price, volume * elapsed)
+
+    def _candle(self, i, values):
+        ts = pd.Timestamp(self.times[i]).strftime("%Y-%m-%dT%H:%M:%S")
+        return {
+            'candle_date_time_kst': ts, 'candle_date_time_utc': ts,
+            'opening_price': values[0], 'high_price': values[1], 'low_price': values[2],
+            'trade_price': values[3], 'candle_acc_trade_volume': values[4],
+        }
+
+    def get_candles(self, market="KRW-BTC", interval="minute60", count=200, to=None):
+        self.requests += 1
+        end, partial = self._forming(self.clock.time())
+        candles = [self._candle(end, partial)] if partial is not None else []
+        for i in range(end - 1, max(end - 1 - (count - len(candles)), -1), -1):
+            candles.append(self._candle(i, self.ohlcv[i]))
+        return candles # newest first, like Upbit
+
+    @staticmethod
+    def candles_to_df(candles):
+        """UpbitAPI.candles_to_df for the replay's own candles (already unique; skips the JSON parsing)"""
+        if not candles:
+            return pd.DataFrame()
+        candles = candles[::-1]
+        df = pd.DataFrame({
+            'datetime': np.array([c['candle_date_time_kst'] for c in candles], dtype='datetime64[ns]'),
+            'open': np.array([c['opening_price'] for c in candles], dtype=np.float64),
+            'high': np.array([c['high_price'] for c in candles], dtype=np.float64),
+            'low': np.array([c['low_price'] for c in candles], dtype=np.float64),
+            'close': np.array([c['trade_price'] for c in candles], dtype=np.float64),
+            'volume': np.array([c['candle_acc_trade_volume'] for c in candles], dtype=np.float64),
+        })
+        return df
+
+    def get_ohlcv(self, market="KRW-BTC", interval="minute60", days=365):
+        self.requests += 1
+        count = int(days * 24 * 3600 / self.interval_seconds)
+        return self.candles_to_df(self.get_candles(market, interval, count=count))
+
+    def get_current_price(self, market="KRW-BTC"):
+        end, partial = self._forming(self.clock.time())
+        if partial is not None:
+            return float(partial[3])
+        return float(self.ohlcv[end - 1][3]) if end > 0 else None
+
+    # --- Account ---
+    def get_balance(self, ticker="KRW"):
+        return self.balances.get(ticker, 0.0)
+
+    def place_order(self, market, side, volume=None, price=None, ord_type='limit'):
+        current_price = self.get_current_price(market)
+        now = self.clock.now()
+        if side == 'bid' and ord_type == 'price':
+            # Market buy by KRW amount; the fee is charged on top
+            amount = float(price)
+            if amount * (1 + self.fee_rate) > self.balances['KRW'] + 1e-9:
+                logger.warning("Insufficient KRW for replay buy.")
+                return None
+            execution_price = current_price * (1 + self.slippage_rate)
+            quantity = amount / execution_price
+            fee = amount * self.fee_rate
+            self.balances['KRW'] -= amount + fee
+            self.balances[self.currency] += quantity
+            self.entry_price = execution_price
+            self.trades.append(BUY, now, current_price, execution_price, quantity, fee,
+                               (execution_price - current_price) * quantity, self.balances['KRW'])
+        elif side == 'ask' and ord_type == 'market':
+            quantity = min(float(volume), self.balances[self.currency])
+            execution_price = current_price * (1 - self.slippage_rate)
+            sell_amount = quantity * execution_price
+            fee = sell_amount * self.fee_rate
+            self.balances['KRW'] += sell_amount - fee
+            self.balances[self.currency] -= quantity
+            entry = self.entry_price or execution_price
+            self.trades.append(SELL, now, current_price, execution_price, quantity, fee,
+                               (current_price - execution_price) * quantity, self.balances['KRW'],
+                               reason=self.pending_reason, pnl_pct=(current_price - entry) / entry * 100,
+                               real_pnl_amount=(sell_amount - fee) - quantity * entry)
+            self.pending_reason = None
+        else:
+            logger.warning(f"Unsupported replay order: {side}/{ord_type}")
+            return None
+        self.holdings.append(self.balances[self.currency])
+        return {'uuid': f"replay-{len(self.trades)}", 'side': side, 'ord_type': ord_type, 'state': 'done'}
+
+    def equity_curve(self, closes, close_times):
+        """Mark-to-market equity at each candle close, rebuilt from the ledger"""
+        rows = np.searchsorted(self.trades.time, close_times, side='right') - 1
+        traded = rows >= 0
+        krw = np.full(len(rows), self.initial_krw)
+        coins = np.zeros(len(rows))
+        krw[traded] = self.trades.column('balance')[rows[traded]]
+        coins[traded] = np.asarray(self.holdings)[rows[traded]]
+        return krw + coins * closes, coins > 0
+
+class ReplayTrader(Trader):
+    """The live Trader; sells tag their reason on the exchange for the ledger"""
+    def sell_market(self, reason="Signal"):
+        if self.position:
+            self.api.pending_reason = reason
+        super().sell_market(reason)
+
+def run_replay(df, market, interval, signal_gen, initial_krw=1000000, warmup_days=10,
+               stop_check_interval=900, capacity=LIVE_CANDLE_CAPACITY):
+    """
+    Replay the live loop (trade.live_loop jobs on a CandleScheduler) over stored
+    candles. The first `warmup_days` only seed the candle feed. Returns a
+    result dict shaped like BacktestEngine.run().
+    """
+    interval_seconds = interval_to_timedelta(interval).total_seconds()
+    start = to_seconds(df['datetime'].iloc[0]) + warmup_days * 86400
+    until = to_seconds(df['datetime'].iloc[-1]) + interval_seconds
+
+    clock = ReplayClock(start)
+    exchange = ReplayExchange(df, clock, market, interval, initial_krw=initial_krw)
+    trader = ReplayTrader(api=exchange, clock=clock.now, market=market)
+    feed = LiveCandleFeed(exchange, market, interval, capacity=capacity, history_days=warmup_days)
+
+    scheduler = CandleScheduler(clock=clock.time, sleep=clock.sleep)
+    schedule_jobs(scheduler, trader, exchange, signal_gen, feed, snapshot_path=None,
+                  stop_check_interval=stop_check_interval)
+    asyncio.run(clock.run(scheduler, until))
+
+    # Equity at each candle close inside the replay window
+    window = df[df['datetime'] >= to_datetime(start)]
+    closes = window['close'].to_numpy(dtype=np.float64)
+    close_times = (window['datetime'] + pd.Timedelta(seconds=interval_seconds)).to_numpy(dtype='datetime64[ns]')
+    equity, in_position = exchange.equity_curve(closes, close_times)
+
+    last_price = closes[-1] if len(closes) else 0.0
+    coins = exchange.balances[exchange.currency]
+    final_balance = float(exchange.balances['KRW'] + coins * last_price * (1 - TRADE_FEE_RATE))
+    metrics = compute_metrics(equity, in_position, exchange.trades, initial_krw,
+                              final_balance=final_balance, times=window['datetime'].to_numpy())
+    return {
+        'initial_balance': initial_krw,
+        'final_balance': final_balance,
+        'return_pct': metrics['return_pct'],
+        'trades': exchange.trades,
+        'equity_curve': equity,
+        'metrics': metrics,
+        'total_trades': metrics['total_trades'],
+        'decisions': scheduler.jobs[0].runs,
+        'requests': exchange.requests,
+    }
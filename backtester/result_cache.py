@@ -0,0 +1,146 @@
+import os
+import json
+import hashlib
+import sqlite3
+import datetime
+import numpy as np
+import pandas as pd
+from backtester.metrics import exit_breakdown
+from config.logging_config import get_logger
+
+logger = get_logger("ResultCache")
+
+DEFAULT_DB_PATH = os.path.join("results", "backtest_results.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    market TEXT,
+    data_fingerprint TEXT NOT NULL,
+    engine_version TEXT NOT NULL,
+    params TEXT NOT NULL,
+    initial_balance REAL,
+    final_balance REAL,
+    return_pct REAL,
+    total_trades INTEGER,
+    summary TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_results_market ON results (market);
+"""
+
+def data_fingerprint(df):
+    """
+    Hash of the candle data (timestamps + OHLCV) used for a run.
+    Any change in rows or values produces a different fingerprint.
+    """
+    h = hashlib.sha256()
+    h.update(str(len(df)).encode())
+    h.update(np.ascontiguousarray(df['datetime'].to_numpy(dtype='datetime64[ns]').view(np.int64)).tobytes())
+    for col in ('open', 'high', 'low', 'close', 'volume'):
+        h.update(np.ascontiguousarray(df[col].to_numpy(dtype=np.float64)).tobytes())
+    return h.hexdigest()
+
+def summarize(result):
+    """JSON-serializable part of an engine result (no ledger / equity arrays)"""
+    return {
+        'initial_balance': float(result['initial_balance']),
+        'final_balance': float(result['final_balance']),
+        'return_pct': float(result['return_pct']),
+        'total_trades': int(result['total_trades']),
+        'metrics': {k: float(v) for k, v in result['metrics'].items()},
+        'breakdown': exit_breakdown(result['trades']),
+    }
+
+class ResultCache:
+    """
+    SQLite store of backtest summaries keyed by
+    (data fingerprint, engine version, full parameter set).
+    """
+    def __init__(self, db_path=DEFAULT_DB_PATH):
+        self.db_path = db_path
+        db_dir = os.path.dirname(db_path)
+        if db_dir and not os.path.exists(db_dir):
+            os.makedirs(db_dir)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    @staticmethod
+    def make_key(fingerprint, engine_version, params):
+        payload = json.dumps(
+            {'data': fingerprint, 'engine': engine_version, 'params': params},
+            sort_keys=True, default=str
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, fingerprint, engine_version, params):
+        key = self.make_key(fingerprint, engine_version, params)
+        with self._connect() as conn:
+            row = conn.execute("SELECT summary FROM results WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, fingerprint, engine_version, params, summary, market=None):
+        key = self.make_key(fingerprint, engine_version, params)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key, market, fingerprint, engine_version,
+                    json.dumps(params, sort_keys=True, default=str),
+                    summary['initial_balance'], summary['final_balance'],
+                    summary['return_pct'], summary['total_trades'],
+                    json.dumps(summary), datetime.datetime.now().isoformat()
+                )
+            )
+        return key
+
+    def get_or_run(self, engine, fingerprint, market=None):
+        """
+        Return (summary, cached). Runs the engine only when no stored result
+        matches its data fingerprint, engine version and parameters.
+        """
+        params = engine.params()
+        summary = self.get(fingerprint, engine.VERSION, params)
+        if summary is not None:
+            return summary, True
+
+        summary = summarize(engine.run())
+        self.put(fingerprint, engine.VERSION, params, summary, market=market)
+        return summary, False
+
+    def query(self, market=None, engine_version=None, order_by='return_pct', ascending=False, limit=None):
+        """
+        Past results as a DataFrame, one row per run with params and metrics flattened.
+        """
+        sql = "SELECT market, engine_version, params, summary, created_at FROM results"
+        clauses, args = [], []
+        if market:
+            clauses.append("market = ?")
+            args.append(market)
+        if engine_version:
+            clauses.append("engine_version = ?")
+            args.append(engine_version)
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+
+        with self._connect() as conn:
+            rows = conn.execute(sql, args).fetchall()
+
+        records = []
+        for market_, version, params, summary, created_at in rows:
+            summary = json.loads(summary)
+            record = {'market': market_, 'engine_version': version, 'created_at': created_at}
+            record.update(json.loads(params))
+            record.update(summary['metrics'])
+            record['final_balance'] = summary['final_balance']
+            records.append(record)
+
+        df = pd.DataFrame(records)
+        if not df.empty and order_by in df.columns:
+            df = df.sort_values(by=order_by, ascending=ascending)
+        if limit:
+            df = df.head(limit)
+        return df.reset_index(drop=True)
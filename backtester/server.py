@@ -0,0 +1,256 @@
+import os
+import json
+import time
+import socket
+import threading
+import socketserver
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future
+from utils.data_loader import load_data, data_version
+from backtester.backtest_engine import BacktestEngine
+from backtester.result_cache import ResultCache, data_fingerprint, summarize
+from backtester.execution import load_depth_model
+from strategy.signal import SignalGenerator
+from backtester.grid import grid_points
+from config.logging_config import get_logger
+from config.settings import (
+    TICKER_INTERVAL, RSI_OVERSOLD, BACKTEST_SERVER_SOCKET, BACKTEST_SERVER_WORKERS, BACKTEST_SERVER_CACHE_ENTRIES
+)
+
+logger = get_logger("BacktestServer")
+
+# Resident backtest service: candles, indicator frames and depth models stay in
+# memory between requests, so a what-if run only pays for the simulation.
+# Clients talk to it with backtester/client.py (protocol described there).
+
+ENGINE_PARAMS = ('stop_loss_pct', 'take_profit_pct', 'max_hold_days')
+# optimize.py's result column names for the grid parameters
+OPTIMIZE_COLUMNS = {'stop_loss_pct': 'stop_loss', 'take_profit_pct': 'take_profit', 'max_hold_days': 'max_hold'}
+
+class _LRU:
+    def __init__(self, entries):
+        self.entries = entries
+        self.items = OrderedDict()
+        self.loading = {} # key -> Future of the load in flight
+
+    def get(self, key):
+        item = self.items.get(key)
+        if item is not None:
+            self.items.move_to_end(key)
+        return item
+
+    def put(self, key, item):
+        self.items[key] = item
+        self.items.move_to_end(key)
+        while len(self.items) > self.entries:
+            self.items.popitem(last=False)
+
+class MarketCache:
+    """
+    Candle frames per (market, days, interval) and indicator frames per
+    (candles, indicator params), reloaded when the store's data version changes.
+    Runs only read them, so concurrent runs share both without copies.
+    """
+    def __init__(self, data_dir="data", entries=BACKTEST_SERVER_CACHE_ENTRIES):
+        self.data_dir = data_dir
+        self.frames = _LRU(entries)
+        self.indicator_frames = _LRU(entries)
+        self.depth_models = _LRU(entries)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _cached(self, lru, key, is_current, load):
+        """
+        lru's entry for key if is_current(entry), else load() stored under key.
+        The lock covers only the lookup and the insert: loads of different keys
+        run concurrently, and requests for a key being loaded wait for that load.
+        """
+        with self.lock:
+            entry = lru.get(key)
+            if entry is not None and is_current(entry):
+                self.hits += 1
+                return entry
+            pending = lru.loading.get(key)
+            if pending is None:
+                self.misses += 1
+                pending = lru.loading[key] = Future()
+                owner = True
+            else:
+                self.hits += 1
+                owner = False
+        if not owner:
+            return pending.result()
+        try:
+            entry = load()
+        except BaseException as e:
+            with self.lock:
+                del lru.loading[key]
+            pending.set_exception(e)
+            raise
+        with self.lock:
+            lru.put(key, entry)
+            del lru.loading[key]
+        pending.set_result(entry)
+        return entry
+
+    def frame(self, market, days, interval):
+        """(candles, fingerprint)"""
+        version = data_version(market, interval, self.data_dir)
+
+        def load():
+            df = load_data(market, days, data_dir=self.data_dir, interval=interval)
+            if df is None or df.empty:
+                raise ValueError(f"No {interval} data for {market}")
+            return version, df, data_fingerprint(df)
+
+        entry = self._cached(self.frames, (market, days, interval), lambda entry: entry[0] == version, load)
+        return entry[1], entry[2]
+
+    def indicators(self, signal_gen, market, days, interval):
+        """(candles, the generator's indicator frame for them, fingerprint); both frames are shared read-only"""
+        df, fingerprint = self.frame(market, days, interval)
+        key = (market, days, interval, tuple(sorted(signal_gen.indicator_params().items())))
+        entry = self._cached(self.indicator_frames, key, lambda entry: entry[0] == fingerprint,
+                             lambda: (fingerprint, signal_gen.indicator_frame(df)))
+        return df, entry[1], fingerprint
+
+    def depth_model(self, market, df):
+        start, end = df['datetime'].iloc[0], df['datetime'].iloc[-1]
+        entry = self._cached(self.depth_models, (market, start, end), lambda entry: True,
+                             lambda: (load_depth_model(market, start, end, data_dir=self.data_dir),))
+        return entry[0]
+
+    def clear(self):
+        with self.lock:
+            for lru in (self.frames, self.indicator_frames, self.depth_models):
+                lru.items.clear()
+
+    def stats(self):
+        return {'frames': len(self.frames.items), 'indicator_frames': len(self.indicator_frames.items),
+                'depth_models': len(self.depth_models.items), 'hits': self.hits, 'misses': self.misses}
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            started = time.perf_counter()
+            try:
+                request = json.loads(line)
+                response = {'ok': True, 'result': self.server.dispatch(request)}
+            except Exception as e:
+                logger.warning(f"Request failed: {e}")
+                response = {'ok': False, 'error': f"{type(e).__name__}: {e}"}
+            response['elapsed_ms'] = (time.perf_counter() - started) * 1000
+            self.wfile.write((json.dumps(response, default=str) + "\n").encode('utf-8'))
+            self.wfile.flush()
+
+class BacktestServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Unix-socket server; each connection gets a thread, and the runs themselves
+    go to a pool of `workers` threads. The simulation loop holds the GIL, so the
+    pool bounds concurrency rather than adding CPU parallelism (use sweep.py
+    workers for CPU-bound grids).
+    """
+    daemon_threads = True
+
+    def __init__(self, socket_path=BACKTEST_SERVER_SOCKET, workers=BACKTEST_SERVER_WORKERS, data_dir="data",
+                 cache_entries=BACKTEST_SERVER_CACHE_ENTRIES, use_result_cache=True):
+        _remove_stale_socket(socket_path)
+        socket_dir = os.path.dirname(socket_path)
+        if socket_dir:
+            os.makedirs(socket_dir, exist_ok=True)
+        self.cache = MarketCache(data_dir, cache_entries)
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.workers = workers
+        self.result_cache = ResultCache() if use_result_cache else None
+        self.started_at = time.time()
+        self.requests = 0
+        super().__init__(socket_path, _Handler)
+
+    def dispatch(self, request):
+        op = request.get('op')
+        self.requests += 1
+        if op == 'backtest':
+            return self.pool.submit(self.run_backtest, request).result()
+        if op == 'optimize':
+            return self.run_optimize(request)
+        if op == 'stats':
+            return {'uptime_s': time.time() - self.started_at, 'requests': self.requests,
+                    'workers': self.workers, **self.cache.stats()}
+        if op == 'reload':
+            self.cache.clear()
+            return {'cleared': True}
+        if op == 'shutdown':
+            threading.Thread(target=self.shutdown, daemon=True).start()
+            return {'shutting_down': True}
+        raise ValueError(f"Unknown op '{op}'")
+
+    def run_backtest(self, request, params=None):
+        """One backtest; params override the request's strategy fields (used by optimize)"""
+        market = request['market']
+        days = request.get('days', 365)
+        interval = request.get('interval', TICKER_INTERVAL)
+        params = params if params is not None else {
+            'rsi_oversold': request.get('rsi', RSI_OVERSOLD),
+            **{k: request[k] for k in ENGINE_PARAMS if request.get(k) is not None},
+        }
+        signal_gen = SignalGenerator(**{k: v for k, v in params.items() if k not in ENGINE_PARAMS})
+        df, indicators, fingerprint = self.cache.indicators(signal_gen, market, days, interval)
+        execution = self.cache.depth_model(market, df) if request.get('depth') else None
+        engine = BacktestEngine(
+            df, signal_generator=signal_gen, bar_interval=interval, execution=execution, indicators=indicators,
+            **{k: v for k, v in params.items() if k in ENGINE_PARAMS}
+        )
+
+        # details: return the trade ledger of a computed run (a cached summary has none)
+        use_cache = self.result_cache is not None and not request.get('no_cache')
+        if use_cache:
+            summary = self.result_cache.get(fingerprint, engine.VERSION, engine.params())
+            if summary is not None:
+                return {**summary, 'cached': True}
+        result = engine.run()
+        summary = summarize(result)
+        if use_cache:
+            self.result_cache.put(fingerprint, engine.VERSION, engine.params(), summary, market=market)
+        summary['cached'] = False
+        if request.get('details'):
+            summary['trades'] = result['trades'].to_frame().to_dict('records')
+        return summary
+
+    def run_optimize(self, request):
+        """optimize.py's grid, one pool task per point; rows in optimize.py's column names"""
+        points = grid_points(request.get('mode', 'rsi'), request.get('rsi', RSI_OVERSOLD))
+        # Warm the caches once before fanning out
+        self.cache.indicators(SignalGenerator(), request['market'], request.get('days', 365),
+                             request.get('interval', TICKER_INTERVAL))
+        summaries = list(self.pool.map(lambda point: self.run_backtest(request, point), points))
+        rows = []
+        for point, summary in zip(points, summaries):
+            if request.get('mode', 'rsi') == 'rsi':
+                row = {'rsi_oversold': point['rsi_oversold']}
+            else:
+                row = {OPTIMIZE_COLUMNS[k]: point[k] for k in ENGINE_PARAMS}
+            rows.append({**row, **summary['metrics'], 'final_balance': summary['final_balance'], 'cached': summary['cached']})
+        return rows
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=False)
+        if os.path.exists(self.server_address):
+            os.remove(self.server_address)
+
+def _remove_stale_socket(socket_path):
+    """Remove a socket file left by a dead server; refuse to start next to a live one"""
+    if not os.path.exists(socket_path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(socket_path)
+    except (ConnectionRefusedError, FileNotFoundError):
+        os.remove(socket_path)
+    else:
+        raise RuntimeError(f"A backtest server is already listening on {socket_path}")
+    finally:
+        probe.close()
@@ -1,10 +1,17 @@
+import argparse
 import pandas as pd
 from utils.data_loader import load_data
 from backtester.backtest_engine import BacktestEngine
+from backtester.result_cache import ResultCache, data_fingerprint, summarize
+from backtester.monte_carlo import run_monte_carlo
+from backtester.execution import load_depth_model
+from backtester.client import BacktestClient, ServerError
 from strategy.signal import SignalGenerator
+from utils.intervals import INTERVAL_MINUTES
+from utils.profiler import stage, profiling, add_profile_arguments
 from config.logging_config import setup_logging, get_logger
 from config.settings import (
-    RSI_OVERSOLD, STOP_LOSS_PCT, TAKE_PROFIT_PCT, MAX_HOLD_DAYS
+    RSI_OVERSOLD, TICKER_INTERVAL, BACKTEST_SERVER_SOCKET, STOP_LOSS_PCT, TAKE_PROFIT_PCT, MAX_HOLD_DAYS
 )
 
 # Suppress logs for batch run to keep output clean
@@ -21,102 +28,131 @@ COINS = [
     ("KRW-ADA", "Cardano")
 ]
 
-def run_batch_backtest(days=365):
+def run_market(code, days, interval, depth, cache, mc_sims=0, mc_seed=None):
+    """Backtest one market locally; returns (summary, monte carlo report or None), or None without data"""
+    # Load Data
+    with stage("load"):
+        df = load_data(code, days, interval=interval)
+    if df is None or df.empty:
+        return None
+        
+    # Run Backtest
+    signal_gen = SignalGenerator(rsi_oversold=RSI_OVERSOLD)
+    # Order book depth where collected; markets without snapshots keep flat slippage
+    with stage("load"):
+        execution = load_depth_model(code, df['datetime'].iloc[0], df['datetime'].iloc[-1]) if depth else None
+    engine = BacktestEngine(
+        df,
+        signal_generator=signal_gen,
+        bar_interval=interval,
+        execution=execution
+    )
+    mc = None
+    if mc_sims:
+        # Monte Carlo needs the ledger and equity curve, so always run (and refresh the cache)
+        full_result = engine.run()
+        with stage("monte_carlo"):
+            mc = run_monte_carlo(full_result, n_sims=mc_sims, seed=mc_seed)
+        result = summarize(full_result)
+        if cache is not None:
+            with stage("fingerprint"):
+                fingerprint = data_fingerprint(df)
+            cache.put(fingerprint, engine.VERSION, engine.params(), result, market=code)
+    elif cache is None:
+        result = summarize(engine.run())
+    else:
+        with stage("fingerprint"):
+            fingerprint = data_fingerprint(df)
+        result, _ = cache.get_or_run(engine, fingerprint, market=code)
+    return result, mc
+
+def run_batch_backtest(days=365, use_cache=True, mc_sims=0, mc_seed=None, interval=TICKER_INTERVAL, depth=False, server=None):
     results = []
+    cache = ResultCache() if use_cache else None
+    # Server mode: runs go to the resident backtest server; Monte Carlo needs the full ledger, so it stays local
+    client = BacktestClient(server) if server and not mc_sims else None
+    if server and mc_sims:
+        print("--monte-carlo needs the full trade ledger; running locally instead of on the server")
     
     print("Loading data and running backtests...")
     
     for code, name in COINS:
         try:
-            # Load Data
-            df = load_data(code, days)
-            if df is None or df.empty:
-                print(f"Skipping {name} (No Data. Run collect_data.py)")
-                continue
-                
-            # Run Backtest
-            signal_gen = SignalGenerator(rsi_oversold=RSI_OVERSOLD)
-            engine = BacktestEngine(
-                df,
-                signal_generator=signal_gen
-            )
-            result = engine.run()
-            trades = result['trades']
-            
-            # metrics
-            total_trades = result['total_trades']
-            final_return = result['return_pct']
-            
-            wins = 0
-            sl_count = 0
-            tp_count = 0
-            mh_win = 0
-            mh_loss = 0
-            total_fees = 0
-            
-            for t in trades:
-                if t['type'] == 'sell':
-                    total_fees += t['fee']
-                    reason = t.get('reason', '')
-                    
-                    # Logic to count types
-                    # Check real_pnl_amount > 0 for generic 'win' if needed, but request asks for categories
-                    
-                    if reason == 'Stop Loss':
-                        sl_count += 1
-                        # SL is typically a loss
-                        
-                    elif reason == 'Take Profit':
-                        tp_count += 1
-                        wins += 1 # TP is a win
-                        
-                    elif reason == 'Trailing Stop':
-                        tp_count += 1 # Trailing Stop is essentially a winning exit (usually)
-                        wins += 1 
-                        
-                    elif reason.startswith('Max Hold Days'):
-                         # Legacy check, but keeping just in case
-                        pnl = t.get('real_pnl_amount', 0)
-                        if pnl > 0:
-                            mh_win += 1
-                            wins += 1
-                        else:
-                            mh_loss += 1
-                            
-                    else:
-                        # Fallback for other sells?
-                        pnl = t.get('real_pnl_amount', 0)
-                        if pnl > 0: wins += 1
-                
-                elif t['type'] == 'buy':
-                    total_fees += t['fee']
+            if client is not None:
+                try:
+                    result, mc = client.backtest(code, days=days, interval=interval, rsi=RSI_OVERSOLD,
+                                                 depth=depth, no_cache=not use_cache), None
+                except ServerError as e:
+                    print(f"Skipping {name} ({e})")
+                    continue
+            else:
+                run = run_market(code, days, interval, depth, cache, mc_sims, mc_seed)
+                if run is None:
+                    print(f"Skipping {name} (No Data. Run collect_data.py)")
+                    continue
+                result, mc = run
+            metrics = result['metrics']
+            breakdown = result['breakdown']
 
             results.append({
                 'Code': code.replace("KRW-", ""), # Display Code
                 'Name': name,
-                'Return': final_return,
-                'Trades': total_trades,
-                'Win': wins,
-                'SL': sl_count,
-                'TS': tp_count, # Using TP column logic for TS in loop, let's rename or split.
+                'Return': result['return_pct'],
+                'Trades': result['total_trades'],
+                'Win': breakdown['wins'],
+                'SL': breakdown['stop_loss'],
+                'TS': breakdown['trailing_stop'], # Using TP column logic for TS in loop, let's rename or split.
                 'TP': 0, # Strategy V2 has no fixed TP
-                'MH(W)': mh_win,
-                'MH(L)': mh_loss,
-                'Fees': total_fees
+                'MH(W)': breakdown['max_hold_win'],
+                'MH(L)': breakdown['max_hold_loss'],
+                'Fees': breakdown['fees'],
+                'MDD': metrics['max_drawdown_pct'],
+                'Sharpe': metrics['sharpe'],
+                # 5th percentile return / 95th percentile drawdown of the block bootstrap
+                'MC P5': mc['bootstrap']['return_pct']['p5'] if mc else None,
+                'MC MDD95': mc['bootstrap']['max_drawdown_pct']['p95'] if mc else None
             })
             
         except Exception as e:
             print(f"Error processing {name}: {e}")
+    if client is not None:
+        client.close()
+
+    with stage("report"):
+        print_report(results, mc_sims)
 
+def print_report(results, mc_sims=0):
     # Print Report
-    print("\n" + "="*105)
-    print(f"{'Code':<8} | {'Name':<15} | {'Return':<9} | {'Trades':<6} | {'Win':<4} | {'SL':<4} | {'TS':<4} | {'MH(W)':<5} | {'MH(L)':<5} | {'Fees':<7}")
-    print("-" * 105)
+    width = 125 + (24 if mc_sims else 0)
+    header = f"{'Code':<8} | {'Name':<15} | {'Return':<9} | {'Trades':<6} | {'Win':<4} | {'SL':<4} | {'TS':<4} | {'MH(W)':<5} | {'MH(L)':<5} | {'Fees':<7} | {'MDD':<7} | {'Sharpe':<6}"
+    if mc_sims:
+        header += f" | {'MC P5':<9} | {'MC MDD95':<8}"
+    print("\n" + "="*width)
+    print(header)
+    print("-" * width)
     
     for r in results:
-        print(f"{r['Code']:<8} | {r['Name']:<15} | {r['Return']:>8.2f}% | {r['Trades']:<6} | {r['Win']:<4} | {r['SL']:<4} | {r['TS']:<4} | {r['MH(W)']:<5} | {r['MH(L)']:<5} | {r['Fees']:<7.0f}")
+        line = f"{r['Code']:<8} | {r['Name']:<15} | {r['Return']:>8.2f}% | {r['Trades']:<6} | {r['Win']:<4} | {r['SL']:<4} | {r['TS']:<4} | {r['MH(W)']:<5} | {r['MH(L)']:<5} | {r['Fees']:<7.0f} | {r['MDD']:>6.2f}% | {r['Sharpe']:>6.2f}"
+        if mc_sims:
+            line += f" | {r['MC P5']:>8.2f}% | {r['MC MDD95']:>7.2f}%"
+        print(line)
     
-    print("="*105)
+    print("="*width)
+
+def main():
+    parser = argparse.ArgumentParser(description="Run backtests on multiple coins and print a summary report.")
+    parser.add_argument("--days", type=int, default=365, help="Days to backtest (default: 365)")
+    parser.add_argument("--interval", type=str, default=TICKER_INTERVAL, choices=list(INTERVAL_MINUTES), help=f"Bar interval, loaded from the store's rollups (default: {TICKER_INTERVAL})")
+    parser.add_argument("--no-cache", action="store_true", help="Recompute every run, ignoring the result cache")
+    parser.add_argument("--depth", action="store_true", help="Price fills from stored order book depth instead of flat SLIPPAGE_RATE")
+    parser.add_argument("--monte-carlo", type=int, default=0, metavar="N", help="Add Monte Carlo robustness columns with N resamples per market (e.g. 2000)")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for --monte-carlo")
+    parser.add_argument("--server", type=str, nargs="?", const=BACKTEST_SERVER_SOCKET, default=None, metavar="SOCKET", help=f"Run on the resident backtest server (default socket: {BACKTEST_SERVER_SOCKET}); not with --monte-carlo")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    with profiling("batch_backtest", args):
+        run_batch_backtest(days=args.days, use_cache=not args.no_cache, mc_sims=args.monte_carlo, mc_seed=args.seed,
+                           interval=args.interval, depth=args.depth, server=args.server)
 
 if __name__ == "__main__":
-    run_batch_backtest()
+    main()
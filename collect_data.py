@@ -1,7 +1,17 @@
 import argparse
-import os
+import time
+import numpy as np
 import pandas as pd
 from data_fetcher.upbit_api import UpbitAPI
+from utils.candle_pyramid import save_candles, update_rollups
+from utils.intervals import INTERVAL_MINUTES
+from utils.orderbook_store import snapshots_to_arrays, save_snapshots
+from utils.tick_store import ticks_from_api, append_ticks, load_coverage, add_coverage, save_coverage, covering_range
+from utils.rate_limiter import PRIORITY_BULK
+from config.settings import (
+    BASE_INTERVAL, ORDERBOOK_POLL_SECONDS, ORDERBOOK_FLUSH_SNAPSHOTS, ORDERBOOK_MARKETS_PER_REQUEST,
+    TICKS_PER_REQUEST, TICK_MAX_DAYS, TICK_FLUSH_PAGES
+)
 from config.logging_config import setup_logging, get_logger
 
 setup_logging()
@@ -9,39 +19,141 @@ logger = get_logger("DataCollector")
 
 DEFAULT_COINS = ["KRW-BTC", "KRW-ETH", "KRW-XRP", "KRW-SOL", "KRW-DOGE", "KRW-ADA"]
 
-def collect_data(days, coins):
-    api = UpbitAPI()
-    data_dir = "data"
+def collect_data(days, coins, interval=BASE_INTERVAL):
+    # Bulk priority: the live bot's requests go first in the shared rate budget
+    api = UpbitAPI(priority=PRIORITY_BULK)
     
-    if not os.path.exists(data_dir):
-        os.makedirs(data_dir)
-        
     for market in coins:
-        logger.info(f"Collecting data for {market} ({days} days)...")
+        logger.info(f"Collecting data for {market} ({days} days, {interval})...")
         try:
-            df = api.get_ohlcv(market=market, interval="minute60", days=days)
+            df = api.get_ohlcv(market=market, interval=interval, days=days)
             if not df.empty:
-                file_path = os.path.join(data_dir, f"{market}.csv")
-                df.to_csv(file_path, index=False)
+                # Coarser intervals are rolled up from these candles, not fetched
+                file_path = save_candles(market, df, interval=interval)
                 logger.info(f"Saved {len(df)} rows to {file_path}")
             else:
                 logger.warning(f"No data found for {market}")
         except Exception as e:
             logger.error(f"Failed to collect {market}: {e}")
 
+def collect_orderbooks(coins, poll_seconds=ORDERBOOK_POLL_SECONDS, duration=None,
+                       flush_every=ORDERBOOK_FLUSH_SNAPSHOTS, data_dir="data", api=None):
+    """
+    Poll /v1/orderbook for all coins (ORDERBOOK_MARKETS_PER_REQUEST markets per call)
+    every poll_seconds, for `duration` seconds or until interrupted. Snapshots are
+    buffered per market and written as compressed parts (utils/orderbook_store.py).
+    """
+    api = api or UpbitAPI(priority=PRIORITY_BULK)
+    buffers = {market: [] for market in coins}
+    deadline = time.time() + duration if duration else None
+    polls = 0
+
+    def flush(market):
+        if buffers[market]:
+            path = save_snapshots(market, snapshots_to_arrays(buffers[market]), data_dir=data_dir)
+            logger.info(f"Saved {len(buffers[market])} orderbook snapshots to {path}")
+            buffers[market] = []
+
+    logger.info(f"Collecting orderbooks for {len(coins)} markets every {poll_seconds}s...")
+    try:
+        while deadline is None or time.time() < deadline:
+            started = time.time()
+            for i in range(0, len(coins), ORDERBOOK_MARKETS_PER_REQUEST):
+                for snapshot in api.get_orderbooks(coins[i:i + ORDERBOOK_MARKETS_PER_REQUEST]):
+                    if snapshot.get('market') in buffers and snapshot.get('orderbook_units'):
+                        buffers[snapshot['market']].append(snapshot)
+            polls += 1
+            for market in coins:
+                if len(buffers[market]) >= flush_every:
+                    flush(market)
+            time.sleep(max(0.0, poll_seconds - (time.time() - started)))
+    except KeyboardInterrupt:
+        logger.info("Stopping orderbook collection.")
+    finally:
+        for market in coins:
+            flush(market)
+    return polls
+
+def collect_ticks(coins, days=1, data_dir="data", api=None):
+    """
+    Page through /v1/trades/ticks (newest first) for the latest `days` trading days
+    (Upbit keeps TICK_MAX_DAYS) and append them to the tick store. The id ranges
+    paged through without a hole are recorded with each flush (tick_store coverage);
+    paging jumps over a covered range instead of stopping at it, so repeated runs
+    fetch little but what is new, and a day cut short by an interrupted run is
+    completed by the next one.
+    """
+    api = api or UpbitAPI(priority=PRIORITY_BULK)
+    for market in coins:
+        coverage = load_coverage(market, data_dir)
+        added = 0
+        for days_ago in range(min(days, TICK_MAX_DAYS)):
+            cursor, pages = None, []
+            top = low = None # ids [low, top] paged through by this query without a hole
+
+            def flush():
+                nonlocal coverage, pages, added
+                if pages:
+                    added += append_ticks(market, _merge_pages(pages), data_dir)
+                    pages = []
+                if top is not None:
+                    coverage = add_coverage(coverage, low, top)
+                    save_coverage(market, coverage, data_dir)
+
+            while True:
+                raw = api.get_trade_ticks(market, count=TICKS_PER_REQUEST, cursor=cursor, days_ago=days_ago or None)
+                if not raw:
+                    break
+                ticks = ticks_from_api(raw)
+                pages.append(ticks)
+                if top is None:
+                    top = int(ticks['sequential_id'].max())
+                low = int(ticks['sequential_id'].min())
+                covered = covering_range(coverage, low)
+                if covered is not None:
+                    low = covered[0] # stored down to the range's low end; continue below it
+                if len(raw) < TICKS_PER_REQUEST:
+                    break
+                if len(pages) >= TICK_FLUSH_PAGES:
+                    flush()
+                cursor = low
+            flush()
+        logger.info(f"{market}: {added} new ticks")
+
+def _merge_pages(pages):
+    return {name: np.concatenate([page[name] for page in pages]) for name in pages[0]}
+
 def main():
     parser = argparse.ArgumentParser(description="Collect market data from Upbit")
-    parser.add_argument("--days", type=int, default=365, help="Days of history to fetch")
-    parser.add_argument("--coins", type=str, help="Comma-separated list of markets (e.g. KRW-BTC,KRW-ETH)")
+    parser.add_argument("--days", type=int, default=365, help=f"Days of history to fetch (ticks mode: at most {TICK_MAX_DAYS})")
+    parser.add_argument("--mode", type=str, default="candles", choices=['candles', 'orderbook', 'ticks'], help="What to collect (default: candles)")
+    parser.add_argument("--coins", type=str, help="Comma-separated list of markets (e.g. KRW-BTC,KRW-ETH), or 'all' for every KRW market")
+    parser.add_argument("--interval", type=str, default=BASE_INTERVAL, choices=list(INTERVAL_MINUTES), help=f"Base interval to fetch; coarser rollups are derived from it (default: {BASE_INTERVAL})")
+    parser.add_argument("--rebuild-rollups", action="store_true", help="Recompute all rollups from the stored base candles instead of fetching")
+    parser.add_argument("--poll-seconds", type=float, default=ORDERBOOK_POLL_SECONDS, help=f"Orderbook mode: seconds between snapshots (default: {ORDERBOOK_POLL_SECONDS})")
+    parser.add_argument("--duration", type=float, default=None, help="Orderbook mode: stop after this many seconds (default: run until Ctrl+C)")
     
     args = parser.parse_args()
     
-    if args.coins:
+    if args.coins == "all":
+        coins = UpbitAPI(priority=PRIORITY_BULK).get_markets("KRW")
+    elif args.coins:
         coins = [c.strip() for c in args.coins.split(",")]
     else:
         coins = DEFAULT_COINS
         
-    collect_data(args.days, coins)
+    if args.mode == "ticks":
+        collect_ticks(coins, days=args.days)
+        return
+    if args.mode == "orderbook":
+        collect_orderbooks(coins, poll_seconds=args.poll_seconds, duration=args.duration)
+        return
+    if args.rebuild_rollups:
+        for market in coins:
+            updated = update_rollups(market, base_interval=args.interval)
+            logger.info(f"Rebuilt {market} rollups: {', '.join(updated) or 'none'}")
+        return
+    collect_data(args.days, coins, interval=args.interval)
 
 if __name__ == "__main__":
     main()
@@ -1,10 +1,42 @@
+import atexit
+import datetime
+import json
 import logging
 import logging.config
+import logging.handlers
 import os
+import queue
+
+EVENT_LOGGER_NAME = "events"
+
+_listeners = []
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that enqueues the record as-is.
+    The stock prepare() formats the message in the calling thread; the queue is
+    in-process, so formatting is left to the listener thread instead.
+    """
+    def prepare(self, record):
+        return record
+
+class JsonLinesFormatter(logging.Formatter):
+    """One compact JSON object per event: {"ts", "event", ...fields}"""
+    def format(self, record):
+        event = {
+            'ts': datetime.datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'event': record.getMessage(),
+        }
+        event.update(getattr(record, 'fields', {}))
+        return json.dumps(event, default=str, separators=(',', ':'), ensure_ascii=False)
+
+def setup_logging(default_level=logging.INFO, use_queue=False):
+    """Setup logging configuration
+
+    use_queue=True moves all handler I/O (console, file, rotation, event log)
+    to a background listener thread; log calls only enqueue the record.
+    """
 
-def setup_logging(default_level=logging.INFO):
-    """Setup logging configuration"""
-    
     log_dir = "logs"
     if not os.path.exists(log_dir):
         os.makedirs(log_dir)
@@ -16,6 +48,9 @@ def setup_logging(default_level=logging.INFO):
             'standard': {
                 'format': '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
             },
+            'jsonl': {
+                '()': JsonLinesFormatter
+            },
         },
         'handlers': {
             'console': {
@@ -32,6 +67,23 @@ def setup_logging(default_level=logging.INFO):
                 'maxBytes': 10485760,  # 10MB
                 'backupCount': 5,
                 'encoding': 'utf8'
+            },
+            'events': {
+                'class': 'logging.handlers.RotatingFileHandler',
+                'level': logging.INFO,
+                'formatter': 'jsonl',
+                'filename': os.path.join(log_dir, 'events.jsonl'),
+                'maxBytes': 52428800,  # 50MB
+                'backupCount': 5,
+                'encoding': 'utf8'
+            }
+        },
+        'loggers': {
+            # Structured trade/decision events, kept out of the human log
+            EVENT_LOGGER_NAME: {
+                'level': logging.INFO,
+                'handlers': ['events'],
+                'propagate': False
             }
         },
         'root': {
@@ -40,7 +92,39 @@ def setup_logging(default_level=logging.INFO):
         }
     }
 
+    _stop_listeners()
     logging.config.dictConfig(logging_config)
-    
+
+    if use_queue:
+        _attach_queue(logging.getLogger())
+        _attach_queue(logging.getLogger(EVENT_LOGGER_NAME))
+
+def _attach_queue(logger):
+    """Replace the logger's handlers with a QueueHandler served by a background listener"""
+    handlers = list(logger.handlers)
+    for handler in handlers:
+        logger.removeHandler(handler)
+
+    log_queue = queue.SimpleQueue()
+    logger.addHandler(DeferredQueueHandler(log_queue))
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+
+    if not _listeners:
+        atexit.register(_stop_listeners)
+    _listeners.append(listener)
+
+def _stop_listeners():
+    """Drain queued records and stop listener threads"""
+    while _listeners:
+        _listeners.pop().stop()
+
 def get_logger(name):
     return logging.getLogger(name)
+
+def log_event(event, **fields):
+    """
+    Write a structured event (one JSON line) to logs/events.jsonl.
+    e.g. log_event("order", market="KRW-BTC", side="bid", amount=100000)
+    """
+    logging.getLogger(EVENT_LOGGER_NAME).info(event, extra={'fields': fields})
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -14,6 +15,10 @@ TRADING_MODE_LABEL = "모의거래" if MOCK_TRADING else "실거래"
 # Trading Parameters
 TARGET_COIN = "KRW-BTC"  # Default, can be overridden
 TICKER_INTERVAL = "minute60"  # 1 hour
+BASE_INTERVAL = "minute1"  # Resolution collected into the store; coarser ones are rollups
+ROLLUP_INTERVALS = ("minute5", "minute15", "minute60", "minute240", "day")  # Maintained by utils/candle_pyramid.py
+SYNTHETIC_DATA_END = "2025-01-01 00:00"  # Newest synthetic candle: fixed so a seed gives the same data (and data fingerprint) everywhere
+LIVE_CANDLE_CAPACITY = 400  # Candles kept in the live bot's ring buffer
 RSI_PERIOD = 14
 RSI_OVERSOLD = 44  # Default, optimization will override
 RSI_OVERBOUGHT = 70
@@ -27,6 +32,16 @@ MACD_FAST = 12
 MACD_SLOW = 26
 MACD_SIGNAL = 9
 
+# Distributed Sweeps (sweep.py, backtester/job_queue.py)
+JOB_LEASE_SECONDS = 300 # a unit not renewed for this long is handed to another worker
+JOB_MAX_ATTEMPTS = 3 # attempts per unit (errors and expired leases) before it is marked failed
+JOB_POLL_SECONDS = 5 # idle workers re-check for expired leases this often
+
+# Backtest Server (backtest_server.py; --server on the backtest/optimize CLIs)
+BACKTEST_SERVER_SOCKET = "results/backtest_server.sock"
+BACKTEST_SERVER_WORKERS = 2 # requests (or optimize grid points) run concurrently
+BACKTEST_SERVER_CACHE_ENTRIES = 16 # candle frames and indicator frames kept in memory, each
+
 # Strategy Risk Management
 STOP_LOSS_PCT = 1.0  # 3.0%
 TAKE_PROFIT_PCT = 10.0  # 35.0%
@@ -55,8 +70,72 @@ ATR_VOLATILITY_THRESHOLD = 1.5 # ATR Filter: ATR(t) / ATR(t-5) > 1.5
 MAX_CONSECUTIVE_LOSSES = 2
 COOLDOWN_CANDLES = 5
 
+# Strategy Ensemble (ensemble.py, backtester/ensemble.py)
+# 'entry': 'trend' (EMA/BB/volume) or 'reversal' (RSI + MACD); other keys override SignalGenerator / engine defaults
+ENSEMBLE_STRATEGIES = [
+    {'name': 'trend', 'entry': 'trend'},
+    {'name': 'reversal', 'entry': 'reversal', 'rsi_oversold': RSI_OVERSOLD},
+    {'name': 'reversal-rsi7', 'entry': 'reversal', 'rsi_oversold': RSI_OVERSOLD, 'rsi_period': 7},
+]
+LIVE_SHADOW_STRATEGIES = False # also run ENSEMBLE_STRATEGIES as virtual books in the live loop (events log only)
+
+# Indicator computation (strategy/indicator_kernel.py)
+INDICATOR_KERNEL = True # fused NumPy kernel; False = one pandas call per indicator
+INDICATOR_KERNEL_RTOL = 1e-9 # max deviation from the pandas indicators accepted by check_kernel()
+
+# Monte Carlo Robustness (backtester/monte_carlo.py)
+MC_SIMULATIONS = 2000  # Resamples per method
+MC_BLOCK_SIZE = 24  # Candles per bootstrap block (1 day of hourly candles)
+MC_COST_JITTER = 0.5  # Per-trade slippage/fee rates drawn from rate * U(1 - j, 1 + j)
+
+# Order Book Snapshots (collect_data.py --mode orderbook, backtester/execution.py)
+ORDERBOOK_POLL_SECONDS = 10  # Seconds between snapshots of every market
+ORDERBOOK_FLUSH_SNAPSHOTS = 360  # Snapshots per market buffered before writing a part file (1h at 10s)
+ORDERBOOK_MARKETS_PER_REQUEST = 50  # Markets per /v1/orderbook call
+ORDERBOOK_MAX_AGE_SECONDS = 3600  # Fills further than this from any snapshot use SLIPPAGE_RATE
+
+# Trade Ticks (collect_data.py --mode ticks, utils/tick_store.py)
+TICKS_PER_REQUEST = 500  # Upbit max per /v1/trades/ticks call
+TICK_MAX_DAYS = 7  # Upbit serves trades of the last 7 days only
+TICK_FLUSH_PAGES = 100  # Pages buffered per market before appending to the store
+
+# Upbit Rate Limits (utils/rate_limiter.py), shared by every process on this host
+UPBIT_API_URL = os.getenv("UPBIT_API_URL", "https://api.upbit.com")  # e.g. http://127.0.0.1:8765 for fake_upbit_server.py
+UPBIT_TIMEOUT = 10  # HTTP timeout (seconds)
+UPBIT_RATE_LIMITS = {
+    'quotation': (8, 8),  # (requests/sec, burst) for candles/ticker (Upbit: 10/sec per IP)
+    'exchange': (6, 6),  # accounts/orders (Upbit: 8/sec for orders)
+}
+RATE_LIMIT_BULK_RESERVE = 2  # Tokens bulk collection leaves for orders and live data
+RATE_LIMIT_DIR = os.getenv("UPBIT_RATE_LIMIT_DIR", os.path.join(tempfile.gettempdir(), "upbit_rate"))
+
+# Live Loop Scheduling
+SCHEDULE_OFFSET_SECONDS = 60  # Run signals 1 minute after each candle close (e.g. 09:01)
+STOP_CHECK_INTERVAL_SECONDS = 60  # Intra-candle stop checks while in position
+STOP_CHECK_OFFSET_SECONDS = 5
+
+# Warm-start Snapshot (live bot)
+SNAPSHOT_DIR = "state"
+SNAPSHOT_MAX_AGE_HOURS = 6  # Older snapshots are ignored (full reload instead)
+
 # Telegram
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
 
 TELEGRAM_PREFIX = f"[Upbit Coin Trading Bot][{TRADING_MODE_LABEL}][{TARGET_COIN}]"
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
+TELEGRAM_QUEUE_SIZE = 1000  # Max queued notifications (new ones are dropped when full)
+TELEGRAM_BATCH_WINDOW = 1.0  # Seconds to coalesce messages into one post
+TELEGRAM_MIN_INTERVAL = 1.0  # Min seconds between posts (Telegram: ~1 msg/sec per chat)
+TELEGRAM_TIMEOUT = 10  # HTTP timeout (seconds)
+
+# Fake Upbit Server (fake_upbit_server.py, data_fetcher/fake_upbit.py)
+FAKE_UPBIT_PORT = 8765
+FAKE_UPBIT_INITIAL_KRW = 10000000  # KRW balance of the in-memory ledger
+FAKE_UPBIT_HISTORY_DAYS = 400  # Candles kept in memory per market and interval
+FAKE_UPBIT_RATE_LIMITS = {'quotation': 10, 'order': 8, 'exchange': 30}  # requests/sec per group before 429 (Upbit's limits)
+
+# Live Cycle Load Test (load_test.py)
+LOAD_TEST_DEADLINE_SECONDS = 60  # A cycle (all markets, orders, notifications) must finish within this
+LOAD_TEST_MARKET_STEPS = [10, 50, 100, 200]  # Markets per step of the capacity curve
+LOAD_TEST_LATENCY_STEPS = [0, 50, 200]  # Injected API latency (ms) per step
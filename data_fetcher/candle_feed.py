@@ -0,0 +1,89 @@
+import datetime
+import numpy as np
+import pandas as pd
+from utils.candle_buffer import CandleRingBuffer
+from utils.intervals import interval_to_timedelta
+from config.logging_config import get_logger
+
+logger = get_logger("CandleFeed")
+
+MAX_CANDLES_PER_REQUEST = 200 # Upbit candle endpoint limit
+MAX_GAP_RETRIES = 3
+
+class LiveCandleFeed:
+    """
+    Keeps the live bot's candle window in a ring buffer and refreshes only the tail:
+    each cycle fetches the candles after the last stored timestamp (normally
+    count=2: the just-closed candle and the new forming one) and repairs gaps.
+    """
+    def __init__(self, api, market, interval, capacity=400, history_days=10):
+        self.api = api
+        self.market = market
+        self.interval = interval
+        self.interval_td = interval_to_timedelta(interval)
+        self.history_days = history_days
+        self.buffer = CandleRingBuffer(capacity)
+        self.requests = 0
+        self._gap_retries = {}
+
+    def load(self, df):
+        """Seed the buffer (e.g. from a warm-start snapshot)"""
+        self.buffer.clear()
+        self.buffer.extend(df.tail(self.buffer.capacity))
+
+    def refresh(self, now=None):
+        now = now or datetime.datetime.now()
+        last = self.buffer.last_timestamp()
+        if last is None:
+            self._reload()
+            return
+
+        # Candles to fetch: the newest stored one (it was still forming when fetched)
+        # plus every candle opened since. One hour later that is count=2.
+        count = int((now - last.to_pydatetime()) / self.interval_td) + 1
+        if count > MAX_CANDLES_PER_REQUEST:
+            logger.info(f"{count} candles behind. Reloading full history.")
+            self._reload()
+            return
+
+        new = self._fetch(count=max(2, count))
+        if new.empty:
+            logger.warning("No candles returned on refresh.")
+            return
+        self.buffer.extend(new)
+        self._repair_gaps(now)
+
+    def _fetch(self, count, to=None):
+        self.requests += 1
+        return self.api.candles_to_df(self.api.get_candles(self.market, self.interval, count=count, to=to))
+
+    def _reload(self):
+        self.buffer.clear()
+        self.requests += 1
+        self.buffer.extend(self.api.get_ohlcv(market=self.market, interval=self.interval, days=self.history_days))
+
+    def _repair_gaps(self, now):
+        """
+        Re-fetch around missing candles. Upbit omits candles with no trades, so a
+        gap that is still empty after MAX_GAP_RETRIES re-fetches is accepted.
+        """
+        interval_ns = int(self.interval_td.total_seconds() * 1e9)
+        times = self.buffer.times_ns()
+        for i in self.buffer.gaps(interval_ns):
+            gap_start = int(times[i]) + interval_ns
+            if self._gap_retries.get(gap_start, 0) >= MAX_GAP_RETRIES:
+                continue
+            self._gap_retries[gap_start] = self._gap_retries.get(gap_start, 0) + 1
+
+            count = int((now - pd.Timestamp(gap_start).to_pydatetime()) / self.interval_td) + 2
+            if count > MAX_CANDLES_PER_REQUEST:
+                continue
+            new = self._fetch(count=count)
+            if new.empty:
+                continue
+            filled = new['datetime'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+            if np.any((filled >= gap_start) & (filled < times[i + 1])):
+                logger.info(f"Repairing gap at {pd.Timestamp(gap_start)}")
+                self.buffer.truncate_from(gap_start)
+                self.buffer.extend(new)
+            return # times view is stale after a repair; remaining gaps are checked next cycle
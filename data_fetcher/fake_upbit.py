@@ -0,0 +1,505 @@
+import os
+import sys
+import json
+import math
+import time
+import uuid
+import random
+import threading
+import jwt
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+import numpy as np
+import pandas as pd
+from utils.data_loader import load_data, data_version, INDEX_FILE
+from utils.orderbook_store import load_orderbook
+from utils.intervals import INTERVAL_MINUTES
+from config.logging_config import get_logger
+from config.settings import (
+    TRADE_FEE_RATE, SLIPPAGE_RATE, FAKE_UPBIT_INITIAL_KRW, FAKE_UPBIT_HISTORY_DAYS, FAKE_UPBIT_RATE_LIMITS
+)
+
+logger = get_logger("FakeUpbit")
+
+# Stand-in for api.upbit.com, served from the local candle store and an
+# in-memory ledger, with injected latency, errors and 429s (fake_upbit_server.py).
+#   GET  /v1/market/all, /v1/candles/minutes/<unit>, /v1/candles/days|weeks,
+#        /v1/ticker, /v1/orderbook                       quotation group
+#   GET  /v1/accounts, /v1/order?uuid=|identifier=      exchange group
+#   POST /v1/orders                                      order group
+#        (exchange and order: Bearer JWT required; its signature is not verified, a reused nonce is rejected)
+#   POST /bot<token>/sendMessage                         Telegram stand-in (TELEGRAM_API_URL), never rate limited
+#   GET  /fake/stats, POST /fake/config|clock|reset      control, never delayed or failed
+# The exchange clock is KST; --as-of shifts it into the stored history. The
+# candle containing "now" is served with its stored (final) values.
+
+KST_OFFSET = pd.Timedelta(hours=9)
+MAX_CANDLES = 200
+SYNTHETIC_LEVELS = 15 # order book levels around the price when no snapshot is stored
+SYNTHETIC_LEVEL_KRW = 5_000_000 # size of each synthetic level
+LATENCY_DISTRIBUTIONS = ('fixed', 'uniform', 'normal', 'exponential')
+QUOTE_CURRENCY = "KRW"
+MAX_NONCES = 100_000 # remembered JWT nonces
+
+class FakeUpbitError(Exception):
+    """Answered as Upbit's error body: {"error": {"name": ..., "message": ...}}"""
+    def __init__(self, status, name, message):
+        super().__init__(message)
+        self.status = status
+        self.name = name
+
+class FaultInjector:
+    """
+    Per-request latency (latency_ms plus a jitter drawn from `distribution` with
+    scale jitter_ms), random server errors and per-second request limits per group.
+    """
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, distribution='fixed', error_rate=0.0, error_status=500,
+                 rate_limits=FAKE_UPBIT_RATE_LIMITS, seed=None):
+        self.lock = threading.Lock()
+        self.rng = random.Random(seed)
+        self.windows = {} # group -> [second, requests]
+        self.configure(latency_ms=latency_ms, jitter_ms=jitter_ms, distribution=distribution,
+                       error_rate=error_rate, error_status=error_status, rate_limits=dict(rate_limits))
+
+    def configure(self, **settings):
+        unknown = set(settings) - {'latency_ms', 'jitter_ms', 'distribution', 'error_rate', 'error_status', 'rate_limits'}
+        if unknown:
+            raise ValueError(f"Unknown fault settings: {', '.join(sorted(unknown))}")
+        if settings.get('distribution', 'fixed') not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution (expected one of {', '.join(LATENCY_DISTRIBUTIONS)})")
+        with self.lock:
+            for name, value in settings.items():
+                if name == 'rate_limits':
+                    value = {**getattr(self, 'rate_limits', {}), **value}
+                setattr(self, name, value)
+
+    def settings(self):
+        return {name: getattr(self, name) for name in
+                ('latency_ms', 'jitter_ms', 'distribution', 'error_rate', 'error_status', 'rate_limits')}
+
+    def delay(self):
+        """Seconds to hold this response"""
+        with self.lock:
+            jitter = {
+                'fixed': lambda: 0.0,
+                'uniform': lambda: self.rng.uniform(0, self.jitter_ms),
+                'normal': lambda: abs(self.rng.gauss(0, self.jitter_ms)),
+                'exponential': lambda: self.rng.expovariate(1 / self.jitter_ms) if self.jitter_ms else 0.0,
+            }[self.distribution]()
+        return max(self.latency_ms + jitter, 0.0) / 1000
+
+    def fail(self):
+        with self.lock:
+            return self.rng.random() < self.error_rate
+
+    def admit(self, group):
+        """(admitted, requests left this second) for one request of `group` (limit 0 = unlimited)"""
+        limit = self.rate_limits.get(group, 0)
+        second = int(time.time())
+        with self.lock:
+            window = self.windows.setdefault(group, [second, 0])
+            if window[0] != second:
+                window[0], window[1] = second, 0
+            if limit and window[1] >= limit:
+                return False, 0
+            window[1] += 1
+            return True, max(limit - window[1], 0) if limit else None
+
+class FakeExchange:
+    """Markets, candles and prices from the store; accounts and orders in memory"""
+    def __init__(self, data_dir="data", initial_krw=FAKE_UPBIT_INITIAL_KRW, as_of=None,
+                 history_days=FAKE_UPBIT_HISTORY_DAYS, fee_rate=TRADE_FEE_RATE, slippage_rate=SLIPPAGE_RATE):
+        self.data_dir = data_dir
+        self.initial_krw = initial_krw
+        self.history_days = history_days
+        self.fee_rate = fee_rate
+        self.slippage_rate = slippage_rate
+        self.offset = pd.Timestamp(as_of) - self._real_now() if as_of is not None else pd.Timedelta(0)
+        self.frames = {} # (market, interval) -> (version, datetime ns array, frame)
+        self.price_intervals = {} # market -> finest stored interval
+        self.lock = threading.Lock()
+        self.reset()
+
+    @staticmethod
+    def _real_now():
+        return pd.Timestamp(time.time(), unit='s') + KST_OFFSET
+
+    def now(self):
+        """Exchange time (naive KST, like the store)"""
+        return self._real_now() + self.offset
+
+    def set_time(self, as_of):
+        """Move the exchange clock to `as_of` (KST); it runs on from there"""
+        self.offset = pd.Timestamp(as_of) - self._real_now()
+
+    def reset(self):
+        with self.lock:
+            self.accounts = {QUOTE_CURRENCY: {'balance': float(self.initial_krw), 'locked': 0.0, 'avg_buy_price': 0.0}}
+            self.orders = {}
+
+    # --- Quotation ---
+
+    def markets(self):
+        if not os.path.isdir(self.data_dir):
+            return []
+        found = set()
+        for name in os.listdir(self.data_dir):
+            path = os.path.join(self.data_dir, name)
+            if name.endswith(".csv") and os.path.isfile(path):
+                found.add(name[:-4])
+            elif os.path.isdir(path) and any(os.path.exists(os.path.join(path, i, INDEX_FILE)) for i in INTERVAL_MINUTES):
+                found.add(name)
+        return sorted(found)
+
+    def _frame(self, market, interval):
+        version = data_version(market, interval, self.data_dir)
+        if version is None:
+            raise FakeUpbitError(404, "not_found", f"No {interval} candles stored for {market}")
+        with self.lock:
+            entry = self.frames.get((market, interval))
+            if entry is None or entry[0] != version:
+                df = load_data(market, self.history_days, data_dir=self.data_dir, interval=interval)
+                if df is None or df.empty:
+                    raise FakeUpbitError(404, "not_found", f"No {interval} candles stored for {market}")
+                entry = (version, df['datetime'].to_numpy(dtype='datetime64[ns]'), df)
+                self.frames[market, interval] = entry
+            return entry[1], entry[2]
+
+    def candles(self, market, interval, count=MAX_CANDLES, to=None):
+        """Newest first, started at or before now and before `to` (UTC unless it has an offset), like Upbit"""
+        times, df = self._frame(market, interval)
+        end = self.now()
+        if to:
+            to = pd.Timestamp(to)
+            to = to.tz_convert('UTC').tz_localize(None) if to.tzinfo else to
+            end = min(end, to + KST_OFFSET - pd.Timedelta(1))
+        stop = int(np.searchsorted(times, np.datetime64(end, 'ns'), side='right'))
+        rows = df.iloc[max(stop - min(int(count), MAX_CANDLES), 0):stop]
+        unit = INTERVAL_MINUTES[interval]
+        candles = []
+        for row in rows.itertuples(index=False):
+            utc = row.datetime - KST_OFFSET
+            candles.append({
+                'market': market,
+                'candle_date_time_utc': utc.strftime('%Y-%m-%dT%H:%M:%S'),
+                'candle_date_time_kst': row.datetime.strftime('%Y-%m-%dT%H:%M:%S'),
+                'opening_price': row.open, 'high_price': row.high, 'low_price': row.low, 'trade_price': row.close,
+                'timestamp': int((utc + pd.Timedelta(minutes=unit)).value // 10**6),
+                'candle_acc_trade_price': row.close * row.volume,
+                'candle_acc_trade_volume': row.volume,
+                'unit': unit,
+            })
+        return candles[::-1]
+
+    def price(self, market):
+        """Close of the finest stored candle at or before now"""
+        interval = self.price_intervals.get(market)
+        if interval is None:
+            interval = next((i for i in INTERVAL_MINUTES if data_version(market, i, self.data_dir) is not None), None)
+            if interval is None:
+                raise FakeUpbitError(404, "not_found", f"Code not found: {market}")
+            self.price_intervals[market] = interval
+        times, df = self._frame(market, interval)
+        i = int(np.searchsorted(times, np.datetime64(self.now(), 'ns'), side='right')) - 1
+        return float(df['close'].iat[max(i, 0)])
+
+    def ticker(self, markets):
+        now = self.now() - KST_OFFSET
+        return [{
+            'market': market, 'trade_price': self.price(market),
+            'trade_date': now.strftime('%Y%m%d'), 'trade_time': now.strftime('%H%M%S'),
+            'timestamp': int(now.value // 10**6),
+        } for market in markets]
+
+    def orderbook(self, market):
+        """The stored snapshot at or before now (within the hour), else levels around the price"""
+        now = self.now()
+        book = load_orderbook(market, data_dir=self.data_dir, start=now - pd.Timedelta(hours=1), end=now)
+        if book is not None:
+            i = int(np.searchsorted(book['time'], int(now.value // 10**6), side='right')) - 1
+            if i >= 0:
+                units = [{'ask_price': float(a), 'bid_price': float(b), 'ask_size': float(asz), 'bid_size': float(bsz)}
+                         for a, b, asz, bsz in zip(book['ask_price'][i], book['bid_price'][i], book['ask_size'][i], book['bid_size'][i])
+                         if a > 0 or b > 0]
+                return {'market': market, 'timestamp': int(book['time'][i]) - 9 * 3600 * 1000, 'orderbook_units': units}
+        price = self.price(market)
+        size = SYNTHETIC_LEVEL_KRW / price
+        units = [{'ask_price': price * (1 + self.slippage_rate * (k + 1)), 'bid_price': price * (1 - self.slippage_rate * (k + 1)),
+                  'ask_size': size, 'bid_size': size} for k in range(SYNTHETIC_LEVELS)]
+        return {'market': market, 'timestamp': int((now - KST_OFFSET).value // 10**6), 'orderbook_units': units}
+
+    # --- Exchange ---
+
+    def account_list(self):
+        with self.lock:
+            return [{
+                'currency': currency, 'balance': f"{a['balance']:.8f}", 'locked': f"{a['locked']:.8f}",
+                'avg_buy_price': f"{a['avg_buy_price']:.8f}", 'avg_buy_price_modified': False, 'unit_currency': QUOTE_CURRENCY,
+            } for currency, a in self.accounts.items() if a['balance'] or a['locked'] or currency == QUOTE_CURRENCY]
+
+    def _account(self, currency):
+        return self.accounts.setdefault(currency, {'balance': 0.0, 'locked': 0.0, 'avg_buy_price': 0.0})
+
+    def place_order(self, market, side, ord_type, volume=None, price=None, identifier=None):
+        """
+        Market orders ('price' bid = KRW amount, 'market' ask = volume) fill at once
+        at the price plus/minus slippage; marketable limit orders fill at their
+        limit, others wait (with funds locked) and are never matched.
+        """
+        if side not in ('bid', 'ask') or ord_type not in ('limit', 'price', 'market'):
+            raise FakeUpbitError(400, "validation_error", f"Unsupported order: side={side}, ord_type={ord_type}")
+        quote, currency = market.split("-", 1)
+        if quote != QUOTE_CURRENCY:
+            raise FakeUpbitError(400, "validation_error", f"Only {QUOTE_CURRENCY} markets are supported")
+        market_price = self.price(market)
+        volume = float(volume) if volume is not None else None
+        price = float(price) if price is not None else None
+
+        if ord_type == 'price' and side == 'bid':
+            fill_price, funds = market_price * (1 + self.slippage_rate), price
+            volume = funds / fill_price
+        elif ord_type == 'market' and side == 'ask':
+            fill_price = market_price * (1 - self.slippage_rate)
+            funds = volume * fill_price
+        elif ord_type == 'limit' and volume and price:
+            marketable = price >= market_price if side == 'bid' else price <= market_price
+            fill_price, funds = (price if marketable else None), volume * price
+        else:
+            raise FakeUpbitError(400, "validation_error", f"Missing price/volume for {side} {ord_type} order")
+        if funds is None or not math.isfinite(funds) or funds < 5000:
+            raise FakeUpbitError(400, "under_min_total_bid" if side == 'bid' else "under_min_total_ask",
+                                 "Minimum order total is 5000 KRW")
+
+        fee = funds * self.fee_rate
+        with self.lock:
+            krw, coin = self._account(QUOTE_CURRENCY), self._account(currency)
+            if side == 'bid' and krw['balance'] < funds + fee:
+                raise FakeUpbitError(400, "insufficient_funds_bid", "Insufficient KRW balance")
+            if side == 'ask' and coin['balance'] < volume - 1e-12:
+                raise FakeUpbitError(400, "insufficient_funds_ask", f"Insufficient {currency} balance")
+
+            if fill_price is None: # resting limit order
+                state = 'wait'
+                if side == 'bid':
+                    krw['balance'] -= funds + fee
+                    krw['locked'] += funds + fee
+                else:
+                    coin['balance'] -= volume
+                    coin['locked'] += volume
+            else:
+                state = 'done'
+                if side == 'bid':
+                    held = coin['balance'] * coin['avg_buy_price']
+                    krw['balance'] -= funds + fee
+                    coin['balance'] += volume
+                    coin['avg_buy_price'] = (held + funds) / coin['balance']
+                else:
+                    coin['balance'] = max(coin['balance'] - volume, 0.0)
+                    krw['balance'] += funds - fee
+            order = {
+                'uuid': str(uuid.uuid4()), 'side': side, 'ord_type': ord_type, 'price': price, 'state': state,
+                'market': market, 'identifier': identifier, 'created_at': (self.now()).strftime('%Y-%m-%dT%H:%M:%S+09:00'),
+                'volume': volume, 'remaining_volume': volume if state == 'wait' else 0.0,
+                'reserved_fee': fee, 'remaining_fee': fee if state == 'wait' else 0.0,
+                'paid_fee': 0.0 if state == 'wait' else fee, 'locked': funds + fee if state == 'wait' else 0.0,
+                'executed_volume': 0.0 if state == 'wait' else volume, 'trades_count': 0 if state == 'wait' else 1,
+                'avg_price': fill_price,
+            }
+            self.orders[order['uuid']] = order
+            return order
+
+    def order(self, order_uuid=None, identifier=None):
+        with self.lock:
+            if order_uuid in self.orders:
+                return self.orders[order_uuid]
+            for order in self.orders.values():
+                if identifier is not None and order['identifier'] == identifier:
+                    return order
+            raise FakeUpbitError(404, "order_not_found", "Order not found")
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # keep-alive for clients with sessions
+    disable_nagle_algorithm = True # headers and body go out as separate writes
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def _handle(self, method):
+        server = self.server
+        started = time.perf_counter()
+        url = urlparse(self.path)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b""
+        headers = {}
+        try:
+            if url.path.startswith("/fake/"):
+                status, payload = 200, server.control(method, url.path, json.loads(body or b"{}"))
+            else:
+                route = server.route(method, url.path)
+                group = route[0]
+                if group in ('exchange', 'order'):
+                    server.check_token(self.headers.get('Authorization', ''))
+                admitted, remaining = server.faults.admit(group)
+                if remaining is not None:
+                    headers['Remaining-Req'] = f"group={group}; min={remaining * 60}; sec={remaining}"
+                delay = server.faults.delay()
+                if delay:
+                    time.sleep(delay)
+                if not admitted:
+                    raise FakeUpbitError(429, "too_many_requests", "Too many API requests.")
+                if server.faults.fail():
+                    raise FakeUpbitError(server.faults.error_status, "server_error", "Injected failure")
+                if body:
+                    query.update(json.loads(body))
+                status, payload = 200 if method == 'GET' else 201, route[1](query, url.path)
+        except FakeUpbitError as e:
+            status, payload = e.status, {'error': {'name': e.name, 'message': str(e)}}
+        except (ValueError, KeyError, TypeError) as e:
+            status, payload = 400, {'error': {'name': 'validation_error', 'message': str(e)}}
+        except Exception as e:
+            logger.error(f"Fake Upbit request failed: {e}", exc_info=True)
+            status, payload = 500, {'error': {'name': 'server_error', 'message': str(e)}}
+        server.record(url.path, status, time.perf_counter() - started)
+
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+class FakeUpbitServer(ThreadingHTTPServer):
+    """HTTP server for a FakeExchange and a FaultInjector; one thread per connection"""
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, exchange=None, faults=None):
+        self.exchange = exchange if exchange is not None else FakeExchange()
+        self.faults = faults if faults is not None else FaultInjector()
+        self.stats_lock = threading.Lock()
+        self.nonces = {} # nonces seen, oldest first
+        self.reset_stats()
+        super().__init__((host, port), _Handler)
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def handle_error(self, request, client_address):
+        # Clients that gave up on a delayed response (timeouts) close the socket before the reply
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            logger.debug(f"Client {client_address[0]}:{client_address[1]} disconnected before the response")
+            return
+        super().handle_error(request, client_address)
+
+    def serve_in_background(self):
+        """Serve from a daemon thread (e.g. inside a load test); returns the thread"""
+        thread = threading.Thread(target=self.serve_forever, daemon=True, name="fake-upbit")
+        thread.start()
+        return thread
+
+    def route(self, method, path):
+        """(rate-limit group, handler(query, path)) of an Upbit endpoint"""
+        exchange = self.exchange
+        if method == 'GET':
+            if path == "/v1/market/all":
+                return 'quotation', lambda q, p: [{'market': m, 'korean_name': m, 'english_name': m} for m in exchange.markets()]
+            if path.startswith("/v1/candles/"):
+                return 'quotation', self._candles
+            if path == "/v1/ticker":
+                return 'quotation', lambda q, p: exchange.ticker(q['markets'].split(","))
+            if path == "/v1/orderbook":
+                return 'quotation', lambda q, p: [exchange.orderbook(m) for m in q['markets'].split(",")]
+            if path == "/v1/accounts":
+                return 'exchange', lambda q, p: exchange.account_list()
+            if path == "/v1/order":
+                return 'exchange', lambda q, p: exchange.order(q.get('uuid'), q.get('identifier'))
+        elif method == 'POST' and path == "/v1/orders":
+            return 'order', lambda q, p: exchange.place_order(q['market'], q['side'], q['ord_type'],
+                                                              volume=q.get('volume'), price=q.get('price'),
+                                                              identifier=q.get('identifier'))
+        elif method == 'POST' and path.startswith("/bot") and path.endswith("/sendMessage"):
+            return 'telegram', lambda q, p: {'ok': True, 'result': {'chat': {'id': q['chat_id']}, 'text': q['text']}}
+        raise FakeUpbitError(404, "not_found", f"{method} {path} is not served by the fake Upbit server")
+
+    def check_token(self, authorization):
+        """
+        Bearer JWT with a fresh nonce. The signature is not verified, but a nonce
+        is spent even by a request that is then rate limited, like Upbit.
+        """
+        if not authorization.startswith('Bearer '):
+            raise FakeUpbitError(401, "jwt_verification", "Missing or invalid Authorization header")
+        try:
+            nonce = jwt.decode(authorization[len('Bearer '):], options={'verify_signature': False})['nonce']
+        except (jwt.InvalidTokenError, KeyError):
+            raise FakeUpbitError(401, "jwt_verification", "Malformed JWT")
+        with self.stats_lock:
+            if nonce in self.nonces:
+                raise FakeUpbitError(401, "nonce_used", "This nonce has already been used")
+            self.nonces[nonce] = True
+            if len(self.nonces) > MAX_NONCES:
+                del self.nonces[next(iter(self.nonces))]
+
+    def _candles(self, query, path):
+        kind = path[len("/v1/candles/"):]
+        if kind.startswith("minutes/"):
+            interval = f"minute{kind[len('minutes/'):]}"
+        else:
+            interval = {'days': 'day', 'weeks': 'week'}.get(kind)
+        if interval not in INTERVAL_MINUTES:
+            raise FakeUpbitError(404, "not_found", f"Unsupported candle path: {path}")
+        return self.exchange.candles(query['market'], interval, int(query.get('count', 1)), query.get('to'))
+
+    def control(self, method, path, body):
+        if path == "/fake/stats":
+            return self.stats()
+        if method == 'POST' and path == "/fake/config":
+            self.faults.configure(**body)
+            return self.faults.settings()
+        if method == 'POST' and path == "/fake/clock":
+            self.exchange.set_time(body['as_of'])
+            return {'exchange_time': str(self.exchange.now())}
+        if method == 'POST' and path == "/fake/reset":
+            self.exchange.reset()
+            self.reset_stats()
+            return {'reset': True}
+        raise FakeUpbitError(404, "not_found", f"{method} {path}")
+
+    def record(self, path, status, seconds):
+        if path.startswith("/v1/candles/"):
+            endpoint = "/v1/candles"
+        elif path.startswith("/bot"):
+            endpoint = "/sendMessage" # without the bot token
+        else:
+            endpoint = path
+        with self.stats_lock:
+            counts = self.counts.setdefault(endpoint, {})
+            counts[status] = counts.get(status, 0) + 1
+            if not path.startswith("/fake/"):
+                self.requests += 1
+                self.seconds += seconds
+
+    def reset_stats(self):
+        with self.stats_lock:
+            self.counts = {} # endpoint -> {status: requests}
+            self.requests = 0
+            self.seconds = 0.0
+
+    def stats(self):
+        with self.stats_lock:
+            return {
+                'requests': self.requests,
+                'mean_ms': self.seconds / self.requests * 1000 if self.requests else 0.0,
+                'endpoints': {path: {str(k): v for k, v in counts.items()} for path, counts in self.counts.items()},
+                'exchange_time': str(self.exchange.now()),
+                'faults': self.faults.settings(),
+            }
@@ -2,21 +2,52 @@ import requests
 import jwt
 import uuid
 import hashlib
-from urllib.parse import urlencode
+from urllib.parse import urlencode, urlparse
 import pandas as pd
-import time
 import datetime
-from config.settings import ACCESS_KEY, SECRET_KEY
+from config.settings import ACCESS_KEY, SECRET_KEY, UPBIT_API_URL, UPBIT_TIMEOUT
+from utils.intervals import interval_minutes
 from config.logging_config import get_logger
+from utils.rate_limiter import get_rate_limiter, PRIORITY_ORDER, PRIORITY_LIVE
 
 logger = get_logger("UpbitAPI")
 
 SERVER_URL = "https://api.upbit.com"
+MAX_RATE_LIMIT_RETRIES = 2 # re-sends after a 429
+ORDER_STATE_UNKNOWN = 'unknown' # place_order() timed out and the order could not be found
 
 class UpbitAPI:
-    def __init__(self):
+    def __init__(self, priority=PRIORITY_LIVE, base_url=UPBIT_API_URL):
+        """
+        priority: rate-limit class of this instance's market data requests
+        (PRIORITY_BULK for historical collection). Orders and account calls
+        always go as PRIORITY_ORDER.
+        base_url: API host (UPBIT_API_URL, e.g. a fake_upbit_server.py instance).
+        """
         self.access_key = ACCESS_KEY
         self.secret_key = SECRET_KEY
+        self.priority = priority
+        self.base_url = base_url.rstrip("/")
+        # Another host gets its own rate budget
+        self.rate_scope = None if self.base_url == SERVER_URL else urlparse(self.base_url).netloc.replace(":", "_")
+
+    def _request(self, method, url, group, priority, signed=False, query=None, **kwargs):
+        """
+        requests.request() drawing from the host-wide rate budget (utils/rate_limiter.py).
+        A 429 makes every process on the host back off before the retry.
+        signed: authenticate with a JWT over `query`, built per attempt (Upbit rejects a reused nonce).
+        """
+        limiter = get_rate_limiter(group, self.rate_scope)
+        kwargs.setdefault('timeout', UPBIT_TIMEOUT)
+        for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+            limiter.acquire(priority)
+            if signed:
+                kwargs['headers'] = self._get_headers(query)
+            response = requests.request(method, url, **kwargs)
+            if response.status_code != 429 or attempt == MAX_RATE_LIMIT_RETRIES:
+                return response
+            limiter.penalize(1.0)
+        return response
 
     def _get_headers(self, query=None):
         payload = {
@@ -43,9 +74,9 @@ class UpbitAPI:
         """
         if "minute" in interval:
             unit = interval.replace("minute", "")
-            url = f"{SERVER_URL}/v1/candles/minutes/{unit}"
+            url = f"{self.base_url}/v1/candles/minutes/{unit}"
         else:
-            url = f"{SERVER_URL}/v1/candles/{interval}s" # day -> days
+            url = f"{self.base_url}/v1/candles/{interval}s" # day -> days
 
         params = {
             "market": market,
@@ -55,7 +86,7 @@ class UpbitAPI:
             params["to"] = to
 
         try:
-            response = requests.get(url, params=params)
+            response = self._request('GET', url, 'quotation', self.priority, params=params)
             response.raise_for_status()
             return response.json()
         except Exception as e:
@@ -75,15 +106,8 @@ class UpbitAPI:
         current_to = datetime.datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
         
         # Approximate number of requests needed
-        # 1 day = 24 hours (for minute60)
-        if interval == "minute60":
-            total_hours = days * 24
-            total_reqs = (total_hours // limit_per_req) + 2
-        elif interval == "day":
-            total_reqs = (days // limit_per_req) + 2
-        else:
-            # Default fallback calculation
-            total_reqs = 50 
+        total_candles = int(days * 1440 / interval_minutes(interval))
+        total_reqs = (total_candles // limit_per_req) + 2
 
         for i in range(total_reqs):
             candles = self.get_candles(market, interval, count=limit_per_req, to=current_to)
@@ -96,29 +120,78 @@ class UpbitAPI:
             last_candle = candles[-1]
             current_to = last_candle['candle_date_time_utc'] + "Z" # Add Z for UTC format or handle explicitly
             
-            # Upbit Request Limit handling (10 req/sec usually safe, but sleep 0.1s to be safe)
-            time.sleep(0.1) 
-            
+            # Pacing comes from the shared rate budget (see _request)
+
             # Check if we have enough data (rough check)
-            if len(all_candles) >= (days * 24 if interval == "minute60" else days):
+            if len(all_candles) >= total_candles:
                  break
 
-        if not all_candles:
+        # Filter exact date range if needed, here we just return all fetched logic
+        return self.candles_to_df(all_candles)
+
+    @staticmethod
+    def candles_to_df(candles):
+        """
+        Convert raw Upbit candle JSON into an OHLCV DataFrame sorted by time (KST)
+        """
+        if not candles:
             return pd.DataFrame()
 
-        df = pd.DataFrame(all_candles)
+        df = pd.DataFrame(candles)
         df = df[['candle_date_time_kst', 'opening_price', 'high_price', 'low_price', 'trade_price', 'candle_acc_trade_volume']]
         df.columns = ['datetime', 'open', 'high', 'low', 'close', 'volume']
         df['datetime'] = pd.to_datetime(df['datetime'])
-        df = df.sort_values('datetime').reset_index(drop=True)
-        
-        # Filter exact date range if needed, here we just return all fetched logic
+        df = df.drop_duplicates('datetime', keep='first').sort_values('datetime').reset_index(drop=True)
         return df
 
+    def get_orderbooks(self, markets):
+        """
+        Order book snapshots for several markets in one request (/v1/orderbook).
+        Returns the raw list: {market, timestamp, orderbook_units: [{ask_price, bid_price, ask_size, bid_size}, ...]}
+        """
+        url = f"{self.base_url}/v1/orderbook"
+        try:
+            response = self._request('GET', url, 'quotation', self.priority, params={"markets": ",".join(markets)})
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            logger.error(f"Failed to fetch orderbooks: {e}")
+            return []
+
+    def get_trade_ticks(self, market, count=500, cursor=None, days_ago=None):
+        """
+        Recent trades, newest first (/v1/trades/ticks). Page back with cursor=<last sequential_id>;
+        days_ago (1-7) selects an earlier day.
+        """
+        url = f"{self.base_url}/v1/trades/ticks"
+        params = {"market": market, "count": count}
+        if cursor:
+            params["cursor"] = cursor
+        if days_ago:
+            params["daysAgo"] = days_ago
+        try:
+            response = self._request('GET', url, 'quotation', self.priority, params=params)
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            logger.error(f"Failed to fetch trade ticks: {e}")
+            return []
+
+    def get_markets(self, quote="KRW"):
+        """Listed market codes with the given quote currency (e.g. KRW-BTC)"""
+        url = f"{self.base_url}/v1/market/all"
+        try:
+            response = self._request('GET', url, 'quotation', self.priority)
+            response.raise_for_status()
+            return [m['market'] for m in response.json() if m['market'].startswith(f"{quote}-")]
+        except Exception as e:
+            logger.error(f"Failed to fetch markets: {e}")
+            return []
+
     def get_current_price(self, market="KRW-BTC"):
-        url = f"{SERVER_URL}/v1/ticker"
+        url = f"{self.base_url}/v1/ticker"
         try:
-            response = requests.get(url, params={"markets": market})
+            response = self._request('GET', url, 'quotation', self.priority, params={"markets": market})
             response.raise_for_status()
             return float(response.json()[0]['trade_price'])
         except Exception as e:
@@ -127,11 +200,10 @@ class UpbitAPI:
 
     def get_balance(self, ticker="KRW"):
         """Get balance for a specific ticker (e.g., KRW, BTC)"""
-        url = f"{SERVER_URL}/v1/accounts"
-        headers = self._get_headers()
-        
+        url = f"{self.base_url}/v1/accounts"
+
         try:
-            response = requests.get(url, headers=headers)
+            response = self._request('GET', url, 'exchange', PRIORITY_ORDER, signed=True)
             response.raise_for_status()
             data = response.json()
             for account in data:
@@ -146,25 +218,49 @@ class UpbitAPI:
         """
         side: 'bid' (buy), 'ask' (sell)
         ord_type: 'limit', 'price' (market buy), 'market' (market sell)
+        Returns the order, None if it was rejected, or {'state': ORDER_STATE_UNKNOWN, ...}
+        if the request timed out after being sent and the order could not be looked up:
+        it may have filled, so the caller has to re-read its balance.
         """
-        url = f"{SERVER_URL}/v1/orders"
+        url = f"{self.base_url}/v1/orders"
         
         query = {
             'market': market,
             'side': side,
             'ord_type': ord_type,
+            'identifier': str(uuid.uuid4()), # client-side id, to look the order up after a timeout
         }
         if volume:
             query['volume'] = str(volume)
         if price:
             query['price'] = str(price)
 
-        headers = self._get_headers(query)
-
         try:
-            response = requests.post(url, json=query, headers=headers)
+            response = self._request('POST', url, 'exchange', PRIORITY_ORDER, signed=True, query=query, json=query)
             response.raise_for_status()
             return response.json()
+        except requests.ReadTimeout:
+            # Sent but unanswered: the order may exist. Never re-send it; look it up instead.
+            logger.warning(f"Order request timed out. Looking up order {query['identifier']}.")
+            order = self.get_order(identifier=query['identifier'])
+            if order is not None:
+                return order
+            logger.error(f"Order {query['identifier']} outcome unknown.")
+            return {'uuid': None, 'identifier': query['identifier'], 'state': ORDER_STATE_UNKNOWN}
         except Exception as e:
             logger.error(f"Failed to place order: {e}, Response: {response.text if 'response' in locals() else 'N/A'}")
             return None
+
+    def get_order(self, uuid=None, identifier=None):
+        """One order by uuid or by the identifier it was placed with (/v1/order); None if not found"""
+        url = f"{self.base_url}/v1/order"
+        query = {'uuid': uuid} if uuid else {'identifier': identifier}
+        try:
+            response = self._request('GET', url, 'exchange', PRIORITY_ORDER, signed=True, query=query, params=query)
+            if response.status_code == 404:
+                return None
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            logger.error(f"Failed to fetch order: {e}")
+            return None
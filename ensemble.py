@@ -0,0 +1,97 @@
+import argparse
+import json
+import time
+import pandas as pd
+from utils.data_loader import load_data
+from backtester.ensemble import StrategyEnsemble
+from backtester.execution import load_depth_model
+from backtester.metrics import METRICS
+from backtester.grid import grid_points
+from utils.intervals import INTERVAL_MINUTES
+from utils.profiler import stage, profiling, add_profile_arguments
+from config.logging_config import setup_logging, get_logger
+from config.settings import TARGET_COIN, RSI_OVERSOLD, TICKER_INTERVAL, ENSEMBLE_STRATEGIES
+
+setup_logging()
+logger = get_logger("Ensemble")
+
+def load_definitions(args):
+    """ENSEMBLE_STRATEGIES (or the --strategies JSON list), expanded over optimize.py's grid with --grid"""
+    definitions = ENSEMBLE_STRATEGIES
+    if args.strategies:
+        with open(args.strategies) as f:
+            definitions = json.load(f)
+    if not args.grid:
+        return definitions
+    expanded = []
+    for definition in definitions:
+        for point in grid_points(args.grid, definition.get('rsi_oversold', RSI_OVERSOLD)):
+            label = " ".join(f"{k}={v}" for k, v in point.items() if k != 'rsi_oversold' or args.grid == 'rsi')
+            expanded.append({**definition, **point, 'name': f"{definition['name']} {label}"})
+    return expanded
+
+def run_ensemble(args):
+    with stage("load"):
+        df = load_data(args.market, args.days, interval=args.interval)
+    if df is None or df.empty:
+        logger.error("No data loaded. Did you run 'python collect_data.py'?")
+        return
+    execution = None
+    if args.depth:
+        with stage("load"):
+            execution = load_depth_model(args.market, df['datetime'].iloc[0], df['datetime'].iloc[-1])
+
+    ensemble = StrategyEnsemble(load_definitions(args), bar_interval=args.interval, execution=execution)
+    started = time.perf_counter()
+    results = ensemble.run(df)
+    elapsed = time.perf_counter() - started
+    passes = len(ensemble.groups([ensemble.engine(d) for d in ensemble.definitions]))
+    print(f"\n{len(results)} strategies, {passes} indicator pass(es), {len(df)} {args.interval} bars: "
+          f"{elapsed:.2f}s ({elapsed / len(results) * 1000:.1f} ms per strategy)")
+
+    if args.compare:
+        # The same strategies as separate engine runs (own indicators, own candle loop each)
+        started = time.perf_counter()
+        separate = {d['name']: ensemble.engine(d, df).run() for d in ensemble.definitions}
+        separate_elapsed = time.perf_counter() - started
+        identical = all(separate[name]['final_balance'] == results[name]['final_balance'] and
+                        len(separate[name]['trades']) == len(results[name]['trades']) for name in results)
+        print(f"Separate runs: {separate_elapsed:.2f}s ({separate_elapsed / elapsed:.1f}x the ensemble), "
+              f"results identical: {identical}")
+
+    with stage("report"):
+        entries = {d['name']: d.get('entry', 'trend') for d in ensemble.definitions}
+        results_df = pd.DataFrame([
+            {'strategy': name, 'entry': entries[name], **result['metrics'], 'final_balance': result['final_balance']}
+            for name, result in results.items()
+        ])
+        # Drawdown / fee drag rank ascending, everything else descending
+        results_df = results_df.sort_values(args.rank_by, ascending=not METRICS[args.rank_by])
+        filename = f"ensemble_results_{args.market}.csv"
+        results_df.to_csv(filename, index=False)
+
+        print(f"\n{'Strategy':<32} {'Entry':<9} {'Return':>8} {'Trades':>6} {'Win%':>6} {'MDD':>7} {'Sharpe':>7}")
+        for _, row in results_df.head(args.top).iterrows():
+            print(f"{row['strategy'][:32]:<32} {row['entry']:<9} {row['return_pct']:>7.2f}% {row['total_trades']:>6.0f} "
+                  f"{row['win_rate_pct']:>6.1f} {row['max_drawdown_pct']:>6.2f}% {row['sharpe']:>7.2f}")
+        print(f"\nResults saved to {filename}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest several strategies side by side over one indicator pass")
+    parser.add_argument("--market", type=str, default=TARGET_COIN, help=f"Market to backtest (default: {TARGET_COIN})")
+    parser.add_argument("--days", type=int, default=365, help="Days of history to backtest")
+    parser.add_argument("--interval", type=str, default=TICKER_INTERVAL, choices=list(INTERVAL_MINUTES), help=f"Bar interval, loaded from the store's rollups (default: {TICKER_INTERVAL})")
+    parser.add_argument("--strategies", type=str, default=None, help="JSON file with a list of strategy definitions (default: ENSEMBLE_STRATEGIES)")
+    parser.add_argument("--grid", type=str, default=None, choices=['rsi', 'pnl'], help="Expand every strategy over optimize.py's rsi or pnl grid")
+    parser.add_argument("--depth", action="store_true", help="Price fills from stored order book depth instead of flat SLIPPAGE_RATE")
+    parser.add_argument("--compare", action="store_true", help="Also run every strategy as a separate backtest and compare time and results")
+    parser.add_argument("--rank-by", type=str, default='return_pct', choices=list(METRICS), help="Metric to rank results by (default: return_pct)")
+    parser.add_argument("--top", type=int, default=20, help="Strategies to print (default: 20; the CSV has all)")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    with profiling("ensemble", args):
+        run_ensemble(args)
+
+if __name__ == "__main__":
+    main()
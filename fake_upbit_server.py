@@ -0,0 +1,46 @@
+import argparse
+from data_fetcher.fake_upbit import FakeUpbitServer, FakeExchange, FaultInjector, LATENCY_DISTRIBUTIONS
+from config.logging_config import setup_logging, get_logger
+from config.settings import FAKE_UPBIT_PORT, FAKE_UPBIT_INITIAL_KRW, FAKE_UPBIT_HISTORY_DAYS, FAKE_UPBIT_RATE_LIMITS
+
+setup_logging()
+logger = get_logger("FakeUpbit")
+
+def main():
+    parser = argparse.ArgumentParser(description="Local fake Upbit API (candles, ticker, orderbook, accounts, orders) from the data store, with latency, error and rate-limit injection")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Bind address (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=FAKE_UPBIT_PORT, help=f"Port (default: {FAKE_UPBIT_PORT})")
+    parser.add_argument("--data-dir", type=str, default="data", help="Candle store to serve (default: data)")
+    parser.add_argument("--as-of", type=str, default=None, help="Exchange time at start (KST), e.g. 2024-06-01T09:00; the clock runs on from there")
+    parser.add_argument("--history-days", type=int, default=FAKE_UPBIT_HISTORY_DAYS, help=f"Days of candles kept in memory per market and interval (default: {FAKE_UPBIT_HISTORY_DAYS})")
+    parser.add_argument("--initial-krw", type=float, default=FAKE_UPBIT_INITIAL_KRW, help=f"KRW balance of the in-memory account (default: {FAKE_UPBIT_INITIAL_KRW:,})")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Base latency added to every API response (default: 0)")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Scale of the random latency added on top (default: 0)")
+    parser.add_argument("--latency-dist", type=str, default='fixed', choices=LATENCY_DISTRIBUTIONS, help="Jitter distribution (default: fixed = no jitter)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of API requests answered with --error-status (default: 0)")
+    parser.add_argument("--error-status", type=int, default=500, help="HTTP status of injected errors (default: 500)")
+    for group, limit in FAKE_UPBIT_RATE_LIMITS.items():
+        parser.add_argument(f"--{group}-rps", type=int, default=limit, help=f"'{group}' requests per second before 429 (default: {limit}, 0 = unlimited)")
+    parser.add_argument("--seed", type=int, default=None, help="Seed of the latency / error draws")
+    args = parser.parse_args()
+
+    exchange = FakeExchange(data_dir=args.data_dir, initial_krw=args.initial_krw, as_of=args.as_of,
+                            history_days=args.history_days)
+    faults = FaultInjector(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, distribution=args.latency_dist,
+        error_rate=args.error_rate, error_status=args.error_status, seed=args.seed,
+        rate_limits={group: getattr(args, f"{group}_rps") for group in FAKE_UPBIT_RATE_LIMITS},
+    )
+    server = FakeUpbitServer(args.host, args.port, exchange=exchange, faults=faults)
+    logger.info(f"Fake Upbit API on {server.url} ({len(exchange.markets())} markets, exchange time {exchange.now():%Y-%m-%d %H:%M})")
+    logger.info(f"Point clients at it with UPBIT_API_URL={server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        logger.info("Fake Upbit server stopped")
+
+if __name__ == "__main__":
+    main()
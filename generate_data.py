@@ -0,0 +1,65 @@
+import argparse
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from utils.data_loader import load_data
+from utils.candle_pyramid import save_candles
+from utils.intervals import INTERVAL_MINUTES
+from utils.synthetic_data import generate_market, synthetic_market_names
+from config.logging_config import setup_logging, get_logger
+from config.settings import ROLLUP_INTERVALS, SYNTHETIC_DATA_END
+
+setup_logging()
+logger = get_logger("DataGenerator")
+
+def _generate_one(task):
+    market, seed, args, source_returns = task
+    df = generate_market(
+        args.years, args.interval, seed, model=args.model,
+        source_returns=source_returns, source_interval=args.source_interval, end=args.end
+    )
+    save_candles(market, df, data_dir=args.data_dir, interval=args.interval, rollups=None if args.no_rollups else ROLLUP_INTERVALS)
+    return market, len(df)
+
+def generate_data(args):
+    markets = synthetic_market_names(args.markets, prefix=args.prefix)
+
+    source_returns = None
+    if args.model == "bootstrap":
+        source = load_data(args.bootstrap_from, data_dir=args.data_dir, interval=args.source_interval)
+        if source is None or source.empty:
+            logger.error(f"No data for {args.bootstrap_from}. Run collect_data.py first or use --model gbm.")
+            return
+        source_returns = np.diff(np.log(source['close'].to_numpy(dtype=np.float64)))
+
+    # Independent, reproducible streams per market
+    seeds = np.random.SeedSequence(args.seed).spawn(len(markets))
+    tasks = [(market, seed, args, source_returns) for market, seed in zip(markets, seeds)]
+
+    logger.info(f"Generating {len(markets)} markets ({args.interval}, {args.years} years, model={args.model})...")
+    total_rows = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        for market, rows in executor.map(_generate_one, tasks):
+            total_rows += rows
+            logger.info(f"Saved {rows} rows for {market}")
+    logger.info(f"Done: {len(markets)} markets, {total_rows} rows in '{args.data_dir}'")
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic OHLCV data for scale and load testing")
+    parser.add_argument("--markets", type=int, default=10, help="Number of synthetic markets (default: 10)")
+    parser.add_argument("--interval", type=str, default="minute60", choices=list(INTERVAL_MINUTES), help="Candle interval (default: minute60)")
+    parser.add_argument("--years", type=float, default=1.0, help="Years of history per market (default: 1)")
+    parser.add_argument("--model", type=str, default="gbm", choices=['gbm', 'bootstrap'], help="Return model: regime-switching GBM with jumps, or block bootstrap of real returns")
+    parser.add_argument("--bootstrap-from", type=str, default="KRW-BTC", help="Stored market to bootstrap returns from (default: KRW-BTC)")
+    parser.add_argument("--source-interval", type=str, default="minute60", choices=list(INTERVAL_MINUTES), help="Interval of the bootstrap source data (default: minute60)")
+    parser.add_argument("--prefix", type=str, default="SYN", help="Market name prefix, e.g. KRW-SYN0001 (default: SYN)")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed (default: 42)")
+    parser.add_argument("--end", type=str, default=SYNTHETIC_DATA_END, help=f"Time of the newest candle, or 'now' (default: {SYNTHETIC_DATA_END}, so a seed always gives the same data)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--data-dir", type=str, default="data", help="Data store directory (default: data)")
+    parser.add_argument("--no-rollups", action="store_true", help="Store only --interval, without the coarser rollups")
+
+    args = parser.parse_args()
+    generate_data(args)
+
+if __name__ == "__main__":
+    main()
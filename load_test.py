@@ -0,0 +1,394 @@
+import argparse
+import datetime
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+import requests
+from data_fetcher.upbit_api import UpbitAPI
+from data_fetcher.candle_feed import LiveCandleFeed
+from data_fetcher.fake_upbit import FakeUpbitServer, FakeExchange, FaultInjector, LATENCY_DISTRIBUTIONS
+from strategy.signal import SignalGenerator
+from backtester.ensemble import StrategyEnsemble
+from trade.trader import Trader
+from trade.live_loop import run_trading_logic
+from utils.data_loader import load_data, data_version
+from utils.candle_pyramid import save_candles
+from utils.intervals import INTERVAL_MINUTES, interval_to_timedelta
+from utils.synthetic_data import generate_market, synthetic_market_names
+from utils.rate_limiter import get_rate_limiter
+from utils.telegram_notifier import TelegramNotifier, use_notifier
+from config.logging_config import setup_logging, get_logger, EVENT_LOGGER_NAME
+from config.settings import (
+    RSI_OVERSOLD, TICKER_INTERVAL, LIVE_CANDLE_CAPACITY, SCHEDULE_OFFSET_SECONDS, UPBIT_RATE_LIMITS,
+    FAKE_UPBIT_RATE_LIMITS, LOAD_TEST_DEADLINE_SECONDS, LOAD_TEST_MARKET_STEPS, LOAD_TEST_LATENCY_STEPS
+)
+
+try:
+    import resource
+except ImportError: # Windows: no lifetime peak RSS
+    resource = None
+
+# The live loop logs every decision (and warns on every skipped buy); keep only errors
+setup_logging(logging.ERROR, use_queue=True)
+logging.getLogger(EVENT_LOGGER_NAME).disabled = True
+logger = get_logger("LoadTest")
+
+# Capacity of one bot process. Every cycle runs run_trading_logic() for each
+# market (candle refresh, indicators, stops, entry, order, notification,
+# snapshot) against a fake Upbit server in a child process, so the CPU and
+# memory reported are the bot's own. The simulated clock advances one candle
+# per cycle. Steps go up in markets and injected API latency.
+
+FEED_HISTORY_DAYS = 10 # LiveCandleFeed's first load
+PLACEHOLDER_KEY = "load-test-placeholder-key-0123456789" # HS256 wants 32+ bytes
+RSS_SAMPLE_SECONDS = 0.05 # RssSampler period during a step
+QUOTATION_ENDPOINTS = ('/v1/candles', '/v1/ticker', '/v1/orderbook', '/v1/market/all', '/v1/trades/ticks')
+COLUMNS = [
+    'markets', 'latency_ms', 'cycles', 'cycle_p50_s', 'cycle_p95_s', 'cycle_max_s', 'per_market_ms',
+    'notify_p95_s', 'total_p95_s', 'within_deadline_pct', 'api_calls', 'api_errors', 'rate_limited',
+    'orders', 'notify_posts', 'rate_floor_s', 'cpu_s', 'cpu_pct', 'rss_step_mib', 'startup_s',
+]
+
+def serve(data_dir, history_days, ready):
+    """Child process: fake Upbit server on a free port, its URL reported through `ready`"""
+    exchange = FakeExchange(data_dir=data_dir, history_days=history_days)
+    server = FakeUpbitServer(port=0, exchange=exchange, faults=FaultInjector(rate_limits=FAKE_UPBIT_RATE_LIMITS))
+    ready.put(server.url)
+    server.serve_forever()
+
+def control(url, path, body=None):
+    """GET (no body) or POST one of the fake server's /fake/ endpoints"""
+    if body is None:
+        response = requests.get(f"{url}{path}", timeout=10)
+    else:
+        response = requests.post(f"{url}{path}", json=body, timeout=10)
+    response.raise_for_status()
+    return response.json()
+
+def request_counts(url):
+    """{(endpoint, status): requests} served so far"""
+    return {(path, int(status)): n for path, counts in control(url, "/fake/stats")['endpoints'].items()
+            for status, n in counts.items() if not path.startswith("/fake/")}
+
+def peak_rss_mib():
+    """Lifetime peak RSS of this process (never goes down, so it is a run-level figure)"""
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 # KiB on Linux
+
+def current_rss_mib():
+    """RSS right now from /proc/self/statm; None where there is no /proc"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+
+class RssSampler:
+    """Highest current RSS seen while the block runs, sampled by a background thread"""
+    def __init__(self, period=RSS_SAMPLE_SECONDS):
+        self.period = period
+        self.peak = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _sample(self):
+        rss = current_rss_mib()
+        if rss is not None and (self.peak is None or rss > self.peak):
+            self.peak = rss
+
+    def _run(self):
+        while not self._stop.wait(self.period):
+            self._sample()
+
+    def __enter__(self):
+        self._sample()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+class SimulatedClock:
+    """Trader and feed clock: the scheduled run time of the current cycle"""
+    def __init__(self, start):
+        self.time = start
+
+    def __call__(self):
+        return self.time
+
+class MarketBot:
+    """One market's live state, as main.py builds it"""
+    def __init__(self, api, market, interval, clock, snapshot_dir, shadow=False):
+        self.feed = LiveCandleFeed(api, market, interval, capacity=LIVE_CANDLE_CAPACITY, history_days=FEED_HISTORY_DAYS)
+        self.trader = Trader(api=api, clock=clock, market=market)
+        self.shadow = StrategyEnsemble(bar_interval=interval) if shadow else None
+        self.snapshot_path = os.path.join(snapshot_dir, f"live_{market}_{interval}.npz")
+
+    def run(self, api, signal_gen):
+        run_trading_logic(self.trader, api, signal_gen, self.feed, snapshot_path=self.snapshot_path, shadow=self.shadow)
+
+def prepare_data(args, count, work_dir, days):
+    """(data dir, markets, newest candle time): the --data-dir store, or `count` synthetic markets"""
+    if args.data_dir:
+        stored = [m for m in FakeExchange(data_dir=args.data_dir).markets()
+                  if data_version(m, args.interval, args.data_dir) is not None]
+        if len(stored) < count:
+            raise ValueError(f"{args.data_dir} has {args.interval} candles for {len(stored)} markets, {count} needed")
+        markets = stored[:count]
+        newest = min(load_data(m, 1, data_dir=args.data_dir, interval=args.interval)['datetime'].iloc[-1] for m in markets)
+        return args.data_dir, markets, newest
+
+    data_dir = os.path.join(work_dir, "data")
+    markets = synthetic_market_names(count, prefix="LOAD")
+    end = pd.Timestamp.now().floor('D')
+    print(f"Generating {count} synthetic markets ({args.interval}, {days} days)...")
+    for market, seed in zip(markets, np.random.SeedSequence(args.seed).spawn(count)):
+        df = generate_market(days / 365, args.interval, seed, end=end)
+        save_candles(market, df, data_dir=data_dir, interval=args.interval, rollups=None)
+    return data_dir, markets, end
+
+def wait_for_rate_budget(api):
+    """
+    Let the client-side buckets refill before a cycle. Live cycles are a candle
+    apart and start with full buckets; back-to-back test cycles would not.
+    """
+    for group, (rate, burst) in UPBIT_RATE_LIMITS.items():
+        limiter = get_rate_limiter(group, api.rate_scope)
+        while limiter.tokens() < burst:
+            time.sleep(1 / rate)
+
+def run_cycle(bots, api, signal_gen, notifier, pool, deadline):
+    """(decision seconds, notification delivery seconds, CPU seconds) of one cycle over every bot"""
+    wait_for_rate_budget(api)
+    cpu = time.process_time()
+    started = time.perf_counter()
+    if pool is None:
+        for bot in bots:
+            bot.run(api, signal_gen)
+    else:
+        list(pool.map(lambda bot: bot.run(api, signal_gen), bots))
+    decided = time.perf_counter()
+    notifier.flush(timeout=deadline)
+    notified = time.perf_counter()
+    return decided - started, notified - decided, time.process_time() - cpu
+
+def summarize(markets, latency_ms, cycles, counts, deadline, rss_mib=None):
+    """
+    One capacity-curve row from the per-cycle (decision s, notify s, cpu s) tuples,
+    request counts and the highest RSS sampled during the step
+    """
+    decide = np.array([c[0] for c in cycles])
+    notify = np.array([c[1] for c in cycles])
+    total = decide + notify
+    n = len(cycles)
+    calls = sum(v for (path, _), v in counts.items() if path != "/sendMessage")
+    quotation = sum(v for (path, _), v in counts.items() if path in QUOTATION_ENDPOINTS)
+    exchange = calls - quotation
+    # Lower bound on the cycle from the client-side rate budget alone (utils/rate_limiter.py)
+    floor = max((quotation / n - UPBIT_RATE_LIMITS['quotation'][1]) / UPBIT_RATE_LIMITS['quotation'][0],
+                (exchange / n - UPBIT_RATE_LIMITS['exchange'][1]) / UPBIT_RATE_LIMITS['exchange'][0], 0.0)
+    cpu = sum(c[2] for c in cycles)
+    return {
+        'markets': markets,
+        'latency_ms': latency_ms,
+        'cycles': n,
+        'cycle_p50_s': float(np.percentile(decide, 50)),
+        'cycle_p95_s': float(np.percentile(decide, 95)),
+        'cycle_max_s': float(decide.max()),
+        'per_market_ms': float(decide.mean() / markets * 1000),
+        'notify_p95_s': float(np.percentile(notify, 95)),
+        'total_p95_s': float(np.percentile(total, 95)),
+        'within_deadline_pct': float((total <= deadline).mean() * 100),
+        'api_calls': calls / n,
+        'api_errors': sum(v for (path, status), v in counts.items() if status >= 400 and path != "/sendMessage") / n,
+        'rate_limited': sum(v for (_, status), v in counts.items() if status == 429) / n,
+        'orders': sum(v for (path, status), v in counts.items() if path == "/v1/orders" and status < 400) / n,
+        'notify_posts': sum(v for (path, _), v in counts.items() if path == "/sendMessage") / n,
+        'rate_floor_s': floor,
+        'cpu_s': cpu / n,
+        'cpu_pct': cpu / decide.sum() * 100,
+        'rss_step_mib': rss_mib,
+        'startup_s': None,
+    }
+
+def capacity(rows, deadline):
+    """
+    Per latency: the most markets whose p95 cycle (decisions plus notification
+    delivery) met the deadline, and a linear estimate from the largest step
+    """
+    curve = {}
+    for latency in sorted({row['latency_ms'] for row in rows}):
+        steps = sorted((row for row in rows if row['latency_ms'] == latency), key=lambda row: row['markets'])
+        passed = [row['markets'] for row in steps if row['total_p95_s'] <= deadline]
+        largest = steps[-1]
+        curve[f"{latency:g}"] = {
+            'max_markets_tested': max(passed) if passed else 0,
+            'estimated_markets': int(largest['markets'] * deadline / largest['total_p95_s']),
+        }
+    return curve
+
+def compare(report, baseline_path):
+    """Print p95 and capacity changes against an earlier report"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    before = {(row['markets'], row['latency_ms']): row for row in baseline['steps']}
+    print(f"\nAgainst {baseline_path} ({baseline.get('label') or baseline.get('created')}):")
+    print(f"{'Markets':>7} {'Lat ms':>6} {'p95 before':>10} {'p95 now':>8} {'Change':>7}")
+    for row in report['steps']:
+        old = before.get((row['markets'], row['latency_ms']))
+        if old is None:
+            continue
+        change = (row['total_p95_s'] / old['total_p95_s'] - 1) * 100 if old['total_p95_s'] else 0.0
+        print(f"{row['markets']:>7} {row['latency_ms']:>6g} {old['total_p95_s']:>10.2f} {row['total_p95_s']:>8.2f} {change:>+6.1f}%")
+    for latency, now in report['capacity'].items():
+        old = baseline.get('capacity', {}).get(latency)
+        if old is not None:
+            print(f"Capacity at {latency} ms: {old['estimated_markets']} -> {now['estimated_markets']} markets (estimated)")
+
+def run_load_test(args):
+    market_steps = sorted(args.markets)
+    latency_steps = args.latency_ms
+    interval_td = interval_to_timedelta(args.interval)
+    total_cycles = len(market_steps) * len(latency_steps) * args.cycles
+    days = FEED_HISTORY_DAYS + int(np.ceil(total_cycles * interval_td / pd.Timedelta(days=1))) + 2
+
+    work_dir = tempfile.mkdtemp(prefix="load_test_")
+    server = None
+    notifier = None
+    pool = None
+    try:
+        data_dir, markets, newest = prepare_data(args, market_steps[-1], work_dir, days)
+        ready = multiprocessing.get_context('spawn').Queue()
+        server = multiprocessing.get_context('spawn').Process(target=serve, args=(data_dir, days + 1, ready), daemon=True)
+        server.start()
+        url = ready.get(timeout=60)
+
+        # Start far enough back that every cycle has a new candle to fetch
+        start = (pd.Timestamp(newest) - total_cycles * interval_td).floor(f"{INTERVAL_MINUTES[args.interval]}min")
+        clock = SimulatedClock((start + pd.Timedelta(seconds=SCHEDULE_OFFSET_SECONDS)).to_pydatetime())
+        control(url, "/fake/clock", {'as_of': clock.time.isoformat()})
+
+        api = UpbitAPI(base_url=url)
+        # The fake only checks that a Bearer token is sent
+        api.access_key = api.access_key or PLACEHOLDER_KEY
+        api.secret_key = api.secret_key or PLACEHOLDER_KEY
+        signal_gen = SignalGenerator(rsi_oversold=args.rsi)
+        notifier = TelegramNotifier("load-test", "0", api_url=url).start()
+        use_notifier(notifier)
+        pool = ThreadPoolExecutor(max_workers=args.workers) if args.workers > 1 else None
+        fault_settings = {'jitter_ms': args.jitter_ms, 'distribution': args.latency_dist, 'error_rate': args.error_rate}
+
+        print(f"Fake Upbit on {url}; {len(market_steps)} market steps x {len(latency_steps)} latency steps x {args.cycles} cycles, "
+              f"deadline {args.deadline:g}s, {args.workers} worker(s)")
+        print(f"\n{'Markets':>7} {'Lat ms':>6} {'p50 s':>7} {'p95 s':>7} {'max s':>7} {'Notify':>6} {'OK %':>5} "
+              f"{'Calls':>6} {'Err':>5} {'Orders':>6} {'Floor s':>7} {'CPU s':>6} {'CPU %':>5} {'RSS MiB':>7}")
+        rows = []
+        bots = []
+        for count in market_steps:
+            # Markets added in this step: trader sync and first full candle load, without injected latency
+            control(url, "/fake/config", {'latency_ms': 0, 'jitter_ms': 0, 'distribution': 'fixed', 'error_rate': 0})
+            started = time.perf_counter()
+            for market in markets[len(bots):count]:
+                bot = MarketBot(api, market, args.interval, clock, work_dir, shadow=args.shadow)
+                bot.run(api, signal_gen)
+                bots.append(bot)
+            startup = time.perf_counter() - started
+
+            for latency in latency_steps:
+                control(url, "/fake/config", {'latency_ms': latency, **fault_settings})
+                cycles = []
+                before = request_counts(url)
+                with RssSampler() as rss:
+                    for _ in range(args.cycles):
+                        clock.time += interval_td
+                        control(url, "/fake/clock", {'as_of': clock.time.isoformat()})
+                        cycles.append(run_cycle(bots, api, signal_gen, notifier, pool, args.deadline))
+                after = request_counts(url)
+                counts = {key: after[key] - before.get(key, 0) for key in after}
+                row = summarize(count, latency, cycles, counts, args.deadline, rss_mib=rss.peak)
+                if latency == latency_steps[0]:
+                    row['startup_s'] = startup
+                rows.append(row)
+                rss = f"{row['rss_step_mib']:>7.0f}" if row['rss_step_mib'] is not None else f"{'-':>7}"
+                print(f"{count:>7} {latency:>6g} {row['cycle_p50_s']:>7.2f} {row['cycle_p95_s']:>7.2f} {row['cycle_max_s']:>7.2f} "
+                      f"{row['notify_p95_s']:>6.2f} {row['within_deadline_pct']:>5.0f} {row['api_calls']:>6.0f} "
+                      f"{row['api_errors']:>5.1f} {row['orders']:>6.1f} {row['rate_floor_s']:>7.2f} {row['cpu_s']:>6.2f} "
+                      f"{row['cpu_pct']:>5.0f} {rss}")
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        if notifier is not None:
+            notifier.stop()
+            use_notifier(None)
+        if server is not None:
+            server.terminate()
+            server.join()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        'label': args.label,
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'settings': {
+            'interval': args.interval, 'cycles': args.cycles, 'workers': args.workers, 'deadline_s': args.deadline,
+            'jitter_ms': args.jitter_ms, 'latency_dist': args.latency_dist, 'error_rate': args.error_rate,
+            'rsi_oversold': args.rsi, 'shadow': args.shadow, 'data': args.data_dir or 'synthetic',
+            'client_rate_limits': UPBIT_RATE_LIMITS, 'python': platform.python_version(), 'cpus': os.cpu_count(),
+        },
+        'steps': rows,
+        'capacity': capacity(rows, args.deadline),
+        'rss_lifetime_peak_mib': peak_rss_mib(),
+    }
+    pd.DataFrame(rows, columns=COLUMNS).to_csv(f"{args.output}.csv", index=False)
+    with open(f"{args.output}.json", "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"\nCapacity within {args.deadline:g}s (p95 of decisions plus notification delivery):")
+    for latency, entry in report['capacity'].items():
+        print(f"  {latency:>4} ms latency: {entry['max_markets_tested']} markets passed, ~{entry['estimated_markets']} estimated")
+    print(f"Results saved to {args.output}.csv and {args.output}.json")
+    if args.baseline:
+        compare(report, args.baseline)
+
+def int_list(text):
+    return [int(value) for value in text.split(",")]
+
+def float_list(text):
+    return [float(value) for value in text.split(",")]
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the live decision cycle: cycle time, API calls, CPU and memory as markets and API latency grow")
+    parser.add_argument("--markets", type=int_list, default=LOAD_TEST_MARKET_STEPS, help=f"Market counts to step through (default: {','.join(map(str, LOAD_TEST_MARKET_STEPS))})")
+    parser.add_argument("--latency-ms", type=float_list, default=LOAD_TEST_LATENCY_STEPS, help=f"Injected API latencies to step through (default: {','.join(map(str, LOAD_TEST_LATENCY_STEPS))})")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Latency jitter scale (default: 0)")
+    parser.add_argument("--latency-dist", type=str, default='fixed', choices=LATENCY_DISTRIBUTIONS, help="Jitter distribution (default: fixed)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of API requests failing with a 500 (default: 0)")
+    parser.add_argument("--cycles", type=int, default=5, help="Cycles per step (default: 5)")
+    parser.add_argument("--workers", type=int, default=1, help="Markets evaluated concurrently (default: 1, as main.py runs)")
+    parser.add_argument("--interval", type=str, default=TICKER_INTERVAL, choices=list(INTERVAL_MINUTES), help=f"Candle interval (default: {TICKER_INTERVAL})")
+    parser.add_argument("--rsi", type=float, default=RSI_OVERSOLD, help=f"RSI oversold threshold; higher means more entries and orders (default: {RSI_OVERSOLD})")
+    parser.add_argument("--shadow", action="store_true", help="Also step the shadow strategy books (LIVE_SHADOW_STRATEGIES) per market")
+    parser.add_argument("--deadline", type=float, default=LOAD_TEST_DEADLINE_SECONDS, help=f"Seconds a cycle may take (default: {LOAD_TEST_DEADLINE_SECONDS})")
+    parser.add_argument("--data-dir", type=str, default=None, help="Serve this candle store instead of generated synthetic markets")
+    parser.add_argument("--seed", type=int, default=42, help="Seed of the synthetic markets (default: 42)")
+    parser.add_argument("--label", type=str, default=None, help="Label stored in the report, e.g. a release tag")
+    parser.add_argument("--output", type=str, default="load_test_results", help="Report path without extension (default: load_test_results)")
+    parser.add_argument("--baseline", type=str, default=None, help="Earlier report (.json) to compare against")
+    args = parser.parse_args()
+
+    run_load_test(args)
+
+if __name__ == "__main__":
+    main()
@@ -1,57 +1,36 @@
-import time
-import datetime
-import schedule
 from config.logging_config import setup_logging, get_logger
-from config.settings import TARGET_COIN, RSI_OVERSOLD, MOCK_TRADING
+from config.settings import (
+    TARGET_COIN, RSI_OVERSOLD, MOCK_TRADING, TICKER_INTERVAL, LIVE_CANDLE_CAPACITY, SNAPSHOT_MAX_AGE_HOURS,
+    LIVE_SHADOW_STRATEGIES
+)
 from data_fetcher.upbit_api import UpbitAPI
 from data_fetcher.mock_upbit_api import MockUpbitAPI
+from data_fetcher.candle_feed import LiveCandleFeed
 from strategy.signal import SignalGenerator
+from backtester.ensemble import StrategyEnsemble
 from trade.trader import Trader
+from trade.snapshot import load_snapshot, OHLCV_COLUMNS
+from trade.live_loop import SNAPSHOT_PATH, run_trading_logic, schedule_jobs
+from utils.scheduler import CandleScheduler
 from utils.telegram_notifier import send_message
 
-setup_logging()
+# Handlers run on a background listener so the trading path never waits on log I/O
+setup_logging(use_queue=True)
 logger = get_logger("Main")
 
-def run_trading_logic(trader, api, signal_gen):
-    try:
-        logger.info("Running trading logic...")
-        
-        # 1. Fetch Data
-        # We need enough data for indicators (RSI 14 + MACD 26 + extra for smoothing)
-        # 200 candles is sufficient.
-        df = api.get_ohlcv(market=TARGET_COIN, interval="minute60", days=10) # 10 days ~= 240 hours
-        
-        if df.empty:
-            logger.error("Failed to fetch data.")
-            return
+def warm_start(feed):
+    """
+    Restore the candle window and trader state from the last snapshot.
+    The feed's next refresh then fetches only the candles missed since.
+    """
+    snapshot = load_snapshot(SNAPSHOT_PATH, TARGET_COIN, TICKER_INTERVAL, SNAPSHOT_MAX_AGE_HOURS)
+    if snapshot is None:
+        return Trader()
 
-        # 2. Calculate Signals
-        df = signal_gen.process(df)
-        last_row = df.iloc[-1]
-        
-        current_price = last_row['close']
-        
-        # Log status
-        logger.info(f"Price: {current_price}, RSI: {last_row['rsi']:.2f}, MACD: {last_row['macd']:.2f}")
-
-        # 3. Monitor Existing Position (StopLoss/TakeProfit)
-        # This checks if we need to sell due to risk management
-        if trader.get_market_state():
-            trader.monitor_position(current_price)
-        
-        # 4. Check Buy Signal
-        # Only buy if not in position (and position wasn't just closed above)
-        if not trader.get_market_state():
-            if signal_gen.check_buy_signal(last_row):
-                logger.info("Buy Signal Detected!")
-                send_message(f"🚀 Buy Signal Detected!\nRSI: {last_row['rsi']:.2f}\nMACD: {last_row['macd']:.2f}")
-                trader.buy_market()
-            else:
-                logger.info("No Buy Signal.")
-
-    except Exception as e:
-        logger.error(f"Error in trading logic: {e}", exc_info=True)
-        send_message(f"⚠️ Error in Bot: {e}")
+    window, meta = snapshot
+    logger.info(f"Loaded snapshot saved at {meta['saved_at']} ({len(window)} candles)")
+    feed.load(window[['datetime'] + OHLCV_COLUMNS])
+    return Trader(state=meta['trader'])
 
 def main():
     logger.info(f"Starting Coin Trading Bot... Mode: {'MOCK' if MOCK_TRADING else 'REAL'}")
@@ -64,19 +43,19 @@ def main():
     # Note: RSI_OVERSOLD should be updated based on Optimization results!
     # Ideally, load from a dynamic config or arguments. Defaulting to settings.py value.
     signal_gen = SignalGenerator(rsi_oversold=RSI_OVERSOLD) # 30 default
-    trader = Trader()
+    feed = LiveCandleFeed(api, TARGET_COIN, TICKER_INTERVAL, capacity=LIVE_CANDLE_CAPACITY)
+    trader = warm_start(feed)
+
+    # Shadow strategies trade virtual books next to the real one (see README: Strategy Ensemble)
+    shadow = StrategyEnsemble(bar_interval=TICKER_INTERVAL) if LIVE_SHADOW_STRATEGIES else None
 
-    # Schedule: Run every 1 hour
-    # We want to run at the start of the hour ideally. 
-    # schedule.every().hour.at(":01").do(...)
-    schedule.every().hour.at(":01").do(run_trading_logic, trader, api, signal_gen)
+    scheduler = CandleScheduler()
+    schedule_jobs(scheduler, trader, api, signal_gen, feed, shadow=shadow)
     
     # Also run immediately on startup to check status
-    run_trading_logic(trader, api, signal_gen)
+    run_trading_logic(trader, api, signal_gen, feed, shadow=shadow)
 
-    while True:
-        schedule.run_pending()
-        time.sleep(1)
+    scheduler.run_forever()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,75 @@
+import argparse
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from utils.data_loader import load_data
+from backtester.backtest_engine import BacktestEngine
+from strategy.signal import SignalGenerator
+from backtester.grid import grid_points
+from utils.intervals import INTERVAL_MINUTES
+from config.logging_config import setup_logging, get_logger
+from config.settings import TARGET_COIN, RSI_OVERSOLD, TICKER_INTERVAL
+
+setup_logging()
+logger = get_logger("MemoryBenchmark")
+logger.setLevel("WARNING")
+
+ENGINE_PARAMS = ('stop_loss_pct', 'take_profit_pct', 'max_hold_days')
+
+# Peak memory of an optimizer sweep over one loaded dataset:
+#   copy    every run gets its own df.copy() and computes its own indicator columns
+#           (how optimize.py ran each grid point before candles were read-only)
+#   shared  every run reads the same candles and one shared indicator frame
+# --workers runs the grid concurrently, as the backtest server does.
+
+def run_grid(df, points, mode, interval, workers):
+    shared = SignalGenerator(rsi_oversold=points[0]['rsi_oversold']).indicator_frame(df) if mode == 'shared' else None
+
+    def run(point):
+        signal_gen = SignalGenerator(rsi_oversold=point['rsi_oversold'])
+        engine = BacktestEngine(
+            df.copy() if mode == 'copy' else df, signal_generator=signal_gen, bar_interval=interval,
+            indicators=shared, **{k: v for k, v in point.items() if k in ENGINE_PARAMS}
+        )
+        return engine.run()['final_balance']
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(run, points))
+
+def measure(df, points, mode, interval, workers):
+    """(final balances, peak traced MiB above the loaded data, seconds)"""
+    tracemalloc.start()
+    started = time.perf_counter()
+    balances = run_grid(df, points, mode, interval, workers)
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return balances, peak / 2**20, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Peak memory of an optimizer sweep: per-run copies vs shared read-only frames")
+    parser.add_argument("--market", type=str, default=TARGET_COIN, help=f"Market to load (default: {TARGET_COIN})")
+    parser.add_argument("--days", type=int, default=365, help="Days of history (default: 365)")
+    parser.add_argument("--interval", type=str, default=TICKER_INTERVAL, choices=list(INTERVAL_MINUTES), help=f"Bar interval (default: {TICKER_INTERVAL})")
+    parser.add_argument("--runs", type=int, default=20, help="Grid points of optimize.py's pnl grid to run per mode (default: 20)")
+    parser.add_argument("--workers", type=int, default=1, help="Runs executed concurrently (default: 1)")
+    args = parser.parse_args()
+
+    df = load_data(args.market, args.days, interval=args.interval)
+    if df is None or df.empty:
+        print(f"No {args.interval} data for {args.market}. Did you run 'python collect_data.py'?")
+        return
+    points = grid_points('pnl', RSI_OVERSOLD)[:args.runs]
+    data_mib = df.memory_usage(deep=True).sum() / 2**20
+    print(f"{args.market}: {len(df)} candles ({data_mib:.1f} MiB), {len(points)} runs, {args.workers} worker(s)")
+
+    results = {}
+    print(f"{'Mode':<8} {'Peak MiB':>9} {'x data':>7} {'Seconds':>8}")
+    for mode in ('copy', 'shared'):
+        balances, peak, elapsed = measure(df, points, mode, args.interval, args.workers)
+        results[mode] = balances
+        print(f"{mode:<8} {peak:>9.1f} {peak / data_mib:>7.2f} {elapsed:>8.2f}")
+    print("Results identical:", results['copy'] == results['shared'])
+
+if __name__ == "__main__":
+    main()
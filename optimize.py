@@ -1,79 +1,108 @@
 import argparse
+import time
 import pandas as pd
 import itertools
 from utils.data_loader import load_data
 from backtester.backtest_engine import BacktestEngine
+from backtester.grid import STOP_LOSS_RANGE, TAKE_PROFIT_RANGE, MAX_HOLD_RANGE
+from backtester.metrics import METRICS
+from backtester.result_cache import ResultCache, data_fingerprint
+from backtester.execution import load_depth_model
+from backtester.client import BacktestClient
 from strategy.signal import SignalGenerator
+from utils.intervals import INTERVAL_MINUTES
+from utils.profiler import stage, profiling, add_profile_arguments
 from config.logging_config import get_logger
 from config.settings import (
-    TARGET_COIN, RSI_OVERSOLD, STOP_LOSS_PCT, TAKE_PROFIT_PCT, MAX_HOLD_DAYS,
+    TARGET_COIN, RSI_OVERSOLD, TICKER_INTERVAL, BACKTEST_SERVER_SOCKET, STOP_LOSS_PCT, TAKE_PROFIT_PCT, MAX_HOLD_DAYS,
     RSI_OPT_MIN, RSI_OPT_MAX, RSI_OPT_STEP
 )
 
 logger = get_logger("Optimizer")
 
-def fetch_data(market, days):
-    df = load_data(market, days)
+def fetch_data(market, days, interval=TICKER_INTERVAL):
+    with stage("load"):
+        df = load_data(market, days, interval=interval)
     if df is None or df.empty:
         logger.error("No data loaded. Did you run 'python collect_data.py'?")
         return None
     logger.info(f"Data loaded: {len(df)} rows")
     return df
 
-def optimize_rsi(df):
+def run_engine(engine, fingerprint, market, cache):
+    """
+    Run one grid point, consulting the result cache first when enabled.
+    Returns (result, cached).
+    """
+    if cache is None:
+        return engine.run(), False
+    return cache.get_or_run(engine, fingerprint, market=market)
+
+def optimize_rsi(df, market=None, cache=None, bar_interval=TICKER_INTERVAL, execution=None):
     results = []
+    with stage("fingerprint"):
+        fingerprint = data_fingerprint(df) if cache else None
+    computed = 0
     logger.info(f"Starting RSI Optimization (Range: {RSI_OPT_MIN}-{RSI_OPT_MAX-1}, Step: {RSI_OPT_STEP})...")
+    # rsi_oversold is only a threshold: every run reads the same candles and indicator columns
+    with stage("indicators"):
+        indicators = SignalGenerator().indicator_frame(df)
     
     for rsi_val in range(RSI_OPT_MIN, RSI_OPT_MAX, RSI_OPT_STEP):
         signal_gen = SignalGenerator(rsi_oversold=rsi_val)
         # Use default Risk Params
-        engine = BacktestEngine(df.copy(), signal_generator=signal_gen)
+        engine = BacktestEngine(df, signal_generator=signal_gen, bar_interval=bar_interval, execution=execution,
+                                indicators=indicators)
         
-        result = engine.run()
+        result, cached = run_engine(engine, fingerprint, market, cache)
+        computed += not cached
         
         results.append({
             'rsi_oversold': rsi_val,
-            'return_pct': result['return_pct'],
-            'total_trades': result['total_trades'],
+            **result['metrics'],
             'final_balance': result['final_balance']
         })
+    logger.info(f"Computed {computed} runs, {len(results) - computed} loaded from result cache")
     return pd.DataFrame(results)
 
-def optimize_pnl_maxhold(df, rsi_val=RSI_OVERSOLD):
+def optimize_pnl_maxhold(df, rsi_val=RSI_OVERSOLD, market=None, cache=None, bar_interval=TICKER_INTERVAL, execution=None):
     results = []
+    with stage("fingerprint"):
+        fingerprint = data_fingerprint(df) if cache else None
+    computed = 0
     logger.info(f"Starting PnL & MaxHold Optimization (Fixed RSI={rsi_val})...")
     
-    # Ranges
-    stop_loss_range = [1.0, 2.0, 3.0, 4.0, 5.0] # 5 steps
-    take_profit_range = [10.0, 20.0, 30.0, 40.0, 50.0] # 5 steps
-    max_hold_range = [3, 5, 7, 10] # 4 steps
-    # Total combinations: 5 * 5 * 4 = 100 runs
-    
-    combinations = list(itertools.product(stop_loss_range, take_profit_range, max_hold_range))
+    combinations = list(itertools.product(STOP_LOSS_RANGE, TAKE_PROFIT_RANGE, MAX_HOLD_RANGE))
+    with stage("indicators"):
+        indicators = SignalGenerator(rsi_oversold=rsi_val).indicator_frame(df)
     
     for sl, tp, mh in combinations:
         # Use provided RSI
         signal_gen = SignalGenerator(rsi_oversold=rsi_val)
         
         engine = BacktestEngine(
-            df.copy(), 
+            df,
             signal_generator=signal_gen,
             stop_loss_pct=sl,
             take_profit_pct=tp,
-            max_hold_days=mh
+            max_hold_days=mh,
+            bar_interval=bar_interval,
+            execution=execution,
+            indicators=indicators
         )
         
-        result = engine.run()
+        result, cached = run_engine(engine, fingerprint, market, cache)
+        computed += not cached
         
         results.append({
             'stop_loss': sl,
             'take_profit': tp,
             'max_hold': mh,
-            'return_pct': result['return_pct'],
-            'total_trades': result['total_trades'],
+            **result['metrics'],
             'final_balance': result['final_balance']
         })
         
+    logger.info(f"Computed {computed} runs, {len(results) - computed} loaded from result cache")
     return pd.DataFrame(results)
 
 def main():
@@ -82,25 +111,63 @@ def main():
     parser.add_argument("--market", type=str, default=TARGET_COIN, help="Market to optimize (e.g., KRW-BTC)")
     parser.add_argument("--days", type=int, default=365, help="Days of history to backtest")
     parser.add_argument("--rsi", type=float, default=RSI_OVERSOLD, help=f"RSI Oversold Threshold (default: {RSI_OVERSOLD})")
+    parser.add_argument("--interval", type=str, default=TICKER_INTERVAL, choices=list(INTERVAL_MINUTES), help=f"Bar interval, loaded from the store's rollups (default: {TICKER_INTERVAL})")
+    parser.add_argument("--no-cache", action="store_true", help="Recompute every run, ignoring the result cache")
+    parser.add_argument("--depth", action="store_true", help="Price fills from stored order book depth instead of flat SLIPPAGE_RATE")
+    parser.add_argument("--rank-by", type=str, default='return_pct', choices=list(METRICS), help="Metric to rank results by (default: return_pct)")
+    parser.add_argument("--server", type=str, nargs="?", const=BACKTEST_SERVER_SOCKET, default=None, metavar="SOCKET", help=f"Run the grid on the resident backtest server (default socket: {BACKTEST_SERVER_SOCKET})")
+    add_profile_arguments(parser)
     
     args = parser.parse_args()
-    
-    df = fetch_data(args.market, args.days)
+    with profiling("optimize", args):
+        run_optimization(args)
+
+def run_remote_optimization(args):
+    """Client mode: the grid runs on the resident backtest server (backtest_server.py)"""
+    started = time.perf_counter()
+    with BacktestClient(args.server) as client:
+        rows = client.optimize(args.market, mode=args.mode, days=args.days, interval=args.interval, rsi=args.rsi,
+                               depth=args.depth, no_cache=args.no_cache)
+    results_df = pd.DataFrame(rows)
+    cached = int(results_df['cached'].sum()) if not results_df.empty else 0
+    logger.info(f"Server ran {len(rows) - cached} runs ({cached} from result cache) in "
+                f"{(time.perf_counter() - started) * 1000:.0f} ms round trip")
+    return results_df.drop(columns=['cached'], errors='ignore')
+
+def run_optimization(args):
+    if args.server:
+        with stage("report"):
+            print_results(args, run_remote_optimization(args))
+        return
+
+    df = fetch_data(args.market, args.days, args.interval)
     if df is None:
         return
 
+    cache = None if args.no_cache else ResultCache()
+    execution = None
+    if args.depth:
+        with stage("load"):
+            execution = load_depth_model(args.market, df['datetime'].iloc[0], df['datetime'].iloc[-1])
+        if execution is None:
+            logger.warning(f"No order book snapshots for {args.market}. Using flat slippage.")
+
     if args.mode == 'rsi':
-        results_df = optimize_rsi(df)
-        sort_cols = ['return_pct']
+        results_df = optimize_rsi(df, market=args.market, cache=cache, bar_interval=args.interval, execution=execution)
     elif args.mode == 'pnl':
         # Pass the custom RSI value (or default)
-        results_df = optimize_pnl_maxhold(df, rsi_val=args.rsi)
-        sort_cols = ['return_pct']
+        results_df = optimize_pnl_maxhold(df, rsi_val=args.rsi, market=args.market, cache=cache, bar_interval=args.interval,
+                                          execution=execution)
+
+    with stage("report"):
+        print_results(args, results_df)
 
+def print_results(args, results_df):
     if not results_df.empty:
-        results_df = results_df.sort_values(by=sort_cols, ascending=False)
+        # Drawdown / fee drag rank ascending, everything else descending
+        results_df = results_df.sort_values(by=[args.rank_by], ascending=not METRICS[args.rank_by])
         
-        print(f"\n--- Optimization Results ({args.mode.upper()}) ---")
+        print(f"\n--- Optimization Results ({args.mode.upper()}, ranked by {args.rank_by}) ---")
         print(results_df.head(10).to_string(index=False)) # Show top 10
         
         best_result = results_df.iloc[0]
@@ -0,0 +1,34 @@
+import argparse
+import pandas as pd
+from backtester.result_cache import ResultCache, DEFAULT_DB_PATH
+
+def main():
+    parser = argparse.ArgumentParser(description="Query stored backtest results.")
+    parser.add_argument("--market", type=str, help="Filter by market (e.g. KRW-BTC)")
+    parser.add_argument("--engine-version", type=str, help="Filter by engine version")
+    parser.add_argument("--sort", type=str, default="return_pct", help="Column to sort by (default: return_pct)")
+    parser.add_argument("--ascending", action="store_true", help="Sort ascending instead of descending")
+    parser.add_argument("--limit", type=int, default=20, help="Number of rows to show (default: 20)")
+    parser.add_argument("--db", type=str, default=DEFAULT_DB_PATH, help=f"Result database (default: {DEFAULT_DB_PATH})")
+    parser.add_argument("--output", type=str, help="Also save the matching rows to this CSV file")
+
+    args = parser.parse_args()
+
+    cache = ResultCache(args.db)
+    df = cache.query(
+        market=args.market, engine_version=args.engine_version,
+        order_by=args.sort, ascending=args.ascending, limit=args.limit
+    )
+    if df.empty:
+        print("No stored results.")
+        return
+
+    with pd.option_context('display.width', 200, 'display.max_columns', None):
+        print(df.to_string(index=False))
+
+    if args.output:
+        df.to_csv(args.output, index=False)
+        print(f"\nResults saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import argparse
+import logging
+import time
+import pandas as pd
+from utils.data_loader import load_data
+from backtester.backtest_engine import BacktestEngine
+from backtester.replay import run_replay
+from strategy.signal import SignalGenerator
+from config.logging_config import setup_logging, get_logger, EVENT_LOGGER_NAME
+from config.settings import TARGET_COIN, RSI_OVERSOLD, TICKER_INTERVAL
+from utils.telegram_notifier import mute
+
+# The live loop logs every decision; keep only warnings during a replay
+setup_logging(logging.WARNING)
+logging.getLogger(EVENT_LOGGER_NAME).disabled = True
+mute()
+logger = get_logger("Replay")
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay the live trading loop on stored candles (simulated clock).")
+    parser.add_argument("--market", type=str, default=TARGET_COIN, help=f"Market (default: {TARGET_COIN})")
+    parser.add_argument("--days", type=int, default=365, help="Days to replay (default: 365)")
+    parser.add_argument("--rsi", type=float, default=RSI_OVERSOLD, help=f"RSI Oversold Threshold (default: {RSI_OVERSOLD})")
+    parser.add_argument("--interval", type=str, default=TICKER_INTERVAL, help=f"Candle interval (default: {TICKER_INTERVAL})")
+    parser.add_argument("--warmup-days", type=int, default=10, help="Days before the replay window that only seed the candle feed (default: 10)")
+    parser.add_argument("--stop-check-interval", type=int, default=900,
+                        help="Seconds between intra-candle stop checks (default: 900; live uses STOP_CHECK_INTERVAL_SECONDS)")
+    parser.add_argument("--initial", type=float, default=1000000, help="Initial KRW balance (default: 1,000,000)")
+    args = parser.parse_args()
+
+    df = load_data(args.market, args.days + args.warmup_days, interval=args.interval)
+    if df is None or df.empty:
+        logger.error("No data loaded. Did you run 'python collect_data.py'?")
+        return
+
+    started = time.time()
+    replay = run_replay(df, args.market, args.interval, SignalGenerator(rsi_oversold=args.rsi),
+                        initial_krw=args.initial, warmup_days=args.warmup_days,
+                        stop_check_interval=args.stop_check_interval)
+    elapsed = time.time() - started
+
+    # The backtester on the same window, for comparison
+    window = df[df['datetime'] >= df['datetime'].iloc[0] + pd.Timedelta(days=args.warmup_days)]
+    backtest = BacktestEngine(window.reset_index(drop=True), initial_capital=args.initial,
+                              signal_generator=SignalGenerator(rsi_oversold=args.rsi), bar_interval=args.interval).run()
+
+    print("\n" + "="*56)
+    print(f" REPLAY vs BACKTEST ({args.market}, {args.interval})")
+    print("="*56)
+    print(f"Replayed {replay['decisions']} decisions in {elapsed:.1f}s ({replay['requests']} exchange requests)")
+    print(f"{'':<16}{'Replay':>20}{'Backtest':>20}")
+    rows = [
+        ("Final Balance", f"{replay['final_balance']:,.0f}", f"{backtest['final_balance']:,.0f}"),
+        ("Return", f"{replay['return_pct']:.2f}%", f"{backtest['return_pct']:.2f}%"),
+        ("Total Trades", replay['total_trades'], backtest['total_trades']),
+        ("Max Drawdown", f"{replay['metrics']['max_drawdown_pct']:.2f}%", f"{backtest['metrics']['max_drawdown_pct']:.2f}%"),
+        ("Sharpe", f"{replay['metrics']['sharpe']:.2f}", f"{backtest['metrics']['sharpe']:.2f}"),
+    ]
+    for name, a, b in rows:
+        print(f"{name:<16}{a:>20}{b:>20}")
+    print("-" * 56)
+
+    details = f"replay_details_{args.market}.csv"
+    trades = replay['trades'].to_frame()
+    if not trades.empty:
+        trades.to_csv(details, index=False)
+        print(f"Replay trades saved to {details} (same columns as backtest_details_{args.market}.csv)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+import math
+import numpy as np
+from config.settings import ATR_PERIOD, EMA_FAST, EMA_SLOW, BB_PERIOD, BB_STD, INDICATOR_KERNEL_RTOL
+from .indicator_state import _center_of_mass, Lag
+
+# Fused NumPy kernel for the whole indicator set of SignalGenerator.
+# All outputs are rows of one preallocated (indicators x rows) float64 block,
+# and every recurrence is evaluated with whole-array operations instead of
+# one pandas object per intermediate step.
+#
+# The kernel is chunk-invariant: feeding a series in chunks of any size gives
+# bit-identical output to one call on the whole series, so the same class is
+# both the one-shot path (compute_indicators) and the streaming state
+# (process_chunk). It agrees with the pandas implementations (Indicators)
+# to rounding error, not bit for bit; check_kernel() measures that.
+
+COLUMNS = ('rsi', 'macd', 'macd_signal', 'macd_hist', 'atr', 'ema_fast', 'ema_slow',
+           'upper_band', 'lower_band', 'vol_sma', 'atr_ratio', 'prev_atr')
+BLOCK = 32
+MAX_BLOCK_SCALE = 1e100 # largest decay**-j kept inside a block
+
+def kernel_supports(*arrays):
+    """The kernel needs gap-free input; series with NaN/inf go to the pandas path"""
+    return all(np.isfinite(a).all() for a in arrays)
+
+def _block_length(decay):
+    if decay <= 0:
+        return 1
+    return max(1, min(BLOCK, 1 + int(math.log(MAX_BLOCK_SCALE) / -math.log(decay))))
+
+class _Scan:
+    """
+    y[u] = decay * y[u-1] + gain * x[u] over a stream, starting from y[-1] = carry.
+    Positions are cut into blocks aligned to the stream start. Inside a block
+        y[b+j] = decay**j * cumsum(gain * x * decay**-i)[j] + decay**(j+1) * y[b-1]
+    so a chunk is one cumsum over its blocks plus a Python loop over block
+    boundaries only. A block left unfinished at the end of a chunk keeps its
+    running sum and is resumed by the next one, which adds the same terms in
+    the same order as an unchunked call.
+    """
+    def __init__(self, decay, gain, carry=0.):
+        self.block = _block_length(decay)
+        j = np.arange(self.block + 1, dtype=np.float64)
+        self.powers = decay ** j
+        with np.errstate(divide='ignore'):
+            self.scale = gain * decay ** -j[:-1] if decay > 0 else np.array([gain])
+        self.carry = carry # y just before the current block
+        self.pos = 0       # position inside the current block
+        self.partial = 0.  # running sum of the current block
+
+    def update(self, x):
+        n, block, j0 = len(x), self.block, self.pos
+        rows = -(-(j0 + n) // block)
+        terms = np.zeros((rows, block))
+        flat = terms.reshape(-1)
+        flat[j0:j0 + n] = x
+        flat[j0:j0 + n] *= np.resize(np.roll(self.scale, -j0), n)
+        if j0:
+            flat[j0 - 1] = self.partial
+        sums = np.cumsum(terms, axis=1, out=terms)
+
+        carries = np.empty(rows)
+        carry = self.carry
+        last, step = float(self.powers[block - 1]), float(self.powers[block])
+        for r, s in enumerate(sums[:, -1].tolist()):
+            carries[r] = carry
+            carry = last * s + step * carry
+
+        y = sums * self.powers[:-1]
+        y += carries[:, None] * self.powers[1:]
+        end = (j0 + n) % block
+        if end:
+            self.carry, self.pos, self.partial = carries[-1], end, float(sums[-1, end - 1])
+        else:
+            self.carry, self.pos = carry, 0
+        return y.reshape(-1)[j0:j0 + n]
+
+class _Ewm:
+    """Series.ewm(...).mean() for finite input, as a _Scan"""
+    def __init__(self, com=None, span=None, alpha=None, adjust=True, min_periods=0):
+        alpha = 1. / (1. + _center_of_mass(com, span, alpha))
+        self.decay = 1. - alpha
+        self.adjust = adjust
+        self.min_periods = max(int(min_periods), 1)
+        # adjust=True: weighted sum over the weight total (closed form);
+        # adjust=False: y[0] = x[0], then y = (1 - alpha) * y + alpha * x
+        self.scan = _Scan(self.decay, 1.) if adjust else None
+        self.alpha = alpha
+        self.count = 0
+
+    def update(self, x, out):
+        n = len(x)
+        t = self.count + np.arange(n)
+        if self.adjust:
+            out[:] = self.scan.update(x)
+            with np.errstate(divide='ignore'):
+                weights = -np.expm1((t + 1) * math.log(self.decay)) / self.alpha if self.decay > 0 else np.ones(n)
+            out /= weights
+        else:
+            if self.scan is None:
+                self.scan = _Scan(self.decay, self.alpha, carry=float(x[0]))
+                out[0] = x[0]
+                out[1:] = self.scan.update(x[1:])
+            else:
+                out[:] = self.scan.update(x)
+        self.count += n
+        if self.count - n < self.min_periods - 1:
+            out[:self.min_periods - 1 - (self.count - n)] = np.nan
+        return out
+
+class _Window:
+    """Series.rolling(window) mean (and std, ddof=1) over the stream"""
+    def __init__(self, window):
+        self.window = int(window)
+        self.tail = np.empty(0)
+
+    def update(self, x, mean_out, std_out=None, std_scale=None):
+        joined = np.concatenate([self.tail, x])
+        self.tail = joined[max(len(joined) - (self.window - 1), 0):] if self.window > 1 else np.empty(0)
+        n = len(x)
+        full = len(joined) - self.window + 1 # windows ending inside this chunk
+        mean_out[:n - max(full, 0)] = np.nan
+        if std_out is not None:
+            std_out[:n - max(full, 0)] = np.nan
+        if full <= 0:
+            return
+        # Column-by-column sums add each window in a fixed order, so a row's
+        # value never depends on how the stream was chunked
+        mean = joined[:full].copy()
+        for k in range(1, self.window):
+            mean += joined[k:k + full]
+        mean /= self.window
+        mean_out[n - full:] = mean
+        if std_out is None:
+            return
+        ss = np.zeros(full)
+        for k in range(self.window):
+            d = joined[k:k + full] - mean
+            ss += d * d
+        ss /= self.window - 1
+        std_out[n - full:] = np.sqrt(ss) * std_scale if self.window > 1 else np.nan
+
+class IndicatorKernel:
+    """
+    All of SignalGenerator.compute_indicators() in one kernel. update() takes
+    the next chunk of OHLCV arrays and returns {name: array} for those rows;
+    the arrays are rows of a single block allocated per call.
+    """
+    def __init__(self, signal_generator):
+        sg = signal_generator
+        self.last_close = np.nan
+        self.rsi_gain = _Ewm(com=sg.rsi_period - 1, min_periods=sg.rsi_period)
+        self.rsi_loss = _Ewm(com=sg.rsi_period - 1, min_periods=sg.rsi_period)
+        self.macd_fast = _Ewm(span=sg.macd_fast, adjust=False)
+        self.macd_slow = _Ewm(span=sg.macd_slow, adjust=False)
+        self.macd_signal = _Ewm(span=sg.macd_signal, adjust=False)
+        self.atr = _Ewm(alpha=1/ATR_PERIOD, min_periods=ATR_PERIOD, adjust=False)
+        self.ema_fast = _Ewm(span=EMA_FAST, adjust=False)
+        self.ema_slow = _Ewm(span=EMA_SLOW, adjust=False)
+        self.bands = _Window(BB_PERIOD)
+        self.vol_sma = _Window(20)
+        self.atr_lag5 = Lag(5)
+        self.atr_lag1 = Lag(1)
+
+    def update(self, high, low, close, volume):
+        high = np.asarray(high, dtype=np.float64)
+        low = np.asarray(low, dtype=np.float64)
+        close = np.asarray(close, dtype=np.float64)
+        volume = np.asarray(volume, dtype=np.float64)
+        if not kernel_supports(high, low, close, volume):
+            raise ValueError("IndicatorKernel needs finite OHLCV input (set INDICATOR_KERNEL = False for gappy data)")
+        n = len(close)
+        block = np.empty((len(COLUMNS), n))
+        out = dict(zip(COLUMNS, block))
+        if n == 0:
+            return out
+
+        prev_close = np.empty(n)
+        prev_close[0] = self.last_close
+        prev_close[1:] = close[:-1]
+        self.last_close = float(close[-1])
+        scratch = np.empty((3, n))
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # RSI: gain/loss are 0 where the change is undefined (first row)
+            delta = np.subtract(close, prev_close, out=scratch[0])
+            gain = np.where(delta > 0, delta, 0.)
+            loss = np.where(delta < 0, -delta, 0.)
+            avg_gain = self.rsi_gain.update(gain, scratch[1])
+            avg_loss = self.rsi_loss.update(loss, scratch[2])
+            rsi = out['rsi']
+            np.divide(avg_gain, avg_loss, out=rsi)
+            rsi += 1
+            np.divide(100, rsi, out=rsi)
+            np.subtract(100, rsi, out=rsi)
+
+            fast = self.macd_fast.update(close, scratch[1])
+            slow = self.macd_slow.update(close, scratch[2])
+            np.subtract(fast, slow, out=out['macd'])
+            self.macd_signal.update(out['macd'], out['macd_signal'])
+            np.subtract(out['macd'], out['macd_signal'], out=out['macd_hist'])
+
+            # True range: the largest of the three ranges that are defined
+            true_range = np.subtract(high, low, out=scratch[0])
+            np.fmax(true_range, np.abs(high - prev_close), out=true_range)
+            np.fmax(true_range, np.abs(low - prev_close), out=true_range)
+            self.atr.update(true_range, out['atr'])
+            self.ema_fast.update(close, out['ema_fast'])
+            self.ema_slow.update(close, out['ema_slow'])
+
+            self.bands.update(close, out['upper_band'], scratch[1], BB_STD)
+            np.subtract(out['upper_band'], scratch[1], out=out['lower_band'])
+            out['upper_band'] += scratch[1]
+            self.vol_sma.update(volume, out['vol_sma'])
+
+            np.divide(out['atr'], self.atr_lag5.update(out['atr']), out=out['atr_ratio'])
+            out['prev_atr'][:] = self.atr_lag1.update(out['atr'])
+        return out
+
+def check_kernel(signal_generator, high, low, close, volume, rtol=INDICATOR_KERNEL_RTOL):
+    """
+    Equivalence check of the kernel against the pandas implementations on
+    the given series. Returns {name: (max relative deviation, ok)}; NaN
+    positions must match exactly. Deviations are relative to each
+    indicator's largest magnitude, so values near zero (MACD around a
+    crossover) are not held to a tighter bound than their rounding allows.
+    """
+    arrays = [np.asarray(a, dtype=np.float64) for a in (high, low, close, volume)]
+    kernel = IndicatorKernel(signal_generator).update(*arrays)
+    reference = signal_generator.compute_indicators_pandas(*arrays)
+    report = {}
+    for name in COLUMNS:
+        a, b = kernel[name], np.asarray(reference[name], dtype=np.float64)
+        same_nan = np.array_equal(np.isnan(a), np.isnan(b))
+        valid = ~np.isnan(b)
+        scale = np.abs(b[valid]).max() if valid.any() else 0.
+        deviation = float(np.abs(a[valid] - b[valid]).max() / scale) if scale > 0 else 0.
+        if not same_nan:
+            deviation = math.inf
+        report[name] = (deviation, deviation <= rtol)
+    return report
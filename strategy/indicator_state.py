@@ -0,0 +1,259 @@
+import math
+from collections import deque
+import numpy as np
+from config.settings import ATR_PERIOD, EMA_FAST, EMA_SLOW, BB_PERIOD, BB_STD
+
+NAN = float('nan')
+
+# Incremental versions of the pandas kernels used by Indicators.
+# They carry their running state across calls, so feeding a series chunk by
+# chunk gives bit-identical output to one pandas call on the whole series
+# (same operation order, including pandas' Kahan compensation terms).
+
+def _center_of_mass(com=None, span=None, alpha=None):
+    # Same float path as pandas' get_center_of_mass
+    if com is not None:
+        return float(com)
+    if span is not None:
+        return float((span - 1) / 2)
+    return float((1 - alpha) / alpha)
+
+class EwmMean:
+    """Series.ewm(...).mean() (ignore_na=False)"""
+    def __init__(self, com=None, span=None, alpha=None, adjust=True, min_periods=0):
+        com = _center_of_mass(com, span, alpha)
+        self.alpha = 1. / (1. + com)
+        self.old_wt_factor = 1. - self.alpha
+        self.new_wt = 1. if adjust else self.alpha
+        self.adjust = adjust
+        self.min_periods = max(int(min_periods), 1)
+        self.weighted = NAN
+        self.old_wt = 1.
+        self.nobs = 0
+
+    def update(self, values):
+        weighted, old_wt, nobs = self.weighted, self.old_wt, self.nobs
+        old_wt_factor, new_wt, adjust, minp = self.old_wt_factor, self.new_wt, self.adjust, self.min_periods
+        out = np.empty(len(values))
+        for i, cur in enumerate(values.tolist()):
+            is_observation = cur == cur
+            nobs += is_observation
+            if weighted == weighted:
+                old_wt *= old_wt_factor
+                if is_observation:
+                    if weighted != cur:
+                        weighted = old_wt * weighted + new_wt * cur
+                        weighted /= (old_wt + new_wt)
+                    old_wt = old_wt + new_wt if adjust else 1.
+            elif is_observation:
+                weighted = cur
+            out[i] = weighted if nobs >= minp else NAN
+        self.weighted, self.old_wt, self.nobs = weighted, old_wt, nobs
+        return out
+
+class RollingMean:
+    """Series.rolling(window).mean()"""
+    def __init__(self, window, min_periods=None):
+        self.window = int(window)
+        self.min_periods = self.window if min_periods is None else int(min_periods)
+        self.tail = deque() # last `window` values, needed to remove them later
+        self.nobs = 0
+        self.neg_ct = 0
+        self.sum_x = 0.
+        self.compensation_add = 0.
+        self.compensation_remove = 0.
+        self.num_consecutive_same_value = 0
+        self.prev_value = None
+
+    def update(self, values):
+        values = values.tolist()
+        if self.prev_value is None and values:
+            self.prev_value = values[0]
+        nobs, neg_ct, sum_x = self.nobs, self.neg_ct, self.sum_x
+        comp_add, comp_remove = self.compensation_add, self.compensation_remove
+        same, prev_value = self.num_consecutive_same_value, self.prev_value
+        window, minp = self.window, self.min_periods
+        tail = self.tail
+
+        out = np.empty(len(values))
+        for i, val in enumerate(values):
+            if len(tail) == window:
+                # remove the value leaving the window
+                old = tail.popleft()
+                if old == old:
+                    nobs -= 1
+                    y = -old - comp_remove
+                    t = sum_x + y
+                    comp_remove = t - sum_x - y
+                    sum_x = t
+                    if math.copysign(1., old) < 0:
+                        neg_ct -= 1
+            tail.append(val)
+            if val == val:
+                nobs += 1
+                y = val - comp_add
+                t = sum_x + y
+                comp_add = t - sum_x - y
+                sum_x = t
+                if math.copysign(1., val) < 0:
+                    neg_ct += 1
+                same = same + 1 if val == prev_value else 1
+                prev_value = val
+
+            if nobs >= minp and nobs > 0:
+                result = sum_x / nobs
+                if same >= nobs:
+                    result = prev_value
+                elif neg_ct == 0 and result < 0:
+                    result = 0.
+                elif neg_ct == nobs and result > 0:
+                    result = 0.
+            else:
+                result = NAN
+            out[i] = result
+
+        self.nobs, self.neg_ct, self.sum_x = nobs, neg_ct, sum_x
+        self.compensation_add, self.compensation_remove = comp_add, comp_remove
+        self.num_consecutive_same_value, self.prev_value = same, prev_value
+        return out
+
+class RollingStd:
+    """Series.rolling(window).std(ddof) (Welford with Kahan compensation, like pandas)"""
+    def __init__(self, window, min_periods=None, ddof=1):
+        self.window = int(window)
+        self.min_periods = max(self.window if min_periods is None else int(min_periods), 1)
+        self.ddof = ddof
+        self.tail = deque()
+        self.nobs = 0.
+        self.mean_x = 0.
+        self.ssqdm_x = 0.
+        self.compensation_add = 0.
+        self.compensation_remove = 0.
+        self.num_consecutive_same_value = 0
+        self.prev_value = None
+
+    def update(self, values):
+        values = values.tolist()
+        if self.prev_value is None and values:
+            self.prev_value = values[0]
+        nobs, mean_x, ssqdm_x = self.nobs, self.mean_x, self.ssqdm_x
+        comp_add, comp_remove = self.compensation_add, self.compensation_remove
+        same, prev_value = self.num_consecutive_same_value, self.prev_value
+        window, minp, ddof = self.window, self.min_periods, self.ddof
+        tail = self.tail
+
+        out = np.empty(len(values))
+        for i, val in enumerate(values):
+            if len(tail) == window:
+                old = tail.popleft()
+                if old == old:
+                    nobs -= 1
+                    if nobs:
+                        prev_mean = mean_x - comp_remove
+                        y = old - comp_remove
+                        t = y - mean_x
+                        comp_remove = t + mean_x - y
+                        mean_x = mean_x - t / nobs
+                        ssqdm_x = ssqdm_x - (old - prev_mean) * (old - mean_x)
+                    else:
+                        mean_x = 0.
+                        ssqdm_x = 0.
+            tail.append(val)
+            if val == val:
+                nobs += 1
+                same = same + 1 if val == prev_value else 1
+                prev_value = val
+                prev_mean = mean_x - comp_add
+                y = val - comp_add
+                t = y - mean_x
+                comp_add = t + mean_x - y
+                mean_x = mean_x + t / nobs
+                ssqdm_x = ssqdm_x + (val - prev_mean) * (val - mean_x)
+
+            if nobs >= minp and nobs > ddof:
+                if nobs == 1 or same >= nobs:
+                    result = 0.
+                else:
+                    result = ssqdm_x / (nobs - ddof)
+                out[i] = math.sqrt(result) if result >= 0 else 0.
+            else:
+                out[i] = NAN
+
+        self.nobs, self.mean_x, self.ssqdm_x = nobs, mean_x, ssqdm_x
+        self.compensation_add, self.compensation_remove = comp_add, comp_remove
+        self.num_consecutive_same_value, self.prev_value = same, prev_value
+        return out
+
+class Lag:
+    """Series.shift(periods) across chunks"""
+    def __init__(self, periods):
+        self.history = np.full(periods, np.nan)
+
+    def update(self, values):
+        joined = np.concatenate([self.history, values])
+        self.history = joined[len(joined) - len(self.history):]
+        return joined[:len(values)]
+
+class IndicatorState:
+    """
+    Streaming counterpart of SignalGenerator.compute_indicators().
+    update() takes the next chunk of OHLCV arrays and returns the same
+    indicator arrays compute_indicators() would return for those rows if it
+    were run on the whole history at once.
+    """
+    def __init__(self, signal_generator):
+        sg = signal_generator
+        self.prev_close = Lag(1)
+        self.rsi_gain = EwmMean(com=sg.rsi_period - 1, min_periods=sg.rsi_period)
+        self.rsi_loss = EwmMean(com=sg.rsi_period - 1, min_periods=sg.rsi_period)
+        self.macd_fast = EwmMean(span=sg.macd_fast, adjust=False)
+        self.macd_slow = EwmMean(span=sg.macd_slow, adjust=False)
+        self.macd_signal = EwmMean(span=sg.macd_signal, adjust=False)
+        self.atr = EwmMean(alpha=1/ATR_PERIOD, min_periods=ATR_PERIOD, adjust=False)
+        self.ema_fast = EwmMean(span=EMA_FAST, adjust=False)
+        self.ema_slow = EwmMean(span=EMA_SLOW, adjust=False)
+        self.bb_mean = RollingMean(BB_PERIOD)
+        self.bb_std = RollingStd(BB_PERIOD)
+        self.vol_sma = RollingMean(20)
+        self.atr_lag5 = Lag(5)
+        self.atr_lag1 = Lag(1)
+
+    def update(self, high, low, close, volume):
+        high = np.asarray(high, dtype=np.float64)
+        low = np.asarray(low, dtype=np.float64)
+        close = np.asarray(close, dtype=np.float64)
+        volume = np.asarray(volume, dtype=np.float64)
+        prev_close = self.prev_close.update(close)
+
+        out = {}
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # RSI (gain/loss filled with 0 where undefined, as in Indicators.calculate_rsi)
+            delta = close - prev_close
+            gain = np.where(delta > 0, delta, 0.)
+            loss = -np.where(delta < 0, delta, 0.)
+            rs = self.rsi_gain.update(gain) / self.rsi_loss.update(loss)
+            out['rsi'] = 100 - (100 / (1 + rs))
+
+            exp1 = self.macd_fast.update(close)
+            exp2 = self.macd_slow.update(close)
+            out['macd'] = exp1 - exp2
+            out['macd_signal'] = self.macd_signal.update(out['macd'])
+            out['macd_hist'] = out['macd'] - out['macd_signal']
+
+            # True range: max of the three ranges, skipping the undefined ones
+            ranges = np.column_stack([high - low, np.abs(high - prev_close), np.abs(low - prev_close)])
+            true_range = np.where(np.isnan(ranges).all(axis=1), np.nan,
+                                  np.max(np.where(np.isnan(ranges), -np.inf, ranges), axis=1))
+            out['atr'] = self.atr.update(true_range)
+            out['ema_fast'] = self.ema_fast.update(close)
+            out['ema_slow'] = self.ema_slow.update(close)
+
+            sma = self.bb_mean.update(close)
+            std = self.bb_std.update(close)
+            out['upper_band'] = sma + (std * BB_STD)
+            out['lower_band'] = sma - (std * BB_STD)
+            out['vol_sma'] = self.vol_sma.update(volume)
+
+            out['atr_ratio'] = out['atr'] / self.atr_lag5.update(out['atr'])
+            out['prev_atr'] = self.atr_lag1.update(out['atr'])
+        return out
@@ -1,49 +1,172 @@
+import numpy as np
+import pandas as pd
 from .indicators import Indicators
-from config.settings import RSI_OVERBOUGHT, ATR_PERIOD, EMA_FAST, EMA_SLOW, BB_PERIOD, BB_STD, BB_WIDTH_THRESHOLD, ATR_VOLATILITY_THRESHOLD
+from .indicator_state import IndicatorState
+from .indicator_kernel import IndicatorKernel, kernel_supports
+from config.settings import INDICATOR_KERNEL, RSI_OVERBOUGHT, ATR_PERIOD, EMA_FAST, EMA_SLOW, BB_PERIOD, BB_STD, BB_WIDTH_THRESHOLD, ATR_VOLATILITY_THRESHOLD
+
+# Entry rules: name -> (vectorized mask, row-wise check) methods of SignalGenerator
+ENTRY_RULES = {
+    'trend': ('trend_following_mask', 'check_trend_following_buy_signal'),  # EMA Cross + BB Breakout + Volume
+    'reversal': ('buy_signal_mask', 'check_buy_signal'),  # RSI + MACD Reversal
+}
+
+def _join(candles, indicators):
+    """
+    Candles and indicator columns side by side without copying either:
+    under pandas copy-on-write the result shares their arrays, and a write
+    to it copies only the written column, so the inputs stay read-only.
+    """
+    stale = candles.columns.intersection(indicators.columns)
+    if len(stale):
+        candles = candles.drop(columns=stale)
+    return pd.concat([candles, indicators], axis=1)
 
 class SignalGenerator:
-    def __init__(self, rsi_oversold=30, rsi_period=14, macd_fast=12, macd_slow=26, macd_signal=9):
+    def __init__(self, rsi_oversold=30, rsi_period=14, macd_fast=12, macd_slow=26, macd_signal=9,
+                 use_kernel=INDICATOR_KERNEL):
         self.rsi_oversold = rsi_oversold
         self.rsi_period = rsi_period
         self.macd_fast = macd_fast
         self.macd_slow = macd_slow
         self.macd_signal = macd_signal
+        self.use_kernel = use_kernel
+
+    def params(self):
+        """Parameters that define this generator's indicators and thresholds"""
+        return {
+            'rsi_oversold': self.rsi_oversold,
+            'rsi_period': self.rsi_period,
+            'macd_fast': self.macd_fast,
+            'macd_slow': self.macd_slow,
+            'macd_signal': self.macd_signal,
+        }
+
+    def indicator_frame(self, df):
+        """
+        Indicator columns for df's candles as a separate frame (same index).
+        df is only read, so one frame can be shared by every run with the
+        same indicator_params().
+        """
+        return pd.DataFrame(self.compute_indicators(
+            df['high'].to_numpy(dtype=np.float64),
+            df['low'].to_numpy(dtype=np.float64),
+            df['close'].to_numpy(dtype=np.float64),
+            df['volume'].to_numpy(dtype=np.float64)
+        ), index=df.index)
+
+    def process(self, df, indicators=None):
+        """
+        Candles plus indicator columns as a new frame; df is not modified.
+        indicators: a precomputed indicator_frame(df) to reuse.
+        """
+        if indicators is None:
+            indicators = self.indicator_frame(df)
+        return _join(df, indicators)
+
+    def indicator_params(self):
+        """The subset of params() the indicator columns depend on (the rest are thresholds)"""
+        return {
+            'rsi_period': self.rsi_period,
+            'macd_fast': self.macd_fast,
+            'macd_slow': self.macd_slow,
+            'macd_signal': self.macd_signal,
+        }
+
+    def indicator_state(self):
+        """Running indicator state for process_chunk()"""
+        return IndicatorKernel(self) if self.use_kernel else IndicatorState(self)
 
-    def process(self, df):
+    def process_chunk(self, df, state):
         """
-        Adds indicators to the dataframe and generates signals
+        process() for one chunk of a longer series. `state` carries the
+        indicators across chunks, so the columns match process() on the whole series.
+        The chunk itself is not modified.
+        """
+        indicators = state.update(
+            df['high'].to_numpy(dtype=np.float64),
+            df['low'].to_numpy(dtype=np.float64),
+            df['close'].to_numpy(dtype=np.float64),
+            df['volume'].to_numpy(dtype=np.float64)
+        )
+        return _join(df, pd.DataFrame(indicators, index=df.index))
+
+    def compute_indicators(self, high, low, close, volume):
         """
+        Indicator arrays from OHLCV arrays, from the fused kernel
+        (strategy/indicator_kernel.py) unless it is disabled or the input has gaps.
+        """
+        if self.use_kernel and kernel_supports(high, low, close, volume):
+            return IndicatorKernel(self).update(high, low, close, volume)
+        return self.compute_indicators_pandas(high, low, close, volume)
+
+    def compute_indicators_pandas(self, high, low, close, volume):
+        """
+        Indicator arrays from OHLCV arrays, one Indicators call per indicator.
+        Inputs are wrapped as Series without copying, so views into a
+        candle buffer can be passed directly.
+        """
+        high = pd.Series(high, copy=False)
+        low = pd.Series(low, copy=False)
+        close = pd.Series(close, copy=False)
+        volume = pd.Series(volume, copy=False)
+
+        out = {}
         # Calculate Indicators
-        df['rsi'] = Indicators.calculate_rsi(df['close'], period=self.rsi_period)
-        df['macd'], df['macd_signal'], df['macd_hist'] = Indicators.calculate_macd(
-            df['close'], 
+        out['rsi'] = Indicators.calculate_rsi(close, period=self.rsi_period)
+        out['macd'], out['macd_signal'], out['macd_hist'] = Indicators.calculate_macd(
+            close, 
             fast=self.macd_fast, 
             slow=self.macd_slow, 
             signal=self.macd_signal
         )
         
         # New Indicators
-        df['atr'] = Indicators.calculate_atr(df['high'], df['low'], df['close'], period=ATR_PERIOD)
-        df['ema_fast'] = Indicators.calculate_ema(df['close'], period=EMA_FAST)
-        df['ema_slow'] = Indicators.calculate_ema(df['close'], period=EMA_SLOW)
-        df['upper_band'], df['lower_band'] = Indicators.calculate_bollinger_bands(df['close'], period=BB_PERIOD, std_dev=BB_STD)
-        df['vol_sma'] = Indicators.calculate_sma(df['volume'], period=20) # 20 period MA for volume
-
-        # New Indicators
-        df['atr'] = Indicators.calculate_atr(df['high'], df['low'], df['close'], period=ATR_PERIOD)
-        df['ema_fast'] = Indicators.calculate_ema(df['close'], period=EMA_FAST)
-        df['ema_slow'] = Indicators.calculate_ema(df['close'], period=EMA_SLOW)
-        df['upper_band'], df['lower_band'] = Indicators.calculate_bollinger_bands(df['close'], period=BB_PERIOD, std_dev=BB_STD)
-        df['vol_sma'] = Indicators.calculate_sma(df['volume'], period=20) # 20 period MA for volume
+        out['atr'] = Indicators.calculate_atr(high, low, close, period=ATR_PERIOD)
+        out['ema_fast'] = Indicators.calculate_ema(close, period=EMA_FAST)
+        out['ema_slow'] = Indicators.calculate_ema(close, period=EMA_SLOW)
+        out['upper_band'], out['lower_band'] = Indicators.calculate_bollinger_bands(close, period=BB_PERIOD, std_dev=BB_STD)
+        out['vol_sma'] = Indicators.calculate_sma(volume, period=20) # 20 period MA for volume
 
         # Logic Refinements:
         # 1. Volatility Filter: ATR(t) / ATR(t-5)
-        df['atr_ratio'] = df['atr'] / df['atr'].shift(5)
+        out['atr_ratio'] = out['atr'] / out['atr'].shift(5)
         
         # 2. Risk Management ATR: prev_atr = ATR(t-1)
-        df['prev_atr'] = df['atr'].shift(1)
+        out['prev_atr'] = out['atr'].shift(1)
+
+        return {name: series.to_numpy() for name, series in out.items()}
+
+    # --- Vectorized counterparts of the row-wise checks ---
+    # Boolean arrays over a processed frame; element i equals the row-wise
+    # check on row i (NaN comparisons are False in both).
+
+    def volatility_explosion_mask(self, df, threshold=ATR_VOLATILITY_THRESHOLD):
+        """check_volatility_explosion() for every row"""
+        if 'atr_ratio' not in df:
+            return np.zeros(len(df), dtype=bool)
+        return df['atr_ratio'].to_numpy(dtype=np.float64) > threshold
+
+    def buy_signal_mask(self, df):
+        """check_buy_signal() for every row (RSI + MACD Reversal)"""
+        macd_bullish = df['macd'].to_numpy(dtype=np.float64) > df['macd_signal'].to_numpy(dtype=np.float64)
+        rsi_is_oversold = df['rsi'].to_numpy(dtype=np.float64) < self.rsi_oversold
+        return macd_bullish & rsi_is_oversold & ~self.volatility_explosion_mask(df)
+
+    def trend_following_mask(self, df):
+        """check_trend_following_buy_signal() for every row (EMA Cross + BB Breakout + Volume)"""
+        ema_bullish = df['ema_fast'].to_numpy(dtype=np.float64) > df['ema_slow'].to_numpy(dtype=np.float64)
+        bb_breakout = df['close'].to_numpy(dtype=np.float64) > df['upper_band'].to_numpy(dtype=np.float64)
+        volume_spike = df['volume'].to_numpy(dtype=np.float64) > df['vol_sma'].to_numpy(dtype=np.float64)
+        return ema_bullish & bb_breakout & volume_spike & ~self.volatility_explosion_mask(df)
+
+    def entry_mask(self, df, rule='trend'):
+        """Entry signal of ENTRY_RULES[rule] for every row"""
+        return getattr(self, ENTRY_RULES[rule][0])(df)
 
-        return df
+    def check_entry(self, row, rule='trend'):
+        """Row-wise entry signal of ENTRY_RULES[rule]"""
+        return getattr(self, ENTRY_RULES[rule][1])(row)
 
     def check_buy_signal(self, row):
         """
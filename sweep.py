@@ -0,0 +1,268 @@
+import argparse
+import time
+import threading
+import multiprocessing
+import numpy as np
+import pandas as pd
+from utils.data_loader import load_data
+from backtester.backtest_engine import BacktestEngine
+from backtester.job_queue import JobQueue, DEFAULT_DB_PATH, worker_id
+from backtester.metrics import METRICS
+from backtester.result_cache import ResultCache, data_fingerprint, summarize
+from backtester.execution import load_depth_model
+from strategy.signal import SignalGenerator
+from backtester.grid import grid_points
+from utils.intervals import INTERVAL_MINUTES
+from config.logging_config import setup_logging, get_logger
+from config.settings import TARGET_COIN, RSI_OVERSOLD, TICKER_INTERVAL, JOB_POLL_SECONDS, JOB_LEASE_SECONDS
+
+setup_logging()
+logger = get_logger("Sweep")
+
+# Engine keyword arguments a grid point may set (the rest go to SignalGenerator)
+ENGINE_PARAMS = ('stop_loss_pct', 'take_profit_pct', 'max_hold_days')
+
+def create_sweep(queue, args):
+    markets = [m.strip() for m in args.markets.split(",") if m.strip()]
+    spec = {
+        'mode': args.mode,
+        'markets': markets,
+        'days': args.days,
+        'end': args.end,
+        'interval': args.interval,
+        'folds': args.folds,
+        'rsi': args.rsi,
+        'depth': args.depth,
+    }
+    points = grid_points(args.mode, args.rsi)
+    units = [(market, fold, params) for market in markets for fold in range(args.folds) for params in points]
+    if queue.create_sweep(args.name, spec, units):
+        print(f"Sweep '{args.name}': {len(units)} units ({len(markets)} markets x {args.folds} folds x {len(points)} grid points)")
+    else:
+        print(f"Sweep '{args.name}' already exists with this spec; nothing added")
+
+def load_market(spec, market):
+    """The sweep's candle window for a market (pinned to spec['end'] when given)"""
+    if spec['end']:
+        end = pd.Timestamp(spec['end'])
+        return load_data(market, start=end - pd.Timedelta(days=spec['days']), end=end, interval=spec['interval'])
+    return load_data(market, spec['days'], interval=spec['interval'])
+
+def fold_frame(df, fold, folds):
+    """Fold `fold` of `folds` consecutive, equally sized time windows"""
+    bounds = np.linspace(0, len(df), folds + 1).astype(int)
+    return df.iloc[bounds[fold]:bounds[fold + 1]].reset_index(drop=True)
+
+def run_unit(spec, unit, frames, cache):
+    """Backtest one unit; returns (summary, data fingerprint)"""
+    key = (unit['market'], unit['fold'])
+    if key not in frames:
+        market_key = (unit['market'], None)
+        if market_key not in frames:
+            df = load_market(spec, unit['market'])
+            if df is None or df.empty:
+                raise ValueError(f"No {spec['interval']} data for {unit['market']}")
+            frames[market_key] = df
+        df = fold_frame(frames[market_key], unit['fold'], spec['folds'])
+        execution = None
+        if spec['depth']:
+            execution = load_depth_model(unit['market'], df['datetime'].iloc[0], df['datetime'].iloc[-1])
+        frames[key] = (df, data_fingerprint(df), execution)
+    df, fingerprint, execution = frames[key]
+
+    params = unit['params']
+    signal_gen = SignalGenerator(**{k: v for k, v in params.items() if k not in ENGINE_PARAMS})
+    # Units differing only in thresholds / risk params share one indicator frame
+    indicator_key = (unit['market'], unit['fold'], tuple(sorted(signal_gen.indicator_params().items())))
+    if indicator_key not in frames:
+        frames[indicator_key] = signal_gen.indicator_frame(df)
+    engine = BacktestEngine(
+        df, signal_generator=signal_gen, bar_interval=spec['interval'], execution=execution,
+        indicators=frames[indicator_key], **{k: v for k, v in params.items() if k in ENGINE_PARAMS}
+    )
+    if cache is None:
+        return summarize(engine.run()), fingerprint
+    # A unit re-leased after a crash finds the first attempt's result here if it got that far
+    summary, _ = cache.get_or_run(engine, fingerprint, market=unit['market'])
+    return summary, fingerprint
+
+class LeaseHeartbeat:
+    """Renews a unit's lease in the background while it runs"""
+    def __init__(self, queue, sweep, unit, owner):
+        self.queue, self.sweep, self.unit, self.owner = queue, sweep, unit, owner
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self.stopped.wait(self.queue.lease_seconds / 3):
+            if not self.queue.renew(self.sweep, self.unit, self.owner):
+                logger.warning(f"Lost the lease on unit {self.unit}; finishing it anyway")
+                return
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stopped.set()
+        self.thread.join()
+
+def work(db_path, sweep, use_cache=True, max_units=None, lease_seconds=JOB_LEASE_SECONDS, poll_seconds=JOB_POLL_SECONDS):
+    """
+    Worker loop: claim, run and complete units until the sweep is finished
+    (or max_units are done). While other workers hold leases it keeps polling,
+    so units of a worker that dies are picked up once their lease expires.
+    """
+    queue = JobQueue(db_path, lease_seconds=lease_seconds)
+    spec = queue.get_spec(sweep)
+    if spec is None:
+        logger.error(f"No sweep named '{sweep}' in {db_path}")
+        return 0
+    owner = worker_id()
+    cache = ResultCache() if use_cache else None
+    frames = {}
+    completed = 0
+    while max_units is None or completed < max_units:
+        unit = queue.claim(sweep, owner)
+        if unit is None:
+            if queue.is_finished(sweep):
+                break
+            time.sleep(poll_seconds)
+            continue
+        with LeaseHeartbeat(queue, sweep, unit['unit'], owner):
+            try:
+                summary, fingerprint = run_unit(spec, unit, frames, cache)
+            except Exception as e:
+                logger.error(f"Unit {unit['unit']} ({unit['market']} fold {unit['fold']}) failed: {e}")
+                queue.fail(sweep, unit['unit'], owner, e)
+                continue
+        if not queue.complete(sweep, unit['unit'], owner, summary, fingerprint):
+            logger.info(f"Unit {unit['unit']} was already completed by another worker")
+        completed += 1
+    logger.info(f"Worker {owner} completed {completed} units")
+    return completed
+
+def run_workers(args):
+    queue = JobQueue(args.db)
+    if args.retry_failed:
+        print(f"Reset {queue.reset_failed(args.name)} failed units")
+    worker_args = (args.db, args.name, not args.no_cache, args.max_units, args.lease_seconds)
+    if args.workers == 1:
+        work(*worker_args)
+    else:
+        processes = [
+            multiprocessing.Process(target=work, args=worker_args)
+            for _ in range(args.workers)
+        ]
+        for p in processes:
+            p.start()
+        for p in processes:
+            p.join()
+    print_status(queue, args.name)
+
+def print_status(queue, sweep):
+    spec = queue.get_spec(sweep)
+    if spec is None:
+        print(f"No sweep named '{sweep}'")
+        return
+    counts = queue.counts(sweep)
+    total = sum(counts.values())
+    done = counts.get('done', 0)
+    print(f"\nSweep '{sweep}' ({spec['mode']}, {len(spec['markets'])} markets, {spec['folds']} folds, {spec['interval']})")
+    print(f"Progress: {done}/{total} done ({done / total * 100 if total else 0:.1f}%)")
+    for status in ('pending', 'leased', 'expired', 'failed'):
+        if counts.get(status):
+            print(f"  {status:<8} {counts[status]}")
+
+    units = queue.units(sweep)
+    now = time.time()
+    for unit in units:
+        if unit['status'] == 'leased' and unit['lease_expires'] >= now:
+            print(f"  unit {unit['unit']:>5} {unit['market']} fold {unit['fold']} leased by {unit['lease_owner']} "
+                  f"({unit['lease_expires'] - now:.0f}s left, attempt {unit['attempts']})")
+        elif unit['status'] == 'failed':
+            print(f"  unit {unit['unit']:>5} {unit['market']} fold {unit['fold']} FAILED after {unit['attempts']} attempts: {unit['error']}")
+
+    # Workers on hosts with different data would silently mix windows
+    fingerprints = {}
+    for unit in units:
+        if unit['data_fingerprint']:
+            fingerprints.setdefault((unit['market'], unit['fold']), set()).add(unit['data_fingerprint'])
+    for (market, fold), prints in sorted(fingerprints.items()):
+        if len(prints) > 1:
+            print(f"  WARNING: {market} fold {fold} was run on {len(prints)} different data sets (pin the window with --end)")
+
+def results_frame(queue, sweep):
+    rows = []
+    for unit in queue.units(sweep, status='done'):
+        rows.append({
+            'market': unit['market'],
+            'fold': unit['fold'],
+            **unit['params'],
+            **unit['result']['metrics'],
+            'final_balance': unit['result']['final_balance'],
+        })
+    return pd.DataFrame(rows)
+
+def print_results(queue, args):
+    df = results_frame(queue, args.name)
+    if df.empty:
+        print("No completed units yet.")
+        return
+    ascending = not METRICS[args.rank_by]
+    param_columns = [c for c in df.columns if c not in METRICS and c not in ('market', 'fold', 'final_balance')]
+
+    spec = queue.get_spec(args.name)
+    if spec['folds'] > 1:
+        # Mean over folds; a parameter set is only as good as its folds on average
+        grouped = df.groupby(['market'] + param_columns)
+        summary = grouped[list(METRICS) + ['final_balance']].mean()
+        summary['folds'] = grouped.size()
+        df_ranked = summary.reset_index().sort_values(by=args.rank_by, ascending=ascending)
+        print(f"\n--- Sweep '{args.name}', mean over folds, ranked by {args.rank_by} ---")
+    else:
+        df_ranked = df.drop(columns=['fold']).sort_values(by=args.rank_by, ascending=ascending)
+        print(f"\n--- Sweep '{args.name}', ranked by {args.rank_by} ---")
+    print(df_ranked.head(args.top).to_string(index=False))
+
+    output_file = f"sweep_results_{args.name}.csv"
+    df.sort_values(by=['market', 'fold', args.rank_by], ascending=[True, True, ascending]).to_csv(output_file, index=False)
+    print(f"\nAll unit results saved to {output_file}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Distributed, resumable optimization sweeps")
+    parser.add_argument("command", choices=['create', 'work', 'status', 'results'], help="create a sweep, run workers, show progress, or rank results")
+    parser.add_argument("--name", type=str, required=True, help="Sweep name")
+    parser.add_argument("--db", type=str, default=DEFAULT_DB_PATH, help=f"Sweep database, shared by all workers (default: {DEFAULT_DB_PATH})")
+    # create
+    parser.add_argument("--mode", type=str, default='rsi', choices=['rsi', 'pnl'], help="Grid to sweep, as in optimize.py (default: rsi)")
+    parser.add_argument("--markets", type=str, default=TARGET_COIN, help=f"Comma-separated markets (default: {TARGET_COIN})")
+    parser.add_argument("--days", type=int, default=365, help="Days of history (default: 365)")
+    parser.add_argument("--end", type=str, default=None, help="Pin the window's end (e.g. 2024-06-30) so every host backtests the same candles")
+    parser.add_argument("--interval", type=str, default=TICKER_INTERVAL, choices=list(INTERVAL_MINUTES), help=f"Bar interval (default: {TICKER_INTERVAL})")
+    parser.add_argument("--folds", type=int, default=1, help="Split the window into N consecutive folds, each a separate unit (default: 1)")
+    parser.add_argument("--rsi", type=float, default=RSI_OVERSOLD, help=f"Fixed RSI threshold in pnl mode (default: {RSI_OVERSOLD})")
+    parser.add_argument("--depth", action="store_true", help="Price fills from stored order book depth")
+    # work
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes to start on this host (default: 1)")
+    parser.add_argument("--max-units", type=int, default=None, help="Each worker exits after completing this many units")
+    parser.add_argument("--lease-seconds", type=float, default=JOB_LEASE_SECONDS, help=f"Lease length; a crashed worker's unit is re-run after this long (default: {JOB_LEASE_SECONDS})")
+    parser.add_argument("--retry-failed", action="store_true", help="Give failed units a fresh set of attempts before working")
+    parser.add_argument("--no-cache", action="store_true", help="Do not consult or fill the result cache")
+    # results
+    parser.add_argument("--rank-by", type=str, default='return_pct', choices=list(METRICS), help="Metric to rank results by (default: return_pct)")
+    parser.add_argument("--top", type=int, default=10, help="Rows to print (default: 10)")
+    args = parser.parse_args()
+
+    queue = JobQueue(args.db)
+    if args.command == 'create':
+        create_sweep(queue, args)
+    elif args.command == 'work':
+        run_workers(args)
+    elif args.command == 'status':
+        print_status(queue, args.name)
+    elif args.command == 'results':
+        print_results(queue, args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+import os
+import sys
+import pandas as pd
+import pytest
+
+# Tests import the project modules the way the CLIs do, from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_fetcher.upbit_api import UpbitAPI
+from data_fetcher.fake_upbit import FakeUpbitServer, FakeExchange, FaultInjector
+from utils.candle_pyramid import save_candles
+from utils.synthetic_data import generate_market
+
+FAKE_MARKET = "KRW-TEST"
+FAKE_AS_OF = pd.Timestamp("2025-01-15 09:00")
+PLACEHOLDER_KEY = "test-placeholder-key-0123456789abcdef"
+
+@pytest.fixture
+def fake_server(tmp_path):
+    """Fake Upbit server over one synthetic hourly market, without rate limits"""
+    save_candles(FAKE_MARKET, generate_market(10 / 365, "minute60", 7, end=FAKE_AS_OF),
+                 data_dir=str(tmp_path), interval="minute60", rollups=None)
+    exchange = FakeExchange(data_dir=str(tmp_path), as_of=FAKE_AS_OF, history_days=30)
+    faults = FaultInjector(rate_limits={'quotation': 0, 'order': 0, 'exchange': 0})
+    server = FakeUpbitServer(port=0, exchange=exchange, faults=faults)
+    server.serve_in_background()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def fake_api(fake_server):
+    api = UpbitAPI(base_url=fake_server.url)
+    api.access_key = api.secret_key = PLACEHOLDER_KEY
+    return api
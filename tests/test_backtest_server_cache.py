@@ -0,0 +1,76 @@
+import threading
+import time
+import pandas as pd
+import pytest
+
+import backtester.server as server
+from backtester.server import MarketCache
+from utils.synthetic_data import generate_market
+
+LOAD_SECONDS = 0.3
+
+class SlowStore:
+    """load_data/data_version stand-ins: each load takes LOAD_SECONDS; counts loads and peak concurrency"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.loads = []
+        self.active = 0
+        self.peak = 0
+
+    def load_data(self, market, days, data_dir="data", interval="minute60"):
+        with self.lock:
+            self.loads.append(market)
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(LOAD_SECONDS)
+        with self.lock:
+            self.active -= 1
+        if market == "KRW-NONE":
+            return pd.DataFrame()
+        return generate_market(days / 365, interval, len(market))
+
+    def data_version(self, market, interval, data_dir="data"):
+        return 1
+
+@pytest.fixture
+def store(monkeypatch):
+    store = SlowStore()
+    monkeypatch.setattr(server, "load_data", store.load_data)
+    monkeypatch.setattr(server, "data_version", store.data_version)
+    return store
+
+def in_threads(*calls):
+    results = [None] * len(calls)
+    def run(i, call):
+        try:
+            results[i] = call()
+        except Exception as e:
+            results[i] = e
+    threads = [threading.Thread(target=run, args=(i, call)) for i, call in enumerate(calls)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+def test_different_markets_load_concurrently(store):
+    cache = MarketCache()
+    started = time.perf_counter()
+    in_threads(*[lambda m=m: cache.frame(m, 10, "minute60") for m in ("KRW-A", "KRW-BB", "KRW-CCC")])
+    assert store.peak == 3
+    assert time.perf_counter() - started < 2 * LOAD_SECONDS
+
+def test_same_key_loads_once(store):
+    cache = MarketCache()
+    results = in_threads(*[lambda: cache.frame("KRW-A", 10, "minute60")] * 4)
+    assert store.loads == ["KRW-A"]
+    assert all(df is results[0][0] for df, _ in results)
+    assert cache.stats()['misses'] == 1
+
+def test_failed_load_is_not_cached(store):
+    cache = MarketCache()
+    results = in_threads(*[lambda: cache.frame("KRW-NONE", 10, "minute60")] * 2)
+    assert all(isinstance(r, ValueError) for r in results)
+    with pytest.raises(ValueError):
+        cache.frame("KRW-NONE", 10, "minute60")
+    assert len(store.loads) == 2
@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+import collect_data
+from collect_data import collect_ticks
+from utils.tick_store import load_ticks, load_coverage
+
+MARKET = "KRW-TEST"
+DAY_MS = 86_400_000
+DAY0 = 1_736_000_000_000 - 1_736_000_000_000 % DAY_MS # a UTC midnight
+
+class TickAPI:
+    """/v1/trades/ticks over an in-memory trade list; raises KeyboardInterrupt after `fail_after` calls"""
+    def __init__(self, days=2, per_day=95, fail_after=None):
+        self.trades = []
+        for _ in range(days):
+            self.add_trades(per_day)
+        self.fail_after = fail_after
+        self.calls = 0
+
+    def add_trades(self, count, day=None):
+        day = len(self.trades) // 95 if day is None else day
+        for _ in range(count):
+            seq = len(self.trades) + 1
+            self.trades.append({'timestamp': DAY0 + day * DAY_MS + seq * 1000, 'sequential_id': seq,
+                                'trade_price': 100.0 + seq % 7, 'trade_volume': 0.5, 'ask_bid': 'BID'})
+
+    def _day(self, trade):
+        return trade['timestamp'] // DAY_MS
+
+    def get_trade_ticks(self, market, count=500, cursor=None, days_ago=None):
+        self.calls += 1
+        if self.fail_after is not None and self.calls > self.fail_after:
+            raise KeyboardInterrupt
+        day = self._day(self.trades[-1]) - (days_ago or 0)
+        page = [t for t in reversed(self.trades)
+                if self._day(t) == day and (cursor is None or t['sequential_id'] < cursor)]
+        return page[:count]
+
+@pytest.fixture(autouse=True)
+def small_pages(monkeypatch):
+    monkeypatch.setattr(collect_data, "TICKS_PER_REQUEST", 10)
+    monkeypatch.setattr(collect_data, "TICK_FLUSH_PAGES", 2)
+
+def stored_ids(data_dir):
+    return set(load_ticks(MARKET, data_dir=str(data_dir))['sequential_id'])
+
+def collect(api, data_dir, days=2):
+    collect_ticks([MARKET], days=days, data_dir=str(data_dir), api=api)
+
+def test_interrupted_day_is_completed_by_next_run(tmp_path):
+    api = TickAPI(fail_after=3)
+    with pytest.raises(KeyboardInterrupt):
+        collect(api, tmp_path)
+    partial = stored_ids(tmp_path)
+    assert partial and len(partial) < 95 # only the newest flushed pages of today
+
+    api.fail_after = None
+    collect(api, tmp_path)
+    assert stored_ids(tmp_path) == {t['sequential_id'] for t in api.trades}
+    assert load_coverage(MARKET, str(tmp_path)) == [(1, 95), (96, 190)] # one range per day paged
+
+def test_gap_between_runs_is_filled(tmp_path):
+    api = TickAPI()
+    collect(api, tmp_path)
+    # New trades; the next run is interrupted after flushing only the newest of them
+    api.add_trades(60, day=1)
+    api.calls, api.fail_after = 0, 3
+    with pytest.raises(KeyboardInterrupt):
+        collect(api, tmp_path)
+    assert len(stored_ids(tmp_path)) < len(api.trades)
+
+    api.fail_after = None
+    collect(api, tmp_path)
+    assert stored_ids(tmp_path) == {t['sequential_id'] for t in api.trades}
+
+def test_complete_store_costs_few_requests(tmp_path):
+    api = TickAPI()
+    collect(api, tmp_path)
+    api.calls = 0
+    collect(api, tmp_path)
+    assert api.calls <= 4 # per day: one page into the covered range, one below it
+    api.add_trades(25, day=1)
+    api.calls = 0
+    collect(api, tmp_path)
+    assert stored_ids(tmp_path) == {t['sequential_id'] for t in api.trades}
+    assert api.calls <= 6
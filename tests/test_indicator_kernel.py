@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from config.settings import INDICATOR_KERNEL_RTOL
+from strategy.indicator_kernel import COLUMNS, IndicatorKernel, check_kernel, kernel_supports
+from strategy.signal import SignalGenerator
+from utils.synthetic_data import generate_market
+
+END = pd.Timestamp("2025-01-15 09:00")
+CHUNKS = (1, 7, 32, 33, 500)
+
+def market(seed, zero_volume=True):
+    """Hourly candles with a few zero-volume stretches (a market with no trades)"""
+    df = generate_market(120 / 365, "minute60", seed, end=END)
+    if zero_volume:
+        for start in (100, 1000, 2000):
+            df.iloc[start:start + 30, df.columns.get_loc('volume')] = 0.
+    return df
+
+def arrays(df):
+    return [df[c].to_numpy(dtype=np.float64) for c in ('high', 'low', 'close', 'volume')]
+
+def chunked(sg, df, size):
+    state = sg.indicator_state()
+    parts = [sg.process_chunk(df.iloc[i:i + size], state) for i in range(0, len(df), size)]
+    return pd.concat(parts)
+
+@pytest.mark.parametrize("seed", [3, 11])
+@pytest.mark.parametrize("params", [{}, {'rsi_period': 7, 'macd_fast': 5, 'macd_slow': 35, 'macd_signal': 5}])
+def test_kernel_matches_pandas_indicators(seed, params):
+    sg = SignalGenerator(**params)
+    report = check_kernel(sg, *arrays(market(seed)))
+    assert set(report) == set(COLUMNS)
+    failed = {name: dev for name, (dev, ok) in report.items() if not ok}
+    assert not failed, f"deviation above {INDICATOR_KERNEL_RTOL}: {failed}"
+
+@pytest.mark.parametrize("size", CHUNKS)
+def test_kernel_chunked_is_bit_identical(size):
+    sg = SignalGenerator(use_kernel=True)
+    df = market(5)
+    whole = sg.process(df)
+    pd.testing.assert_frame_equal(chunked(sg, df, size), whole, check_exact=True)
+
+def with_gap(df):
+    """A stretch of missing candles (NaN prices)"""
+    df = df.copy()
+    df.iloc[500:520, [df.columns.get_loc(c) for c in ('open', 'high', 'low', 'close')]] = np.nan
+    return df
+
+def test_gappy_input_uses_pandas_path():
+    df = with_gap(market(7))
+    data = arrays(df)
+    assert not kernel_supports(*data)
+    with pytest.raises(ValueError):
+        IndicatorKernel(SignalGenerator()).update(*data)
+
+    sg = SignalGenerator(use_kernel=True)
+    out = sg.compute_indicators(*data)
+    reference = sg.compute_indicators_pandas(*data)
+    for name in COLUMNS:
+        np.testing.assert_array_equal(out[name], reference[name])
+
+@pytest.mark.parametrize("size", CHUNKS)
+def test_pandas_state_chunked_matches_one_shot(size):
+    sg = SignalGenerator(use_kernel=False)
+    df = with_gap(market(9))
+    whole = sg.process(df)
+    pd.testing.assert_frame_equal(chunked(sg, df, size), whole, check_exact=False, rtol=INDICATOR_KERNEL_RTOL)
@@ -0,0 +1,53 @@
+import time
+import data_fetcher.upbit_api as upbit_api
+from data_fetcher.upbit_api import ORDER_STATE_UNKNOWN
+from trade.trader import Trader
+from conftest import FAKE_MARKET
+
+def test_timed_out_order_is_unknown_not_failed(fake_server, fake_api, monkeypatch):
+    # Every response arrives after the client gave up, but the order is still placed
+    monkeypatch.setattr(upbit_api, "UPBIT_TIMEOUT", 0.2)
+    fake_server.faults.configure(latency_ms=500)
+    result = fake_api.place_order(FAKE_MARKET, 'bid', price=10000, ord_type='price')
+    assert result['state'] == ORDER_STATE_UNKNOWN
+
+    time.sleep(0.5)
+    fake_server.faults.configure(latency_ms=0)
+    order = fake_api.get_order(identifier=result['identifier'])
+    assert order['state'] == 'done'
+
+class UnknownOrderAPI:
+    """Exchange whose orders always time out, holding `coins` of the market"""
+    def __init__(self, coins, price=1000.0):
+        self.coins = coins
+        self.price = price
+
+    def get_balance(self, ticker="KRW"):
+        return 1_000_000.0 if ticker == "KRW" else self.coins
+
+    def get_current_price(self, market):
+        return self.price
+
+    def place_order(self, market, side, volume=None, price=None, ord_type="limit"):
+        return {'uuid': None, 'identifier': 'x', 'state': ORDER_STATE_UNKNOWN}
+
+def test_unknown_sell_keeps_position_still_held():
+    trader = Trader(api=UnknownOrderAPI(coins=10.0), market="KRW-TEST")
+    entry = dict(trader.position, entry_price=900.0)
+    trader.position = dict(entry)
+    trader.sell_market(reason="Stop Loss")
+    assert trader.position == entry
+
+def test_unknown_sell_drops_position_sold():
+    api = UnknownOrderAPI(coins=10.0)
+    trader = Trader(api=api, market="KRW-TEST")
+    api.coins = 0.0
+    trader.sell_market(reason="Stop Loss")
+    assert trader.position is None
+
+def test_unknown_buy_adopts_filled_position():
+    api = UnknownOrderAPI(coins=0.0)
+    trader = Trader(api=api, market="KRW-TEST")
+    api.coins = 500.0 # the order filled after all
+    trader.buy_market()
+    assert trader.position['quantity'] == 500.0
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from strategy.signal import SignalGenerator, ENTRY_RULES
+from utils.synthetic_data import generate_market
+
+END = pd.Timestamp("2025-01-15 09:00")
+
+def processed_frame(signal_gen, seed):
+    """A processed hourly frame, NaN warm-up rows included, with a few volatility spikes"""
+    df = generate_market(90 / 365, "minute60", seed, end=END)
+    # Widen a few candles' ranges so ATR jumps past the volatility threshold
+    spikes = df.index[200::400]
+    spread = df['close'] * 0.2
+    df.loc[spikes, 'high'] += spread[spikes]
+    df.loc[spikes, 'low'] -= spread[spikes] / 2
+    df = signal_gen.process(df)
+    assert df['atr_ratio'].isna().any() and df['vol_sma'].isna().any()
+    return df
+
+def row_wise(df, check):
+    return np.array([bool(check(row)) for _, row in df.iterrows()])
+
+@pytest.mark.parametrize("seed", [3, 11])
+@pytest.mark.parametrize("rsi_oversold", [30, 45])
+def test_masks_match_row_wise_checks(seed, rsi_oversold):
+    sg = SignalGenerator(rsi_oversold=rsi_oversold)
+    df = processed_frame(sg, seed)
+
+    volatility = sg.volatility_explosion_mask(df)
+    reversal = sg.buy_signal_mask(df)
+    trend = sg.trend_following_mask(df)
+    np.testing.assert_array_equal(volatility, row_wise(df, sg.check_volatility_explosion))
+    np.testing.assert_array_equal(reversal, row_wise(df, sg.check_buy_signal))
+    np.testing.assert_array_equal(trend, row_wise(df, sg.check_trend_following_buy_signal))
+    # Both sides of each comparison are exercised
+    for mask in (volatility, trend):
+        assert mask.any() and not mask.all()
+
+def test_entry_mask_matches_check_entry():
+    sg = SignalGenerator(rsi_oversold=45)
+    df = processed_frame(sg, 5)
+    for rule in ENTRY_RULES:
+        expected = row_wise(df, lambda row: sg.check_entry(row, rule))
+        np.testing.assert_array_equal(sg.entry_mask(df, rule), expected)
+        assert expected.any()
+
+def test_volatility_mask_without_atr_ratio():
+    sg = SignalGenerator()
+    df = generate_market(5 / 365, "minute60", 1, end=END)
+    np.testing.assert_array_equal(sg.volatility_explosion_mask(df), row_wise(df, sg.check_volatility_explosion))
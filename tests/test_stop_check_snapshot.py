@@ -0,0 +1,47 @@
+import datetime
+from data_fetcher.candle_feed import LiveCandleFeed
+from trade.live_loop import check_stops
+from trade.snapshot import load_snapshot
+from trade.trader import Trader
+from utils.synthetic_data import generate_market
+from utils.telegram_notifier import mute
+
+mute()
+
+class StopExchange:
+    """Ticker at `price`; market sells fill"""
+    def __init__(self, price):
+        self.price = price
+        self.coins = 1.0
+
+    def get_balance(self, ticker="KRW"):
+        return 1_000_000.0 if ticker == "KRW" else self.coins
+
+    def get_current_price(self, market):
+        return self.price
+
+    def place_order(self, market, side, volume=None, price=None, ord_type="limit"):
+        self.coins = 0.0
+        return {'uuid': 'sold', 'state': 'done'}
+
+def make(price, tmp_path):
+    api = StopExchange(price)
+    trader = Trader(api=api, market="KRW-TEST")
+    trader.position = {'quantity': 1.0, 'entry_price': 100_000.0, 'entry_time': datetime.datetime.now()}
+    feed = LiveCandleFeed(api, "KRW-TEST", "minute60")
+    feed.load(generate_market(10 / 365, "minute60", 3))
+    return api, trader, feed, str(tmp_path / "live.npz")
+
+def test_stop_sell_is_snapshotted(tmp_path):
+    api, trader, feed, path = make(price=90_000.0, tmp_path=tmp_path) # -10%: stop loss
+    check_stops(trader, api, feed=feed, snapshot_path=path)
+    assert trader.position is None
+    window, meta = load_snapshot(path, "KRW-TEST", "minute60", max_age_hours=1)
+    assert meta['trader']['position'] is None
+    assert len(window) == len(feed.buffer)
+
+def test_no_snapshot_without_position_change(tmp_path):
+    api, trader, feed, path = make(price=100_500.0, tmp_path=tmp_path)
+    check_stops(trader, api, feed=feed, snapshot_path=path)
+    assert trader.position is not None
+    assert load_snapshot(path, "KRW-TEST", "minute60", max_age_hours=1) is None
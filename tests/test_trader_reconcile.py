@@ -0,0 +1,46 @@
+from trade.trader import Trader
+
+POSITION = {'quantity': 2.0, 'entry_price': 10000.0, 'entry_time': '2025-01-15T09:00:00'}
+
+class BalanceAPI:
+    """Exchange holding `coins` of the market, counting calls"""
+    def __init__(self, coins, price=10000.0):
+        self.coins = coins
+        self.price = price
+        self.calls = []
+
+    def get_balance(self, ticker="KRW"):
+        self.calls.append('balance')
+        return 1_000_000.0 if ticker == "KRW" else self.coins
+
+    def get_current_price(self, market):
+        self.calls.append('ticker')
+        return self.price
+
+def restore(api, position=POSITION):
+    return Trader(state={'position': dict(position) if position else None}, api=api, market="KRW-TEST")
+
+def test_matching_position_kept_with_one_call():
+    api = BalanceAPI(coins=2.0)
+    trader = restore(api)
+    assert trader.position['quantity'] == 2.0
+    assert trader.position['entry_price'] == 10000.0
+    assert api.calls == ['balance']
+
+def test_position_sold_elsewhere_dropped():
+    trader = restore(BalanceAPI(coins=0.0))
+    assert trader.position is None
+
+def test_partial_sell_takes_exchange_quantity():
+    trader = restore(BalanceAPI(coins=1.5))
+    assert trader.position['quantity'] == 1.5
+    assert trader.position['entry_price'] == 10000.0
+
+def test_untracked_holding_adopted():
+    api = BalanceAPI(coins=3.0)
+    trader = restore(api, position=None)
+    assert trader.position['quantity'] == 3.0
+
+def test_dust_not_adopted():
+    trader = restore(BalanceAPI(coins=0.001), position=None)
+    assert trader.position is None
@@ -0,0 +1,18 @@
+import requests
+from conftest import FAKE_MARKET
+
+def test_fake_rejects_reused_nonce(fake_server, fake_api):
+    headers = fake_api._get_headers()
+    first = requests.get(f"{fake_server.url}/v1/accounts", headers=headers, timeout=5)
+    again = requests.get(f"{fake_server.url}/v1/accounts", headers=headers, timeout=5)
+    assert first.status_code == 200
+    assert again.status_code == 401
+    assert again.json()['error']['name'] == "nonce_used"
+
+def test_order_retried_after_429_with_fresh_token(fake_server, fake_api):
+    # One order per second: the second order right after the first gets a 429
+    fake_server.faults.configure(rate_limits={'order': 1})
+    assert fake_api.place_order(FAKE_MARKET, 'bid', price=10000, ord_type='price') is not None
+    # Re-sent after the back-off: needs a new nonce to succeed
+    assert fake_api.place_order(FAKE_MARKET, 'bid', price=10000, ord_type='price') is not None
+    assert fake_server.stats()['endpoints']['/v1/orders'] == {'201': 2, '429': 1}
@@ -0,0 +1,118 @@
+import os
+from config.logging_config import get_logger, log_event
+from config.settings import (
+    TARGET_COIN, TICKER_INTERVAL, SNAPSHOT_DIR,
+    SCHEDULE_OFFSET_SECONDS, STOP_CHECK_INTERVAL_SECONDS, STOP_CHECK_OFFSET_SECONDS
+)
+from trade.snapshot import save_snapshot, OHLCV_COLUMNS
+from utils.intervals import interval_to_timedelta
+from utils.telegram_notifier import send_message
+
+# The live bot's per-candle logic. Lives outside main.py (which configures
+# logging on import) so the replay harness can drive the same functions.
+
+logger = get_logger("LiveLoop")
+
+SNAPSHOT_PATH = os.path.join(SNAPSHOT_DIR, f"live_{TARGET_COIN}_{TICKER_INTERVAL}.npz")
+
+def run_trading_logic(trader, api, signal_gen, feed, snapshot_path=SNAPSHOT_PATH, shadow=None):
+    try:
+        logger.info("Running trading logic...")
+        
+        # 1. Fetch Data (only the candles after the last stored one)
+        feed.refresh(now=trader.clock())
+        candles = feed.buffer
+        
+        if len(candles) == 0:
+            logger.error("Failed to fetch data.")
+            return
+
+        # 2. Calculate Signals (indicators read the buffer's arrays in place)
+        indicators = signal_gen.compute_indicators(
+            candles.view('high'), candles.view('low'), candles.view('close'), candles.view('volume')
+        )
+        last_row = {name: values[-1] for name, values in indicators.items()}
+        last_row.update({column: candles.view(column)[-1] for column in OHLCV_COLUMNS})
+        last_row['datetime'] = candles.last_timestamp()
+        
+        current_price = last_row['close']
+        
+        # Log status
+        logger.info(f"Price: {current_price}, RSI: {last_row['rsi']:.2f}, MACD: {last_row['macd']:.2f}")
+
+        # 3. Monitor Existing Position (StopLoss/TakeProfit)
+        # This checks if we need to sell due to risk management
+        if trader.get_market_state():
+            trader.monitor_position(current_price)
+        
+        # 4. Check Buy Signal
+        # Only buy if not in position (and position wasn't just closed above)
+        if not trader.get_market_state():
+            buy_signal = signal_gen.check_buy_signal(last_row)
+            log_event(
+                "decision", market=trader.market, time=last_row['datetime'], price=current_price,
+                rsi=last_row['rsi'], macd=last_row['macd'], macd_signal=last_row['macd_signal'],
+                atr_ratio=last_row['atr_ratio'], buy_signal=buy_signal
+            )
+            if buy_signal:
+                logger.info("Buy Signal Detected!")
+                send_message(f"🚀 Buy Signal Detected!\nRSI: {last_row['rsi']:.2f}\nMACD: {last_row['macd']:.2f}")
+                trader.buy_market()
+            else:
+                logger.info("No Buy Signal.")
+
+        # 5. Shadow strategies (backtester/ensemble.py): virtual books only, never orders
+        if shadow is not None:
+            try:
+                shadow.step_live(candles, indicators, signal_gen.indicator_params(), market=trader.market)
+            except Exception as e:
+                logger.warning(f"Shadow strategies failed: {e}", exc_info=True)
+
+        # 6. Snapshot for fast warm start after a restart
+        if snapshot_path:
+            save_live_snapshot(trader, feed, snapshot_path)
+
+    except Exception as e:
+        logger.error(f"Error in trading logic: {e}", exc_info=True)
+        send_message(f"⚠️ Error in Bot: {e}")
+
+def save_live_snapshot(trader, feed, snapshot_path):
+    """Candle window and trader state, for a warm start after a restart"""
+    if len(feed.buffer) > 0:
+        save_snapshot(snapshot_path, trader.market, feed.interval, feed.buffer.to_frame(), trader.export_state())
+
+def check_stops(trader, api, feed=None, snapshot_path=None):
+    """
+    Intra-candle risk check: re-evaluate StopLoss/TakeProfit on the live ticker.
+    A stop that changes the position is snapshotted at once, so a restart
+    before the next candle does not restore the sold position.
+    """
+    try:
+        if not trader.get_market_state():
+            return
+        current_price = api.get_current_price(trader.market)
+        if current_price is not None:
+            before = trader.export_state()
+            trader.monitor_position(current_price)
+            if snapshot_path and feed is not None and trader.export_state() != before:
+                save_live_snapshot(trader, feed, snapshot_path)
+    except Exception as e:
+        logger.error(f"Error in stop check: {e}", exc_info=True)
+
+def schedule_jobs(scheduler, trader, api, signal_gen, feed, snapshot_path=SNAPSHOT_PATH,
+                  stop_check_interval=STOP_CHECK_INTERVAL_SECONDS, shadow=None):
+    """
+    Signals at each candle close + offset (e.g. 09:01 for the 08:00-09:00 candle),
+    plus frequent stop checks while in position. Missed signal runs are caught up once.
+    Shared by the live bot and the replay harness (backtester/replay.py).
+    """
+    scheduler.add_job(
+        "signals", interval_to_timedelta(feed.interval),
+        lambda candle_close: run_trading_logic(trader, api, signal_gen, feed, snapshot_path=snapshot_path, shadow=shadow),
+        offset=SCHEDULE_OFFSET_SECONDS, catch_up='latest'
+    )
+    scheduler.add_job(
+        "stop_check", stop_check_interval,
+        lambda candle_close: check_stops(trader, api, feed=feed, snapshot_path=snapshot_path),
+        offset=STOP_CHECK_OFFSET_SECONDS, catch_up='skip'
+    )
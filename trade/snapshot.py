@@ -0,0 +1,91 @@
+import datetime
+import io
+import json
+import os
+import numpy as np
+import pandas as pd
+from config.logging_config import get_logger
+
+logger = get_logger("Snapshot")
+
+SNAPSHOT_VERSION = 2 # 2: candles only (indicators are recomputed every cycle)
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+def save_snapshot(path, market, interval, df, trader_state):
+    """
+    Write the live bot's warm-start state: OHLCV candle window, position and
+    cooldown state. Indicators are not stored: every cycle recomputes them over
+    the whole window (after fetching the candles missed since the snapshot). Written to a temp file and renamed, so a crash
+    mid-write never leaves a torn snapshot behind.
+    """
+    meta = {
+        'version': SNAPSHOT_VERSION,
+        'market': market,
+        'interval': interval,
+        'saved_at': datetime.datetime.now().isoformat(),
+        'columns': OHLCV_COLUMNS,
+        'trader': trader_state,
+    }
+    arrays = {'datetime': df['datetime'].to_numpy(dtype='datetime64[ns]').view(np.int64)}
+    for col in meta['columns']:
+        arrays[col] = df[col].to_numpy(dtype=np.float64)
+
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, meta=np.array(json.dumps(meta, default=str)), **arrays)
+
+    snapshot_dir = os.path.dirname(path)
+    if snapshot_dir and not os.path.exists(snapshot_dir):
+        os.makedirs(snapshot_dir)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(buffer.getvalue())
+    os.replace(tmp_path, path)
+
+def load_snapshot(path, market, interval, max_age_hours):
+    """
+    Load and validate a snapshot. Returns (df, meta) or None when the snapshot
+    is missing, stale, for another market/interval or inconsistent.
+    """
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data['meta']))
+            arrays = {name: data[name] for name in data.files if name != 'meta'}
+    except Exception as e:
+        logger.warning(f"Unreadable snapshot {path}: {e}")
+        return None
+
+    problem = _validate(meta, arrays, market, interval, max_age_hours)
+    if problem:
+        logger.warning(f"Ignoring snapshot {path}: {problem}")
+        return None
+
+    df = pd.DataFrame({'datetime': arrays['datetime'].view('datetime64[ns]')})
+    for col in OHLCV_COLUMNS:
+        df[col] = arrays[col]
+    return df, meta
+
+def _validate(meta, arrays, market, interval, max_age_hours):
+    if meta.get('version') != SNAPSHOT_VERSION:
+        return f"version {meta.get('version')} != {SNAPSHOT_VERSION}"
+    if meta.get('market') != market or meta.get('interval') != interval:
+        return f"snapshot is for {meta.get('market')} {meta.get('interval')}"
+
+    age = datetime.datetime.now() - datetime.datetime.fromisoformat(meta['saved_at'])
+    if age > datetime.timedelta(hours=max_age_hours):
+        return f"too old ({age})"
+
+    missing = [c for c in ['datetime'] + meta['columns'] if c not in arrays]
+    if missing or not set(OHLCV_COLUMNS) <= set(meta['columns']):
+        return f"missing columns {missing}"
+
+    times = arrays['datetime']
+    if len(times) == 0 or np.any(np.diff(times) <= 0):
+        return "timestamps empty or not strictly increasing"
+    if any(len(arrays[c]) != len(times) for c in meta['columns']):
+        return "column length mismatch"
+    if not all(np.isfinite(arrays[c]).all() for c in OHLCV_COLUMNS):
+        return "non-finite OHLCV values"
+    return None
@@ -1,16 +1,21 @@
-from data_fetcher.upbit_api import UpbitAPI
-from config.settings import TARGET_COIN, TRADE_FEE_RATE, STOP_LOSS_PCT, TAKE_PROFIT_PCT, MAX_HOLD_DAYS, MIN_PROFIT_PCT, ATR_K, RISK_PER_TRADE_PCT, MAX_CONSECUTIVE_LOSSES, COOLDOWN_CANDLES
-from config.logging_config import get_logger
+from data_fetcher.upbit_api import UpbitAPI, ORDER_STATE_UNKNOWN
+from config.settings import TARGET_COIN, TICKER_INTERVAL, TRADE_FEE_RATE, STOP_LOSS_PCT, TAKE_PROFIT_PCT, MAX_HOLD_DAYS, MIN_PROFIT_PCT, ATR_K, RISK_PER_TRADE_PCT, MAX_CONSECUTIVE_LOSSES, COOLDOWN_CANDLES
+from config.logging_config import get_logger, log_event
 from utils.telegram_notifier import send_message
+from utils.intervals import interval_to_timedelta
 import datetime
 import math
 
 logger = get_logger("Trader")
 
+MIN_ORDER_KRW = 5000 # Upbit minimum order total; smaller holdings are dust, not a position
+
 class Trader:
-    def __init__(self):
-        self.api = UpbitAPI()
-        self.market = TARGET_COIN
+    def __init__(self, state=None, api=None, clock=None, market=TARGET_COIN):
+        # api/clock are injectable so the same code can run against a replay exchange and a simulated clock
+        self.api = api if api is not None else UpbitAPI()
+        self.clock = clock if clock is not None else datetime.datetime.now
+        self.market = market
         # We need to track entry info for proper StopLoss/TakeProfit
         # In a real bot, this should be persisted to a database or file.
         # For this implementation, we will try to infer from last order or keep in memory (reset on restart).
@@ -20,7 +25,61 @@ class Trader:
         self.consecutive_losses = 0
         self.cooldown_until = None # datetime object
         
-        self._sync_state()
+        if state is not None:
+            # Warm start from a validated snapshot, checked against the exchange balance
+            self.restore_state(state)
+            self.reconcile_position()
+        else:
+            self._sync_state()
+
+    def export_state(self):
+        """
+        JSON-serializable position and cooldown state (for warm-start snapshots)
+        """
+        position = None
+        if self.position:
+            position = dict(self.position)
+            position['entry_time'] = position['entry_time'].isoformat()
+        return {
+            'position': position,
+            'consecutive_losses': self.consecutive_losses,
+            'cooldown_until': self.cooldown_until.isoformat() if self.cooldown_until else None,
+        }
+
+    def restore_state(self, state):
+        position = state.get('position')
+        if position:
+            position = dict(position)
+            position['entry_time'] = datetime.datetime.fromisoformat(position['entry_time'])
+        self.position = position
+        self.consecutive_losses = state.get('consecutive_losses', 0)
+        cooldown_until = state.get('cooldown_until')
+        self.cooldown_until = datetime.datetime.fromisoformat(cooldown_until) if cooldown_until else None
+        logger.info(f"Restored state from snapshot: position={'yes' if self.position else 'no'}, losses={self.consecutive_losses}")
+
+    def reconcile_position(self):
+        """
+        Check a restored position against the coin balance (one get_balance call).
+        A manual sell, a missed fill or a crash between an order and the next
+        snapshot leaves the snapshot wrong: a position without coins is dropped,
+        a changed quantity is taken over, and coins without a position get a
+        full sync (balance and ticker).
+        """
+        coin_currency = self.market.split("-")[1]
+        balance = self.api.get_balance(coin_currency)
+        if self.position:
+            if balance * self.position['entry_price'] <= MIN_ORDER_KRW:
+                logger.warning(f"Snapshot position not held on the exchange ({balance} {coin_currency}). Dropping it.")
+                log_event("reconcile", market=self.market, snapshot_quantity=self.position['quantity'], balance=balance)
+                self.position = None
+            elif not math.isclose(balance, self.position['quantity'], rel_tol=1e-6):
+                logger.warning(f"Position quantity {self.position['quantity']} -> {balance} {coin_currency} (exchange balance)")
+                log_event("reconcile", market=self.market, snapshot_quantity=self.position['quantity'], balance=balance)
+                self.position['quantity'] = balance
+        elif balance > 0:
+            self._sync_state()
+            if self.position:
+                log_event("reconcile", market=self.market, snapshot_quantity=0.0, balance=balance)
 
     def _sync_state(self):
         """
@@ -42,7 +101,7 @@ class Trader:
             self.position = {
                 'quantity': balance,
                 'entry_price': current_price, # Placeholder, will update below
-                'entry_time': datetime.datetime.now() # Placeholder
+                'entry_time': self.clock() # Placeholder
             }
             logger.info(f"Detected existing holding: {balance} {coin_currency}")
         else:
@@ -63,15 +122,18 @@ class Trader:
         
         # Upbit 'price' order is Market Buy by Amount (total price in KRW)
         result = self.api.place_order(self.market, 'bid', price=math.floor(buy_amount), ord_type='price')
-        
+        if self._order_unknown(result, 'bid'):
+            return
+
         if result:
             logger.info(f"Buy Order Placed: {result}")
+            log_event("order", market=self.market, side="bid", amount=math.floor(buy_amount), uuid=result.get('uuid'))
             send_message(f"🔵 BUY Executed\nAmount: {math.floor(buy_amount)} KRW")
             # Update state (approximate, next loop will sync properly)
             self._sync_state()
             # Explicitly set entry time to now
             if self.position:
-                self.position['entry_time'] = datetime.datetime.now()
+                self.position['entry_time'] = self.clock()
                 # Entry price is not immediately available, usually inferred from order result or next ticker.
 
     def sell_market(self, reason="Signal"):
@@ -85,9 +147,12 @@ class Trader:
         
         # Upbit 'market' order is Market Sell by Volume
         result = self.api.place_order(self.market, 'ask', volume=volume, ord_type='market')
-        
+        if self._order_unknown(result, 'ask'):
+            return
+
         if result:
             logger.info(f"Sell Order Placed ({reason}): {result}")
+            log_event("order", market=self.market, side="ask", volume=volume, reason=reason, uuid=result.get('uuid'))
             send_message(f"🔴 SELL Executed\nReason: {reason}\nVolume: {volume}")
             self.position = None
             
@@ -97,12 +162,11 @@ class Trader:
                 logger.info(f"Consecutive Losses: {self.consecutive_losses}")
                 
                 if self.consecutive_losses >= MAX_CONSECUTIVE_LOSSES:
-                    # Activate Cooldown
-                    # Default interval is 60 minutes.
-                    cooldown_minutes = COOLDOWN_CANDLES * 60 
-                    self.cooldown_until = datetime.datetime.now() + datetime.timedelta(minutes=cooldown_minutes)
+                    # Activate Cooldown: COOLDOWN_CANDLES candles of the live interval
+                    self.cooldown_until = self.clock() + COOLDOWN_CANDLES * interval_to_timedelta(TICKER_INTERVAL)
                     stop_msg = f"⛔ Cooldown Activated: {self.consecutive_losses} Losses. Paused until {self.cooldown_until.strftime('%H:%M')}"
                     logger.warning(stop_msg)
+                    log_event("cooldown", market=self.market, losses=self.consecutive_losses, until=self.cooldown_until)
                     send_message(stop_msg)
                     # Reset counter after activation? Rules say ">= N -> Activate". Usually reset or keep logic.
                     # Let's reset to 0 after activation to restart cycle.
@@ -113,6 +177,25 @@ class Trader:
                     logger.info("Win or Exit -> Resetting Consecutive Losses")
                 self.consecutive_losses = 0
 
+    def _order_unknown(self, result, side):
+        """
+        An order whose request timed out may or may not have filled: take the
+        position from the exchange balance instead of assuming either.
+        Returns False for a known outcome.
+        """
+        if not result or result.get('state') != ORDER_STATE_UNKNOWN:
+            return False
+        logger.warning(f"{side} order outcome unknown. Syncing the position from the exchange balance.")
+        log_event("order_unknown", market=self.market, side=side, identifier=result.get('identifier'))
+        send_message(f"⚠️ Order outcome unknown ({side}). Position re-read from the exchange.")
+        held = self.position
+        self._sync_state()
+        if held and self.position:
+            self.position = held # not sold: keep the tracked entry
+        elif self.position:
+            self.position['entry_time'] = self.clock() # bought
+        return True
+
     def monitor_position(self, current_price):
         """
         Check StopLoss, TakeProfit, TimeLimit
@@ -131,10 +214,10 @@ class Trader:
         # Let's try to trust the in-memory state.
         
         entry_price = self.position.get('entry_price', current_price)
-        entry_time = self.position.get('entry_time', datetime.datetime.now())
+        entry_time = self.position.get('entry_time', self.clock())
         
         pnl_pct = (current_price - entry_price) / entry_price * 100
-        days_held = (datetime.datetime.now() - entry_time).total_seconds() / (24 * 3600)
+        days_held = (self.clock() - entry_time).total_seconds() / (24 * 3600)
 
         if pnl_pct <= -STOP_LOSS_PCT:
             self.sell_market(reason=f"Stop Loss ({pnl_pct:.2f}%)")
@@ -181,7 +264,7 @@ class Trader:
         """
         # Check Cooldown
         if self.cooldown_until:
-            if datetime.datetime.now() < self.cooldown_until:
+            if self.clock() < self.cooldown_until:
                 logger.info(f"Skipping signal due to Cooldown (Until {self.cooldown_until.strftime('%H:%M')})")
                 return
             else:
@@ -211,14 +294,20 @@ class Trader:
              buy_amount_krw = math.floor(krw_balance * (1 - TRADE_FEE_RATE))
 
         result = self.api.place_order(self.market, 'bid', price=buy_amount_krw, ord_type='price')
-        
+        if self._order_unknown(result, 'bid'):
+            if self.position:
+                self.position['atr'] = atr
+                self.position['highest_price'] = current_price
+            return
+
         if result:
             logger.info(f"Strategic Buy Order Placed: {result}")
+            log_event("order", market=self.market, side="bid", amount=buy_amount_krw, atr=atr, uuid=result.get('uuid'))
             send_message(f"🔵 STRATEGIC BUY Executed\nAmount: {buy_amount_krw} KRW\nATR: {atr}")
             
             self._sync_state()
             if self.position:
-                self.position['entry_time'] = datetime.datetime.now()
+                self.position['entry_time'] = self.clock()
                 self.position['atr'] = atr
                 self.position['highest_price'] = current_price # Initialize highest price for trailing stop
 
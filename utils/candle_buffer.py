@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+
+OHLCV_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+
+class CandleRingBuffer:
+    """
+    Fixed-capacity window of recent candles in preallocated arrays.
+    Every row is written twice (at i and i + capacity), so the live window is
+    always one contiguous slice and view() can hand out zero-copy views in
+    chronological order.
+    """
+    def __init__(self, capacity):
+        self.capacity = int(capacity)
+        self._times = np.zeros(2 * self.capacity, dtype=np.int64) # ns since epoch
+        self._data = np.zeros((len(OHLCV_COLUMNS), 2 * self.capacity))
+        self._col = {name: i for i, name in enumerate(OHLCV_COLUMNS)}
+        self._start = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def clear(self):
+        self._start = 0
+        self._size = 0
+
+    def _write(self, pos, ts, values):
+        pos %= self.capacity
+        for p in (pos, pos + self.capacity):
+            self._times[p] = ts
+            self._data[:, p] = values
+
+    def append(self, ts, open_, high, low, close, volume):
+        """
+        Append a candle. A candle with the same timestamp as the newest one
+        replaces it (the forming candle is refreshed in place).
+        """
+        ts = int(ts)
+        values = (open_, high, low, close, volume)
+        if self._size and ts == self._times[self._start + self._size - 1]:
+            self._write(self._start + self._size - 1, ts, values)
+        elif self._size and ts < self._times[self._start + self._size - 1]:
+            raise ValueError("Candles must be appended in time order (use truncate_from to rewrite the tail)")
+        elif self._size < self.capacity:
+            self._write(self._start + self._size, ts, values)
+            self._size += 1
+        else:
+            # Full: overwrite the oldest row and advance the window
+            self._write(self._start, ts, values)
+            self._start = (self._start + 1) % self.capacity
+
+    def extend(self, df):
+        """Append candles from an OHLCV DataFrame (sorted by datetime)"""
+        if df is None or df.empty:
+            return
+        times = df['datetime'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+        values = np.column_stack([df[c].to_numpy(dtype=np.float64) for c in OHLCV_COLUMNS])
+        last = self.last_timestamp_ns()
+        for ts, row in zip(times, values):
+            if last is not None and ts < last:
+                continue
+            self.append(ts, *row)
+
+    def truncate_from(self, ts):
+        """Drop every candle at or after `ts` (ns), e.g. before re-filling a gap"""
+        if not self._size:
+            return
+        keep = int(np.searchsorted(self.times_ns(), int(ts), side='left'))
+        self._size = keep
+
+    # --- Zero-copy views (chronological) ---
+    def times_ns(self):
+        return self._times[self._start:self._start + self._size]
+
+    def times(self):
+        return self.times_ns().view('datetime64[ns]')
+
+    def view(self, column):
+        return self._data[self._col[column], self._start:self._start + self._size]
+
+    def last_timestamp_ns(self):
+        if not self._size:
+            return None
+        return int(self._times[self._start + self._size - 1])
+
+    def last_timestamp(self):
+        ts = self.last_timestamp_ns()
+        return None if ts is None else pd.Timestamp(ts)
+
+    def gaps(self, interval_ns):
+        """Positions i where candle i+1 is more than one interval after candle i"""
+        return np.flatnonzero(np.diff(self.times_ns()) > interval_ns)
+
+    def to_frame(self):
+        """Copy of the window as an OHLCV DataFrame (for snapshots and reports)"""
+        df = pd.DataFrame({'datetime': self.times().copy()})
+        for column in OHLCV_COLUMNS:
+            df[column] = self.view(column).copy()
+        return df
@@ -0,0 +1,69 @@
+import pandas as pd
+from utils.data_loader import iter_data, save_data
+from utils.intervals import interval_minutes
+from config.settings import BASE_INTERVAL, ROLLUP_INTERVALS
+from config.logging_config import get_logger
+
+logger = get_logger("CandlePyramid")
+
+# Candle times are naive KST. Upbit's day candles open at 09:00 KST (00:00 UTC) and
+# its 4h candles at 01:00, 05:00, 09:00 ..., so rollup buckets are anchored there.
+DAY_OFFSET = pd.Timedelta(hours=9)
+
+# Store pyramid: the base interval is collected, coarser intervals are precomputed
+# rollups kept next to it (data/<market>/<interval>/...), so any timeframe loads
+# with load_data(..., interval=...) without resampling at query time.
+
+def rollup_targets(base_interval=BASE_INTERVAL, intervals=ROLLUP_INTERVALS):
+    """Intervals in `intervals` that can be built from base_interval (coarser, whole multiples, fitting a day)"""
+    base = interval_minutes(base_interval)
+    return [
+        interval for interval in intervals
+        if interval_minutes(interval) > base and interval_minutes(interval) % base == 0
+        and 1440 % interval_minutes(interval) == 0
+    ]
+
+def day_start(ts):
+    """Start of the (09:00 KST) day bucket containing ts; a boundary for every rollup interval"""
+    return (pd.Timestamp(ts) - DAY_OFFSET).floor('D') + DAY_OFFSET
+
+def rollup(df, interval):
+    """OHLCV candles aggregated to `interval`. Buckets without candles are omitted (as Upbit does)."""
+    bars = df.set_index('datetime').resample(
+        f"{interval_minutes(interval)}min", origin='epoch', offset=DAY_OFFSET, label='left', closed='left'
+    )
+    out = bars.agg({'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'})
+    return out.dropna(subset=['open']).reset_index()
+
+def update_rollups(market, start=None, data_dir="data", base_interval=BASE_INTERVAL, intervals=ROLLUP_INTERVALS):
+    """
+    Recompute every rollup bucket touched by base candles from `start` on (all
+    stored base candles if None) and merge them into the store. Only the days
+    containing new candles are re-read, one base partition at a time; the last,
+    possibly partial day of each partition is carried into the next one.
+    """
+    targets = rollup_targets(base_interval, intervals)
+    if not targets:
+        return []
+    start = day_start(start) if start is not None else None
+
+    carry = None
+    for chunk in iter_data(market, data_dir=data_dir, start=start, interval=base_interval):
+        if carry is not None:
+            chunk = pd.concat([carry, chunk], ignore_index=True)
+        for interval in targets:
+            save_data(market, rollup(chunk, interval), data_dir=data_dir, interval=interval)
+        carry = chunk[chunk['datetime'] >= day_start(chunk['datetime'].iloc[-1])]
+    return targets
+
+def save_candles(market, df, data_dir="data", interval=BASE_INTERVAL, rollups=ROLLUP_INTERVALS):
+    """
+    save_data() for base candles, then bring the coarser rollups up to date
+    with them. Returns the base partition directory.
+    """
+    pdir = save_data(market, df, data_dir=data_dir, interval=interval)
+    if rollups and not df.empty:
+        updated = update_rollups(market, df['datetime'].min(), data_dir, interval, rollups)
+        if updated:
+            logger.info(f"Updated {market} rollups: {', '.join(updated)}")
+    return pdir
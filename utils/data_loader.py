@@ -1,34 +1,195 @@
 import pandas as pd
+import json
 import os
 from config.logging_config import get_logger
 
 logger = get_logger("DataLoader")
 
-def load_data(market, days=None, data_dir="data"):
+DEFAULT_INTERVAL = "minute60"
+INDEX_FILE = "_index.json"
+HOT_PARTITIONS = 2 # Newest N monthly partitions stay uncompressed (they are still being appended to)
+
+# Store layout:
+#   data/<market>/<interval>/<YYYY-MM>.csv      hot partitions
+#   data/<market>/<interval>/<YYYY-MM>.csv.gz   cold partitions
+#   data/<market>/<interval>/_index.json        {partition: {file, start, end, rows}}
+# Legacy flat files (data/<market>.csv, hourly) are still readable.
+
+def partition_dir(market, interval=DEFAULT_INTERVAL, data_dir="data"):
+    return os.path.join(data_dir, market, interval)
+
+def read_index(market, interval=DEFAULT_INTERVAL, data_dir="data"):
+    path = os.path.join(partition_dir(market, interval, data_dir), INDEX_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def data_version(market, interval=DEFAULT_INTERVAL, data_dir="data"):
     """
-    Load data from local CSV file.
-    If days is specified, filter for the last N days.
+    Modification stamp of a market's stored candles (index file, or the legacy
+    flat file), None if nothing is stored. Changes whenever new candles are saved.
     """
-    file_path = os.path.join(data_dir, f"{market}.csv")
-    
-    if not os.path.exists(file_path):
-        logger.error(f"Data file not found: {file_path}. Please run collect_data.py first.")
-        return None
-        
+    paths = [os.path.join(partition_dir(market, interval, data_dir), INDEX_FILE)]
+    if interval == DEFAULT_INTERVAL:
+        paths.append(os.path.join(data_dir, f"{market}.csv"))
+    for path in paths:
+        if os.path.exists(path):
+            return os.stat(path).st_mtime_ns
+    return None
+
+def _write_index(pdir, index):
+    tmp_path = os.path.join(pdir, INDEX_FILE + ".tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(index, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, os.path.join(pdir, INDEX_FILE))
+
+def _read_partition(pdir, entry):
+    # round_trip: partitions are re-read and re-written on merges, so parsing must be lossless
+    return pd.read_csv(os.path.join(pdir, entry['file']), parse_dates=['datetime'], float_precision='round_trip')
+
+def select_partitions(index, start=None, end=None):
+    """Index entries (sorted by time) whose [start, end] range overlaps the requested bounds"""
+    selected = []
+    for name in sorted(index):
+        entry = index[name]
+        if start is not None and pd.Timestamp(entry['end']) < start:
+            continue
+        if end is not None and pd.Timestamp(entry['start']) > end:
+            continue
+        selected.append(entry)
+    return selected
+
+def load_data(market, days=None, data_dir="data", start=None, end=None, interval=DEFAULT_INTERVAL):
+    """
+    Load data from the local store.
+    If days is specified, filter for the last N days (relative to the newest candle).
+    start/end bound the range; only partitions overlapping it are read.
+    """
+    start = pd.Timestamp(start) if start is not None else None
+    end = pd.Timestamp(end) if end is not None else None
+    pdir = partition_dir(market, interval, data_dir)
+
     try:
-        df = pd.read_csv(file_path)
-        df['datetime'] = pd.to_datetime(df['datetime'])
+        index = read_index(market, interval, data_dir)
+        if not index:
+            return _load_legacy(market, days, data_dir, start, end, interval)
+
+        start = _days_start(index, days, start)
+        entries = select_partitions(index, start, end)
+        if not entries:
+            return pd.DataFrame(columns=['datetime', 'open', 'high', 'low', 'close', 'volume'])
+        df = pd.concat([_read_partition(pdir, entry) for entry in entries], ignore_index=True)
         df = df.sort_values('datetime').reset_index(drop=True)
-        
-        if days:
-            # Filter last N days based on timestamp
-            # We assume data ends roughly 'now', or just take last rows corresponding to days * 24?
-            # Better to filter by time difference from last date in file
-            last_date = df.iloc[-1]['datetime']
-            start_date = last_date - pd.Timedelta(days=days)
-            df = df[df['datetime'] > start_date].copy()
-            
-        return df
+        return _filter_range(df, start, end, exclusive_start=bool(days))
     except Exception as e:
         logger.error(f"Failed to load data for {market}: {e}")
         return None
+
+def _days_start(index, days, start):
+    if not days:
+        return start
+    # Filter last N days based on timestamp
+    # Newest candle comes from the index, so older partitions are never opened
+    last_date = max(pd.Timestamp(entry['end']) for entry in index.values())
+    days_start = last_date - pd.Timedelta(days=days)
+    return days_start if start is None else max(start, days_start)
+
+def iter_data(market, days=None, data_dir="data", start=None, end=None, interval=DEFAULT_INTERVAL, chunk_rows=None):
+    """
+    Yield the same candles as load_data() as a sequence of DataFrames, one
+    partition at a time (split further into chunk_rows pieces if given), so
+    long histories can be processed without holding them in memory.
+    """
+    start = pd.Timestamp(start) if start is not None else None
+    end = pd.Timestamp(end) if end is not None else None
+    index = read_index(market, interval, data_dir)
+    if not index:
+        # Legacy flat files are small (hourly); load once and slice
+        df = _load_legacy(market, days, data_dir, start, end, interval)
+        chunks = [df] if df is not None and not df.empty else []
+    else:
+        pdir = partition_dir(market, interval, data_dir)
+        start = _days_start(index, days, start)
+        chunks = (
+            _filter_range(_read_partition(pdir, entry), start, end, exclusive_start=bool(days))
+            for entry in select_partitions(index, start, end)
+        )
+
+    for chunk in chunks:
+        step = chunk_rows or len(chunk)
+        for i in range(0, len(chunk), max(step, 1)):
+            yield chunk.iloc[i:i + step].reset_index(drop=True)
+
+def _filter_range(df, start, end, exclusive_start=False):
+    mask = pd.Series(True, index=df.index)
+    if start is not None:
+        mask &= (df['datetime'] > start) if exclusive_start else (df['datetime'] >= start)
+    if end is not None:
+        mask &= df['datetime'] <= end
+    if mask.all():
+        return df
+    return df[mask].reset_index(drop=True)
+
+def _load_legacy(market, days, data_dir, start, end, interval):
+    file_path = os.path.join(data_dir, f"{market}.csv")
+
+    if interval != DEFAULT_INTERVAL or not os.path.exists(file_path):
+        logger.error(f"Data not found for {market} ({interval}) in {data_dir}. Please run collect_data.py first.")
+        return None
+
+    df = pd.read_csv(file_path)
+    df['datetime'] = pd.to_datetime(df['datetime'])
+    df = df.sort_values('datetime').reset_index(drop=True)
+
+    exclusive_start = False
+    if days:
+        last_date = df.iloc[-1]['datetime']
+        days_start = last_date - pd.Timedelta(days=days)
+        start = days_start if start is None else max(start, days_start)
+        exclusive_start = True
+    return _filter_range(df, start, end, exclusive_start=exclusive_start)
+
+def save_data(market, df, data_dir="data", interval=DEFAULT_INTERVAL):
+    """
+    Merge OHLCV data into the store, partitioned by month.
+    Existing rows with the same timestamp are replaced. Partitions older than
+    the newest HOT_PARTITIONS months are gzip-compressed.
+    """
+    pdir = partition_dir(market, interval, data_dir)
+    if not os.path.exists(pdir):
+        os.makedirs(pdir)
+    index = read_index(market, interval, data_dir)
+
+    df = df.sort_values('datetime')
+    months = df['datetime'].dt.strftime('%Y-%m')
+    for name, part in df.groupby(months, sort=True):
+        if name in index:
+            existing = _read_partition(pdir, index[name])
+            part = pd.concat([existing, part], ignore_index=True)
+            part = part.drop_duplicates('datetime', keep='last').sort_values('datetime')
+        index[name] = _write_partition(pdir, name, part, index.get(name), compressed=False)
+
+    # Re-tier: only the newest partitions stay hot
+    names = sorted(index)
+    for name in names[:-HOT_PARTITIONS]:
+        entry = index[name]
+        if not entry['file'].endswith('.gz'):
+            part = _read_partition(pdir, entry)
+            index[name] = _write_partition(pdir, name, part, entry, compressed=True)
+
+    _write_index(pdir, index)
+    return pdir
+
+def _write_partition(pdir, name, part, old_entry, compressed):
+    file_name = f"{name}.csv.gz" if compressed else f"{name}.csv"
+    compression = {'method': 'gzip', 'compresslevel': 1} if compressed else None
+    part.to_csv(os.path.join(pdir, file_name), index=False, compression=compression)
+    if old_entry and old_entry['file'] != file_name:
+        os.remove(os.path.join(pdir, old_entry['file']))
+    return {
+        'file': file_name,
+        'start': part['datetime'].iloc[0].isoformat(),
+        'end': part['datetime'].iloc[-1].isoformat(),
+        'rows': int(len(part)),
+    }
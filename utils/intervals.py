@@ -0,0 +1,27 @@
+import datetime
+
+# Upbit candle intervals with a fixed length, in minutes
+INTERVAL_MINUTES = {
+    "minute1": 1,
+    "minute3": 3,
+    "minute5": 5,
+    "minute10": 10,
+    "minute15": 15,
+    "minute30": 30,
+    "minute60": 60,
+    "minute240": 240,
+    "day": 1440,
+    "week": 10080,
+}
+
+def interval_minutes(interval):
+    try:
+        return INTERVAL_MINUTES[interval]
+    except KeyError:
+        raise ValueError(f"Unsupported interval: {interval} (choose from {', '.join(INTERVAL_MINUTES)})")
+
+def interval_to_timedelta(interval):
+    return datetime.timedelta(minutes=interval_minutes(interval))
+
+def bars_per_day(interval):
+    return 1440 / interval_minutes(interval)
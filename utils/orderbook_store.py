@@ -0,0 +1,94 @@
+import os
+import numpy as np
+import pandas as pd
+from config.logging_config import get_logger
+
+logger = get_logger("OrderbookStore")
+
+ORDERBOOK_INTERVAL = "orderbook"
+KST_OFFSET_MS = 9 * 3600 * 1000
+LEVEL_FIELDS = ('ask_price', 'ask_size', 'bid_price', 'bid_size')
+
+# Layout: data/<market>/orderbook/<YYYYMMDD-HHMMSS.mmm>.npz, one compressed part per flush,
+# named after its first snapshot (a _N suffix keeps same-millisecond parts apart). Each part holds
+#   time                   int64, ms since epoch of the naive KST time (same clock as the candle store)
+#   ask_price, bid_price   float64 (snapshots x levels), best level first
+#   ask_size, bid_size     float32 (snapshots x levels), 0 where the book was shallower
+
+def orderbook_dir(market, data_dir="data"):
+    return os.path.join(data_dir, market, ORDERBOOK_INTERVAL)
+
+def snapshots_to_arrays(snapshots):
+    """Raw /v1/orderbook entries of one market -> part arrays (levels padded to the deepest snapshot)"""
+    depth = max(len(s['orderbook_units']) for s in snapshots)
+    n = len(snapshots)
+    arrays = {
+        'time': np.array([s['timestamp'] + KST_OFFSET_MS for s in snapshots], dtype=np.int64),
+        'ask_price': np.zeros((n, depth)), 'bid_price': np.zeros((n, depth)),
+        'ask_size': np.zeros((n, depth), dtype=np.float32), 'bid_size': np.zeros((n, depth), dtype=np.float32),
+    }
+    for i, snapshot in enumerate(snapshots):
+        units = snapshot['orderbook_units']
+        for field in LEVEL_FIELDS:
+            arrays[field][i, :len(units)] = [unit[field] for unit in units]
+    return arrays
+
+def save_snapshots(market, arrays, data_dir="data"):
+    """Write one part file; returns its path"""
+    odir = orderbook_dir(market, data_dir)
+    os.makedirs(odir, exist_ok=True)
+    first = int(arrays['time'][0])
+    name = f"{pd.Timestamp(first, unit='ms'):%Y%m%d-%H%M%S}.{first % 1000:03d}"
+    path = os.path.join(odir, f"{name}.npz")
+    suffix = 0
+    while os.path.exists(path):
+        suffix += 1
+        path = os.path.join(odir, f"{name}_{suffix}.npz")
+    tmp_path = path + ".tmp.npz"
+    np.savez_compressed(tmp_path, **arrays)
+    os.replace(tmp_path, path)
+    return path
+
+def load_orderbook(market, data_dir="data", start=None, end=None):
+    """
+    Snapshots in [start, end] (naive KST) as one dict of arrays sorted by time,
+    or None if nothing is stored. Parts are selected by their file name (first
+    snapshot time), so only the overlapping ones are opened.
+    """
+    odir = orderbook_dir(market, data_dir)
+    if not os.path.isdir(odir):
+        return None
+    names = sorted(f for f in os.listdir(odir) if f.endswith('.npz') and '.tmp' not in f)
+    starts = [pd.to_datetime(f[:19], format='%Y%m%d-%H%M%S.%f') for f in names]
+
+    selected = []
+    for i, (name, part_start) in enumerate(zip(names, starts)):
+        next_start = starts[i + 1] if i + 1 < len(starts) else None
+        if end is not None and part_start > pd.Timestamp(end):
+            break
+        if start is not None and next_start is not None and next_start <= pd.Timestamp(start):
+            continue
+        selected.append(name)
+    if not selected:
+        return None
+
+    parts = []
+    for name in selected:
+        with np.load(os.path.join(odir, name)) as part:
+            parts.append({field: part[field] for field in ('time',) + LEVEL_FIELDS})
+    depth = max(p['ask_price'].shape[1] for p in parts)
+    book = {'time': np.concatenate([p['time'] for p in parts])}
+    for field in LEVEL_FIELDS:
+        # Parts may differ in depth; pad with empty levels
+        book[field] = np.concatenate([
+            np.pad(p[field], ((0, 0), (0, depth - p[field].shape[1]))) for p in parts
+        ])
+
+    order = np.argsort(book['time'], kind='stable')
+    mask = np.ones(len(order), dtype=bool)
+    times = book['time'][order]
+    if start is not None:
+        mask &= times >= pd.Timestamp(start).value // 1_000_000
+    if end is not None:
+        mask &= times <= pd.Timestamp(end).value // 1_000_000
+    return {field: values[order][mask] for field, values in book.items()}
@@ -0,0 +1,193 @@
+import os
+import io
+import sys
+import json
+import time
+import pstats
+import cProfile
+import datetime
+import tracemalloc
+import contextlib
+
+DEFAULT_PROFILE_DIR = os.path.join("results", "profiles")
+TOP_FUNCTIONS = 30
+TOP_ALLOCATIONS = 20
+
+# Stage timing for the CLIs' --profile option. Code marks its stages with
+#     with stage("indicators"):
+#         ...
+# which is a shared no-op context unless a profiling() block is active, so the
+# markers cost one global lookup and call when profiling is off.
+_NULL_STAGE = contextlib.nullcontext()
+_active = None
+
+def stage(name):
+    """Context manager timing `name` on the active profiler (no-op without one)"""
+    if _active is None:
+        return _NULL_STAGE
+    return _active.stage(name)
+
+def staged(name, iterable):
+    """Yield from iterable, timing each item's production as stage `name` (e.g. lazy chunk loading)"""
+    iterator = iter(iterable)
+    while True:
+        with stage(name):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+class _StageTimer:
+    __slots__ = ('stats', 'wall', 'cpu', 'on_exit')
+
+    def __init__(self, stats, on_exit=None):
+        self.stats = stats
+        self.on_exit = on_exit
+
+    def __enter__(self):
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+        return self
+
+    def __exit__(self, *exc):
+        self.stats[0] += 1
+        self.stats[1] += time.perf_counter() - self.wall
+        self.stats[2] += time.process_time() - self.cpu
+        if self.on_exit is not None:
+            self.on_exit()
+
+class StageProfiler:
+    """
+    Wall-clock and CPU time per named stage, with optional cProfile
+    (function level) and tracemalloc (allocation sites) on top.
+    """
+    def __init__(self, tool, functions=False, memory=False):
+        self.tool = tool
+        self.stages = {} # name -> [calls, wall, cpu]
+        self.profile = cProfile.Profile() if functions else None
+        self.memory = memory
+        self.started_at = None
+        self.snapshot = None
+        self.snapshot_memory = 0
+
+    def stage(self, name):
+        stats = self.stages.get(name)
+        if stats is None:
+            stats = self.stages[name] = [0, 0., 0.]
+        return _StageTimer(stats, self._check_memory if self.memory else None)
+
+    def _check_memory(self):
+        # Allocation sites are captured at the stage exit with the most memory
+        # in use, where the run's working set (frames, indicator columns) is still alive
+        current = tracemalloc.get_traced_memory()[0]
+        if current > self.snapshot_memory:
+            self.snapshot_memory = current
+            self.snapshot = tracemalloc.take_snapshot()
+
+    def start(self):
+        self.started_at = datetime.datetime.now()
+        if self.memory:
+            tracemalloc.start()
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+        if self.profile:
+            self.profile.enable()
+
+    def stop(self):
+        if self.profile:
+            self.profile.disable()
+        self.wall = time.perf_counter() - self.wall
+        self.cpu = time.process_time() - self.cpu
+        if self.memory:
+            self.peak_memory = tracemalloc.get_traced_memory()[1]
+            if self.snapshot is None:
+                self.snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+
+    def report(self, pstats_path=None):
+        """Machine-readable report (JSON-serializable dict)"""
+        stages = {
+            name: {'calls': calls, 'wall_s': wall, 'cpu_s': cpu, 'wall_pct': wall / self.wall * 100 if self.wall else 0.}
+            for name, (calls, wall, cpu) in self.stages.items()
+        }
+        report = {
+            'tool': self.tool,
+            'argv': sys.argv,
+            'started_at': self.started_at.isoformat(),
+            'wall_s': self.wall,
+            'cpu_s': self.cpu,
+            'stages': stages,
+            # Stages do not nest, so the rest is time outside any marked stage
+            'unstaged_wall_s': self.wall - sum(s['wall_s'] for s in stages.values()),
+        }
+        if self.profile:
+            stats = pstats.Stats(self.profile, stream=io.StringIO())
+            rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:TOP_FUNCTIONS]
+            report['functions'] = [
+                {'function': f"{path}:{line}({name})", 'calls': nc, 'tottime_s': tt, 'cumtime_s': ct}
+                for (path, line, name), (cc, nc, tt, ct, callers) in rows
+            ]
+            report['pstats_file'] = pstats_path
+        if self.memory:
+            top = self.snapshot.statistics('lineno')[:TOP_ALLOCATIONS]
+            report['memory'] = {
+                'peak_bytes': self.peak_memory,
+                'snapshot_bytes': self.snapshot_memory,
+                'top_allocations': [
+                    {'site': f"{s.traceback[0].filename}:{s.traceback[0].lineno}", 'bytes': s.size, 'blocks': s.count}
+                    for s in top
+                ],
+            }
+        return report
+
+    def print_summary(self, report):
+        overhead = " (cProfile/tracemalloc active: times are inflated)" if self.profile or self.memory else ""
+        print(f"\n--- Profile: {self.tool}, {report['wall_s']:.3f}s wall, {report['cpu_s']:.3f}s CPU{overhead} ---")
+        print(f"{'Stage':<14} {'Calls':>7} {'Wall(s)':>9} {'CPU(s)':>9} {'Wall%':>6}")
+        for name, s in sorted(report['stages'].items(), key=lambda item: -item[1]['wall_s']):
+            print(f"{name:<14} {s['calls']:>7} {s['wall_s']:>9.3f} {s['cpu_s']:>9.3f} {s['wall_pct']:>6.1f}")
+        print(f"{'(unstaged)':<14} {'':>7} {report['unstaged_wall_s']:>9.3f}")
+        for f in report.get('functions', [])[:10]:
+            print(f"  {f['cumtime_s']:8.3f}s cum  {f['tottime_s']:8.3f}s self  {f['calls']:>9}  {f['function']}")
+        if 'memory' in report:
+            print(f"Peak traced memory: {report['memory']['peak_bytes'] / 2**20:.1f} MiB; "
+                  f"largest allocation sites at {report['memory']['snapshot_bytes'] / 2**20:.1f} MiB in use:")
+            for a in report['memory']['top_allocations'][:5]:
+                print(f"  {a['bytes'] / 2**20:8.2f} MiB  {a['blocks']:>8} blocks  {a['site']}")
+
+def add_profile_arguments(parser):
+    parser.add_argument("--profile", action="store_true", help="Time the run's stages (load, indicators, simulate, report) and save a JSON report")
+    parser.add_argument("--profile-functions", action="store_true", help="Add a function-level cProfile to the profile, also saved as .pstats (implies --profile)")
+    parser.add_argument("--profile-memory", action="store_true", help="Add tracemalloc peak memory and top allocation sites to the profile (implies --profile)")
+    parser.add_argument("--profile-dir", type=str, default=DEFAULT_PROFILE_DIR, help=f"Where profile reports go (default: {DEFAULT_PROFILE_DIR})")
+
+@contextlib.contextmanager
+def profiling(tool, args):
+    """
+    Profile the enclosed run if args.profile (or one of the detail flags) is
+    set; writes <profile_dir>/<tool>_<time>.json and prints a summary.
+    """
+    global _active
+    if not (args.profile or args.profile_functions or args.profile_memory):
+        yield None
+        return
+    profiler = StageProfiler(tool, functions=args.profile_functions, memory=args.profile_memory)
+    _active = profiler
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        _active = None
+        os.makedirs(args.profile_dir, exist_ok=True)
+        base = os.path.join(args.profile_dir, f"{tool}_{profiler.started_at:%Y%m%d-%H%M%S}")
+        pstats_path = None
+        if profiler.profile:
+            pstats_path = base + ".pstats"
+            profiler.profile.dump_stats(pstats_path)
+        report = profiler.report(pstats_path)
+        with open(base + ".json", "w") as f:
+            json.dump(report, f, indent=2)
+        profiler.print_summary(report)
+        print(f"Profile report saved to {base}.json")
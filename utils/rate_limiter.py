@@ -0,0 +1,119 @@
+import os
+import struct
+import threading
+import time
+from config.settings import UPBIT_RATE_LIMITS, RATE_LIMIT_DIR, RATE_LIMIT_BULK_RESERVE
+from config.logging_config import get_logger
+
+try:
+    import fcntl
+except ImportError: # Windows: no flock, the budget is only shared within this process
+    fcntl = None
+
+logger = get_logger("RateLimiter")
+
+# Priority classes (lower goes first)
+PRIORITY_ORDER = 0 # order placement / account
+PRIORITY_LIVE = 1  # live bot market data
+PRIORITY_BULK = 2  # historical collection, ad-hoc scripts
+PRIORITIES = (PRIORITY_ORDER, PRIORITY_LIVE, PRIORITY_BULK)
+
+WAITER_TTL = 0.5 # seconds a blocked caller keeps lower priorities out without re-announcing itself
+
+# Bucket file: tokens, last refill time, then per priority the last time a caller had to wait
+_STATE = struct.Struct('<2d3d')
+
+class SharedRateLimiter:
+    """
+    Token bucket shared by every process on the host through a small state file
+    guarded by flock. Each acquire() takes the lock, refills the bucket from the
+    elapsed time, and either takes a token or records that its priority is
+    waiting and sleeps (outside the lock) until a token should be available.
+    A caller only takes a token if no higher priority waited within WAITER_TTL,
+    and bulk callers leave `bulk_reserve` tokens in the bucket, so orders and
+    live data are served first when the budget is tight.
+    """
+    def __init__(self, group, rate, burst, directory=RATE_LIMIT_DIR, bulk_reserve=RATE_LIMIT_BULK_RESERVE, scope=None):
+        self.group = group
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.bulk_reserve = min(float(bulk_reserve), self.burst - 1)
+        # scope: a separate budget (e.g. per API host), so traffic to a fake server never spends the real one
+        name = f"upbit_rate_{group}_{scope}.bin" if scope else f"upbit_rate_{group}.bin"
+        self.path = os.path.join(directory, name)
+        self._thread_lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o666)
+
+    def _locked(self, update):
+        """Run update(state) -> state under the host-wide lock; returns update's extra result"""
+        with self._thread_lock:
+            if fcntl:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                raw = os.pread(self._fd, _STATE.size, 0)
+                now = time.time()
+                if len(raw) == _STATE.size:
+                    state = list(_STATE.unpack(raw))
+                else:
+                    state = [self.burst, now, 0.0, 0.0, 0.0]
+                # Refill (a clock that went backwards refills nothing)
+                state[0] = min(self.burst, state[0] + max(now - state[1], 0.0) * self.rate)
+                state[1] = max(now, state[1])
+                result = update(state, now)
+                os.pwrite(self._fd, _STATE.pack(*state), 0)
+                return result
+            finally:
+                if fcntl:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def try_acquire(self, priority=PRIORITY_LIVE):
+        """Take a token if allowed now; otherwise return the suggested wait in seconds"""
+        def update(state, now):
+            tokens = state[0]
+            needed = 1.0 + (self.bulk_reserve if priority == PRIORITY_BULK else 0.0)
+            blocked = any(now - state[2 + p] < WAITER_TTL for p in PRIORITIES if p < priority)
+            if not blocked and tokens >= needed:
+                state[0] = tokens - 1.0
+                return 0.0
+            state[2 + priority] = now
+            if blocked:
+                return 1.0 / self.rate
+            return max((needed - tokens) / self.rate, 0.001)
+        return self._locked(update)
+
+    def acquire(self, priority=PRIORITY_LIVE, timeout=None):
+        """
+        Block until a token is taken. Returns seconds waited, or None if `timeout`
+        expired first.
+        """
+        started = time.monotonic()
+        while True:
+            wait = self.try_acquire(priority)
+            waited = time.monotonic() - started
+            if wait == 0.0:
+                return waited
+            if timeout is not None and waited + wait > timeout:
+                return None
+            time.sleep(wait)
+
+    def penalize(self, seconds=1.0):
+        """Empty the bucket and stop refilling for `seconds` (e.g. after a 429), for every process"""
+        def update(state, now):
+            state[0] = 0.0
+            state[1] = max(state[1], now + seconds)
+        self._locked(update)
+        logger.warning(f"Rate limit hit on '{self.group}'. All processes back off for {seconds:.1f}s.")
+
+    def tokens(self):
+        """Current token count (refilled to now)"""
+        return self._locked(lambda state, now: state[0])
+
+_limiters = {}
+
+def get_rate_limiter(group, scope=None):
+    """Process-wide limiter for an Upbit rate-limit group ('quotation' or 'exchange')"""
+    if (group, scope) not in _limiters:
+        rate, burst = UPBIT_RATE_LIMITS[group]
+        _limiters[group, scope] = SharedRateLimiter(group, rate, burst, scope=scope)
+    return _limiters[group, scope]
@@ -0,0 +1,149 @@
+import asyncio
+import datetime
+import math
+import time
+from config.logging_config import get_logger, log_event
+
+logger = get_logger("Scheduler")
+
+CATCH_UP_POLICIES = ('all', 'latest', 'skip')
+
+class ScheduledJob:
+    """
+    A function run once per candle close (+ offset).
+    catch_up decides what happens to candles whose run time passed while the
+    scheduler was busy: 'all' runs each one in order, 'latest' runs only the
+    most recent one, 'skip' drops them.
+    """
+    def __init__(self, name, interval, func, offset=0.0, catch_up='latest', deadline=None):
+        if catch_up not in CATCH_UP_POLICIES:
+            raise ValueError(f"catch_up must be one of {CATCH_UP_POLICIES}")
+        self.name = name
+        self.interval = float(interval)
+        self.func = func
+        self.offset = float(offset)
+        self.catch_up = catch_up
+        # A run must finish within `deadline` seconds of its due time (default: one interval)
+        self.deadline = float(deadline) if deadline is not None else self.interval
+
+        # Stats
+        self.runs = 0
+        self.late_runs = 0
+        self.missed_deadlines = 0
+        self.skipped = 0
+        self.last_lateness = 0.0
+        self.max_lateness = 0.0
+
+    def next_close(self, now):
+        """First candle close strictly after `now` (closes are aligned to the UTC epoch)"""
+        return (math.floor((now - self.offset) / self.interval) + 1) * self.interval
+
+    def stats(self):
+        return {
+            'runs': self.runs,
+            'late_runs': self.late_runs,
+            'missed_deadlines': self.missed_deadlines,
+            'skipped': self.skipped,
+            'last_lateness': self.last_lateness,
+            'max_lateness': self.max_lateness,
+        }
+
+class CandleScheduler:
+    """
+    Event-loop scheduler that sleeps exactly until each candle close + offset.
+    No polling: each job task computes its next due time and awaits it.
+    Jobs run one at a time (they share trader state) in a worker thread, so a
+    slow job never blocks the event loop's timing of other jobs.
+    clock/sleep are injectable (e.g. a simulated clock for replays).
+    """
+    def __init__(self, clock=time.time, sleep=asyncio.sleep, late_tolerance=1.0):
+        self.clock = clock
+        self.sleep = sleep
+        self.late_tolerance = late_tolerance
+        self.jobs = []
+        self._lock = None
+
+    def add_job(self, name, interval, func, offset=0.0, catch_up='latest', deadline=None):
+        """
+        interval/offset/deadline in seconds (or timedelta). func(candle_close) receives the
+        close time (local datetime) of the candle the run is for.
+        """
+        interval, offset = _seconds(interval), _seconds(offset)
+        deadline = _seconds(deadline) if deadline is not None else None
+        job = ScheduledJob(name, interval, func, offset=offset, catch_up=catch_up, deadline=deadline)
+        self.jobs.append(job)
+        return job
+
+    async def _sleep_until(self, due):
+        # Re-check after waking: sleeps can return slightly early
+        while True:
+            remaining = due - self.clock()
+            if remaining <= 0:
+                return
+            await self.sleep(remaining)
+
+    async def _execute(self, job, close):
+        due = close + job.offset
+        async with self._lock:
+            started = self.clock()
+            lateness = started - due
+            try:
+                await asyncio.to_thread(job.func, datetime.datetime.fromtimestamp(close))
+            except Exception as e:
+                logger.error(f"Job '{job.name}' failed: {e}", exc_info=True)
+            finished = self.clock()
+
+        deadline_met = finished <= due + job.deadline
+        job.runs += 1
+        job.last_lateness = lateness
+        job.max_lateness = max(job.max_lateness, lateness)
+        if lateness > self.late_tolerance:
+            job.late_runs += 1
+            logger.warning(f"Job '{job.name}' started {lateness:.2f}s late")
+        if not deadline_met:
+            job.missed_deadlines += 1
+            logger.warning(f"Job '{job.name}' missed its deadline ({finished - due:.2f}s > {job.deadline:.0f}s)")
+        log_event(
+            "schedule", job=job.name, candle=datetime.datetime.fromtimestamp(close),
+            lateness_ms=round(lateness * 1000, 1), duration_ms=round((finished - started) * 1000, 1),
+            deadline_met=deadline_met
+        )
+
+    async def _run_job(self, job):
+        close = job.next_close(self.clock())
+        while True:
+            await self._sleep_until(close + job.offset)
+            await self._execute(job, close)
+
+            # Candles whose due time passed while this run (or others) was executing
+            latest = job.next_close(self.clock()) - job.interval
+            missed = int(round((latest - close) / job.interval))
+            if missed > 0:
+                if job.catch_up == 'all':
+                    logger.warning(f"Job '{job.name}': catching up {missed} missed candles")
+                    for i in range(1, missed + 1):
+                        await self._execute(job, close + i * job.interval)
+                elif job.catch_up == 'latest':
+                    logger.warning(f"Job '{job.name}': {missed} candles passed during run, running latest only")
+                    job.skipped += missed - 1
+                    await self._execute(job, latest)
+                else:
+                    logger.warning(f"Job '{job.name}': skipping {missed} missed candles")
+                    job.skipped += missed
+                close = latest
+            close += job.interval
+
+    async def run(self):
+        self._lock = asyncio.Lock()
+        for job in self.jobs:
+            logger.info(f"Scheduled '{job.name}': every {job.interval:.0f}s at close +{job.offset:.0f}s "
+                        f"(next: {datetime.datetime.fromtimestamp(job.next_close(self.clock()) + job.offset)})")
+        await asyncio.gather(*(self._run_job(job) for job in self.jobs))
+
+    def run_forever(self):
+        asyncio.run(self.run())
+
+def _seconds(value):
+    if isinstance(value, datetime.timedelta):
+        return value.total_seconds()
+    return float(value)
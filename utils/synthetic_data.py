@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+from utils.intervals import interval_minutes, bars_per_day
+from config.settings import SYNTHETIC_DATA_END
+
+MINUTES_PER_YEAR = 365 * 1440
+
+# Volatility regimes: calm / normal / turbulent
+REGIME_VOL_MULTIPLIERS = np.array([0.6, 1.0, 2.5])
+REGIME_MEAN_DAYS = np.array([20.0, 30.0, 5.0])
+# Next-regime probabilities when a regime ends
+REGIME_TRANSITIONS = np.array([
+    [0.0, 0.8, 0.2],
+    [0.6, 0.0, 0.4],
+    [0.3, 0.7, 0.0],
+])
+
+def simulate_regimes(n, interval, rng):
+    """
+    Markov regime path with exponentially distributed regime lengths.
+    Loops per regime switch (a few hundred per market), not per bar.
+    """
+    regimes = np.empty(n, dtype=np.int8)
+    per_day = bars_per_day(interval)
+    pos = 0
+    state = rng.integers(len(REGIME_VOL_MULTIPLIERS))
+    while pos < n:
+        length = max(1, int(rng.exponential(REGIME_MEAN_DAYS[state] * per_day)))
+        regimes[pos:pos + length] = state
+        pos += length
+        state = rng.choice(len(REGIME_VOL_MULTIPLIERS), p=REGIME_TRANSITIONS[state])
+    return regimes
+
+def gbm_log_returns(n, interval, rng, annual_drift=0.05, annual_vol=0.8,
+                    jumps_per_year=12, jump_mean=-0.01, jump_std=0.05):
+    """
+    GBM log returns with regime-switching volatility and Poisson jumps.
+    Returns (log_returns, per-bar sigma).
+    """
+    dt = interval_minutes(interval) / MINUTES_PER_YEAR
+    regimes = simulate_regimes(n, interval, rng)
+    sigma = annual_vol * np.sqrt(dt) * REGIME_VOL_MULTIPLIERS[regimes]
+    log_returns = (annual_drift - 0.5 * annual_vol ** 2) * dt + sigma * rng.standard_normal(n)
+
+    n_jumps = rng.poisson(jumps_per_year * dt * n)
+    if n_jumps:
+        idx = rng.integers(0, n, n_jumps)
+        np.add.at(log_returns, idx, rng.normal(jump_mean, jump_std, n_jumps))
+    return log_returns, sigma
+
+def bootstrap_log_returns(n, source_returns, rng, block_size=24 * 7, scale=1.0):
+    """
+    Moving-block bootstrap of real log returns (keeps volatility clustering).
+    `scale` rescales returns when the source interval differs from the target.
+    """
+    source_returns = np.asarray(source_returns, dtype=np.float64)
+    source_returns = source_returns[np.isfinite(source_returns)]
+    block_size = max(1, min(block_size, len(source_returns) // 2))
+    n_blocks = -(-n // block_size)
+    starts = rng.integers(0, len(source_returns) - block_size + 1, n_blocks)
+    idx = (starts[:, None] + np.arange(block_size)).ravel()[:n]
+    log_returns = source_returns[idx] * scale
+
+    # Local volatility for wicks/volume: rolling std of the resampled path
+    sigma = pd.Series(log_returns).rolling(block_size, min_periods=1).std().bfill().to_numpy()
+    sigma = np.where(sigma > 0, sigma, np.std(log_returns) or 1e-4)
+    return log_returns, sigma
+
+def build_ohlcv(log_returns, sigma, start_price, end, interval, rng, base_volume):
+    """
+    Turn a log-return path into an OHLCV frame in the collector's format.
+    Open is the previous close; wicks and volume scale with local volatility.
+    """
+    n = len(log_returns)
+    close = start_price * np.exp(np.cumsum(log_returns))
+    open_ = np.empty(n)
+    open_[0] = start_price
+    open_[1:] = close[:-1]
+
+    high = np.maximum(open_, close) * np.exp(np.abs(rng.standard_normal(n)) * sigma * 0.5)
+    low = np.minimum(open_, close) * np.exp(-np.abs(rng.standard_normal(n)) * sigma * 0.5)
+
+    activity = 1 + 3 * np.abs(log_returns) / sigma.mean()
+    volume = base_volume * rng.lognormal(0.0, 0.5, n) * activity
+
+    freq = f"{interval_minutes(interval)}min"
+    end = pd.Timestamp(end).floor(freq)
+    return pd.DataFrame({
+        'datetime': pd.date_range(end=end, periods=n, freq=freq),
+        'open': open_,
+        'high': high,
+        'low': low,
+        'close': close,
+        'volume': volume,
+    })
+
+def generate_market(years, interval, seed, model="gbm", source_returns=None,
+                    source_interval="minute60", end=SYNTHETIC_DATA_END):
+    """
+    Generate one synthetic market. Per-market price level, drift and volatility
+    are drawn from the seed so every market looks different but is reproducible.
+    end: time of the newest candle; pass "now" for data that ends at the present.
+    """
+    rng = np.random.default_rng(seed)
+    n = int(years * 365 * bars_per_day(interval))
+
+    start_price = 10 ** rng.uniform(1, 8) # 10 KRW .. 100M KRW
+    annual_vol = rng.uniform(0.4, 1.2)
+    annual_drift = rng.normal(0.05, 0.3)
+    base_volume = 1e9 / start_price * interval_minutes(interval) / 60 * rng.lognormal(0.0, 1.0)
+
+    if model == "gbm":
+        log_returns, sigma = gbm_log_returns(n, interval, rng, annual_drift=annual_drift, annual_vol=annual_vol)
+    elif model == "bootstrap":
+        if source_returns is None or len(source_returns) < 2:
+            raise ValueError("bootstrap model requires source returns")
+        # sqrt-time scaling when resampling e.g. hourly returns into minute bars
+        scale = np.sqrt(interval_minutes(interval) / interval_minutes(source_interval))
+        block_size = int(bars_per_day(source_interval) * 7)
+        log_returns, sigma = bootstrap_log_returns(n, source_returns, rng, block_size=block_size, scale=scale)
+    else:
+        raise ValueError(f"Unknown model: {model}")
+
+    return build_ohlcv(log_returns, sigma, start_price, end, interval, rng, base_volume)
+
+def synthetic_market_names(count, prefix="SYN"):
+    width = max(4, len(str(count)))
+    return [f"KRW-{prefix}{i:0{width}d}" for i in range(1, count + 1)]
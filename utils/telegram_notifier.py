@@ -1,25 +1,203 @@
+import atexit
+import queue
+import threading
+import time
 import requests
-from config.settings import TELEGRAM_TOKEN, TELEGRAM_CHAT_ID, TELEGRAM_PREFIX
+from config.settings import (
+    TELEGRAM_TOKEN, TELEGRAM_CHAT_ID, TELEGRAM_PREFIX, TELEGRAM_API_URL,
+    TELEGRAM_QUEUE_SIZE, TELEGRAM_BATCH_WINDOW, TELEGRAM_MIN_INTERVAL, TELEGRAM_TIMEOUT
+)
 from config.logging_config import get_logger
 
 logger = get_logger("TelegramNotifier")
 
+MAX_MESSAGE_LENGTH = 4096 # Telegram limit per message
+MAX_RETRIES = 3
+
+class TelegramNotifier:
+    """
+    Background Telegram sender.
+    send() only enqueues, so callers (order handling, trading loop) never wait on the network.
+    A worker thread coalesces messages arriving within `batch_window` seconds into one post,
+    keeps at least `min_interval` seconds between posts and honors 429 retry_after.
+    """
+    def __init__(self, token, chat_id, prefix="", api_url=TELEGRAM_API_URL,
+                 queue_size=TELEGRAM_QUEUE_SIZE, batch_window=TELEGRAM_BATCH_WINDOW,
+                 min_interval=TELEGRAM_MIN_INTERVAL, timeout=TELEGRAM_TIMEOUT):
+        self.url = f"{api_url.rstrip('/')}/bot{token}/sendMessage"
+        self.chat_id = chat_id
+        self.prefix = prefix
+        self.batch_window = batch_window
+        self.min_interval = min_interval
+        self.timeout = timeout
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._session = requests.Session()
+        self._stop = threading.Event()
+        self._idle = threading.Condition()
+        self._pending = 0
+        self._last_post = 0.0
+        self._thread = None
+
+        self.sent_posts = 0
+        self.dropped = 0
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="TelegramNotifier", daemon=True)
+            self._thread.start()
+        return self
+
+    def send(self, message):
+        """
+        Enqueue a message without blocking. Returns False if the queue is full (message dropped).
+        """
+        with self._idle:
+            self._pending += 1
+        try:
+            self._queue.put_nowait(message)
+            return True
+        except queue.Full:
+            self._done(1)
+            self.dropped += 1
+            logger.warning("Telegram queue full. Dropping notification.")
+            return False
+
+    def flush(self, timeout=5.0):
+        """Wait until every queued message has been posted (or given up on)"""
+        deadline = time.monotonic() + timeout
+        with self._idle:
+            while self._pending > 0:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._idle.wait(remaining)
+        return True
+
+    def stop(self, timeout=5.0):
+        """Flush pending messages, then stop the worker"""
+        if self._thread is None:
+            return
+        self.flush(timeout)
+        self._stop.set()
+        self._thread.join(timeout=1.0)
+        self._thread = None
+
+    def _done(self, count):
+        with self._idle:
+            self._pending -= count
+            if self._pending <= 0:
+                self._idle.notify_all()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                first = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            # Coalesce whatever arrives within the batch window
+            batch = [first]
+            deadline = time.monotonic() + self.batch_window
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            try:
+                for text in self._split("\n\n".join(batch)):
+                    self._post(text)
+            except Exception as e:
+                logger.error(f"Failed to send telegram message: {e}")
+            finally:
+                self._done(len(batch))
+
+    def _split(self, text):
+        limit = MAX_MESSAGE_LENGTH - len(self.prefix) - 1
+        return [text[i:i + limit] for i in range(0, len(text), limit)] or [""]
+
+    def _post(self, text):
+        payload = {
+            'chat_id': self.chat_id,
+            'text': f"{self.prefix}\n{text}" if self.prefix else text
+        }
+        for attempt in range(MAX_RETRIES + 1):
+            # Rate limit: keep a minimum gap between posts
+            wait = self._last_post + self.min_interval - time.monotonic()
+            if wait > 0 and self._stop.wait(wait):
+                return
+            self._last_post = time.monotonic()
+
+            response = self._session.post(self.url, json=payload, timeout=self.timeout)
+            if response.status_code == 429:
+                retry_after = self._retry_after(response)
+                logger.warning(f"Telegram rate limited. Retrying after {retry_after}s")
+                if self._stop.wait(retry_after):
+                    return
+                continue
+            response.raise_for_status()
+            self.sent_posts += 1
+            return
+        logger.error("Telegram rate limit retries exhausted. Dropping notification.")
+
+    @staticmethod
+    def _retry_after(response):
+        try:
+            return float(response.json()['parameters']['retry_after'])
+        except Exception:
+            return float(response.headers.get('Retry-After', 1))
+
+_notifier = None
+_notifier_lock = threading.Lock()
+_muted = False
+
+def mute(muted=True):
+    """Silence send_message() (e.g. for replays of historical data)"""
+    global _muted
+    _muted = muted
+
+def use_notifier(notifier):
+    """
+    Route send_message() through `notifier` (e.g. one posting to a fake Telegram
+    API in a load test), even without TELEGRAM_* settings. Returns the previous one.
+    """
+    global _notifier
+    with _notifier_lock:
+        previous, _notifier = _notifier, notifier
+        return previous
+
+def get_notifier():
+    """Shared notifier, started on first use and flushed at interpreter exit"""
+    global _notifier
+    with _notifier_lock:
+        if _notifier is None:
+            _notifier = TelegramNotifier(TELEGRAM_TOKEN, TELEGRAM_CHAT_ID, prefix=TELEGRAM_PREFIX).start()
+            atexit.register(shutdown)
+        return _notifier
+
 def send_message(message):
     """
-    Send message to Telegram
+    Send message to Telegram (non-blocking; delivered by a background worker)
     """
-    if not TELEGRAM_TOKEN or not TELEGRAM_CHAT_ID:
+    if _muted:
+        return
+    if _notifier is None and (not TELEGRAM_TOKEN or not TELEGRAM_CHAT_ID):
         logger.warning("Telegram token or Chat ID not configured. Skipping notification.")
         return
 
-    url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage"
-    payload = {
-        'chat_id': TELEGRAM_CHAT_ID,
-        'text': f"{TELEGRAM_PREFIX}\n{message}"
-    }
-
-    try:
-        response = requests.post(url, json=payload)
-        response.raise_for_status()
-    except Exception as e:
-        logger.error(f"Failed to send telegram message: {e}")
+    get_notifier().send(message)
+
+def flush(timeout=5.0):
+    if _notifier is not None:
+        return _notifier.flush(timeout)
+    return True
+
+def shutdown(timeout=5.0):
+    """Deliver queued notifications and stop the worker (called at exit)"""
+    if _notifier is not None:
+        _notifier.stop(timeout)
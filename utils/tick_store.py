@@ -0,0 +1,261 @@
+import json
+import os
+import struct
+import zlib
+import numpy as np
+import pandas as pd
+from utils.intervals import interval_minutes
+from config.logging_config import get_logger
+
+logger = get_logger("TickStore")
+
+TICKS_DIR = "ticks"
+COVERAGE_FILE = "_coverage.json"
+KST_OFFSET_MS = 9 * 3600 * 1000
+SIDE_BID = 1   # buyer-initiated (taker bought)
+SIDE_ASK = -1  # seller-initiated
+VOLUME_SCALE = 10 ** 8 # Upbit volumes have 8 decimals
+MAX_PRICE_DECIMALS = 8
+TICK_COLUMNS = ['datetime', 'price', 'volume', 'side', 'sequential_id']
+
+# Layout: data/<market>/ticks/<YYYY-MM-DD>.ticks, one file per KST day, append-only.
+# Each append is a block: a header followed by a zlib-compressed payload of
+#   time deltas (int64 ms), sequence id deltas (int64), price deltas (int64, in
+#   10^-decimals units), volumes (int64, 1e-8 units), sides (int8)
+# with deltas taken from the block's first tick (ticks sorted by time, then id).
+# Times are naive KST ms, the clock of the candle store.
+# _coverage.json lists the sequence id ranges [low, high] that were paged through
+# without a hole; every trade with an id in a range is stored.
+_HEADER = struct.Struct('<4sIBIqqq') # magic, count, price decimals, payload bytes, first time/seq/price
+_MAGIC = b'TIK1'
+
+def ticks_dir(market, data_dir="data"):
+    return os.path.join(data_dir, market, TICKS_DIR)
+
+def _day_path(market, day, data_dir):
+    return os.path.join(ticks_dir(market, data_dir), f"{day}.ticks")
+
+def _price_decimals(prices):
+    """Fewest decimals (<= MAX_PRICE_DECIMALS) that represent every price exactly as an integer"""
+    for decimals in range(MAX_PRICE_DECIMALS + 1):
+        scaled = prices * 10 ** decimals
+        if np.all(np.abs(scaled - np.round(scaled)) < 1e-6):
+            return decimals
+    return MAX_PRICE_DECIMALS
+
+def _encode(times, seqs, prices, volumes, sides):
+    decimals = _price_decimals(prices)
+    scaled = np.round(prices * 10 ** decimals).astype(np.int64)
+    payload = zlib.compress(b''.join([
+        np.diff(times, prepend=times[0]).astype('<i8').tobytes(),
+        np.diff(seqs, prepend=seqs[0]).astype('<i8').tobytes(),
+        np.diff(scaled, prepend=scaled[0]).astype('<i8').tobytes(),
+        np.round(volumes * VOLUME_SCALE).astype('<i8').tobytes(),
+        sides.astype('<i1').tobytes(),
+    ]), 6)
+    header = _HEADER.pack(_MAGIC, len(times), decimals, len(payload), int(times[0]), int(seqs[0]), int(scaled[0]))
+    return header + payload
+
+def _decode(header, payload):
+    _, n, decimals, _, time0, seq0, price0 = header
+    raw = zlib.decompress(payload)
+    columns = [np.frombuffer(raw, dtype='<i8', count=n, offset=8 * n * k) for k in range(4)]
+    sides = np.frombuffer(raw, dtype='<i1', count=n, offset=32 * n)
+    return {
+        'time': time0 + np.cumsum(columns[0]),
+        'sequential_id': seq0 + np.cumsum(columns[1]),
+        'price': (price0 + np.cumsum(columns[2])) / 10 ** decimals,
+        'volume': columns[3] / VOLUME_SCALE,
+        'side': sides.astype(np.int8),
+    }
+
+def _read_blocks(path):
+    """Decoded blocks of a day file, and the byte length of its valid prefix"""
+    blocks, valid = [], 0
+    with open(path, 'rb') as f:
+        data = f.read()
+    while valid + _HEADER.size <= len(data):
+        header = _HEADER.unpack_from(data, valid)
+        end = valid + _HEADER.size + header[3]
+        if header[0] != _MAGIC or end > len(data):
+            break
+        blocks.append(_decode(header, data[valid + _HEADER.size:end]))
+        valid = end
+    if valid < len(data):
+        logger.warning(f"Ignoring {len(data) - valid} trailing bytes in {path} (interrupted append)")
+    return blocks, valid
+
+def _concat(blocks):
+    columns = {name: np.concatenate([b[name] for b in blocks]) for name in blocks[0]}
+    order = np.lexsort((columns['sequential_id'], columns['time']))
+    return {name: values[order] for name, values in columns.items()}
+
+def ticks_from_api(raw):
+    """Raw /v1/trades/ticks entries -> column arrays (naive KST ms times)"""
+    return {
+        'time': np.array([t['timestamp'] for t in raw], dtype=np.int64) + KST_OFFSET_MS,
+        'sequential_id': np.array([t['sequential_id'] for t in raw], dtype=np.int64),
+        'price': np.array([t['trade_price'] for t in raw], dtype=np.float64),
+        'volume': np.array([t['trade_volume'] for t in raw], dtype=np.float64),
+        'side': np.where(np.array([t['ask_bid'] for t in raw]) == 'BID', SIDE_BID, SIDE_ASK).astype(np.int8),
+    }
+
+def load_coverage(market, data_dir="data"):
+    """Sequence id ranges [low, high] known to be stored completely, sorted by low"""
+    path = os.path.join(ticks_dir(market, data_dir), COVERAGE_FILE)
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [tuple(r) for r in json.load(f)]
+
+def add_coverage(ranges, low, high):
+    """ranges with [low, high] merged in (overlapping ranges are joined)"""
+    merged = []
+    for r_low, r_high in sorted(list(ranges) + [(low, high)]):
+        if merged and r_low <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], r_high))
+        else:
+            merged.append((r_low, r_high))
+    return merged
+
+def save_coverage(market, ranges, data_dir="data"):
+    tdir = ticks_dir(market, data_dir)
+    os.makedirs(tdir, exist_ok=True)
+    tmp_path = os.path.join(tdir, COVERAGE_FILE + ".tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump([list(r) for r in ranges], f)
+    os.replace(tmp_path, os.path.join(tdir, COVERAGE_FILE))
+
+def covering_range(ranges, sequential_id):
+    """The coverage range containing sequential_id, None if it is not covered"""
+    for low, high in ranges:
+        if low <= sequential_id <= high:
+            return low, high
+    return None
+
+def known_sequence_ids(market, day, data_dir="data"):
+    path = _day_path(market, day, data_dir)
+    if not os.path.exists(path):
+        return np.empty(0, dtype=np.int64)
+    blocks, _ = _read_blocks(path)
+    return np.concatenate([b['sequential_id'] for b in blocks]) if blocks else np.empty(0, dtype=np.int64)
+
+def append_ticks(market, ticks, data_dir="data"):
+    """
+    Append ticks (column arrays as from ticks_from_api) to their day files,
+    skipping sequence ids that are already stored. Returns the number of new ticks.
+    """
+    if len(ticks['time']) == 0:
+        return 0
+    tdir = ticks_dir(market, data_dir)
+    os.makedirs(tdir, exist_ok=True)
+    days = (ticks['time'] // 86_400_000).astype('datetime64[D]').astype(str)
+    added = 0
+    for day in np.unique(days):
+        part = {name: values[days == day] for name, values in ticks.items()}
+        path = _day_path(market, day, data_dir)
+        if os.path.exists(path):
+            blocks, valid = _read_blocks(path)
+            if valid < os.path.getsize(path):
+                with open(path, 'r+b') as f: # drop an interrupted append before adding to the file
+                    f.truncate(valid)
+            known = np.concatenate([b['sequential_id'] for b in blocks]) if blocks else np.empty(0, dtype=np.int64)
+        else:
+            known = np.empty(0, dtype=np.int64)
+
+        _, first = np.unique(part['sequential_id'], return_index=True) # duplicates within the batch
+        keep = np.zeros(len(part['time']), dtype=bool)
+        keep[first] = True
+        keep &= ~np.isin(part['sequential_id'], known)
+        if not keep.any():
+            continue
+        part = {name: values[keep] for name, values in part.items()}
+        order = np.lexsort((part['sequential_id'], part['time']))
+        part = {name: values[order] for name, values in part.items()}
+        with open(path, 'ab') as f:
+            f.write(_encode(part['time'], part['sequential_id'], part['price'], part['volume'], part['side']))
+        added += int(keep.sum())
+    return added
+
+def _to_frame(columns):
+    return pd.DataFrame({
+        'datetime': columns['time'].astype('datetime64[ms]').astype('datetime64[ns]'),
+        'price': columns['price'],
+        'volume': columns['volume'],
+        'side': columns['side'],
+        'sequential_id': columns['sequential_id'],
+    })
+
+def iter_ticks(market, start=None, end=None, data_dir="data"):
+    """
+    Yield ticks in [start, end] (naive KST) one day at a time, as DataFrames
+    sorted by time (columns TICK_COLUMNS). Only the day files in range are read.
+    """
+    tdir = ticks_dir(market, data_dir)
+    if not os.path.isdir(tdir):
+        return
+    start = pd.Timestamp(start) if start is not None else None
+    end = pd.Timestamp(end) if end is not None else None
+    for name in sorted(f for f in os.listdir(tdir) if f.endswith('.ticks')):
+        day = pd.Timestamp(name[:-6])
+        if start is not None and day + pd.Timedelta(days=1) <= start:
+            continue
+        if end is not None and day > end:
+            break
+        blocks, _ = _read_blocks(os.path.join(tdir, name))
+        if not blocks:
+            continue
+        df = _to_frame(_concat(blocks))
+        if start is not None:
+            df = df[df['datetime'] >= start]
+        if end is not None:
+            df = df[df['datetime'] <= end]
+        if len(df):
+            yield df.reset_index(drop=True)
+
+def load_ticks(market, start=None, end=None, data_dir="data"):
+    chunks = list(iter_ticks(market, start, end, data_dir))
+    if not chunks:
+        return pd.DataFrame(columns=TICK_COLUMNS)
+    return pd.concat(chunks, ignore_index=True)
+
+# Candle buckets are anchored like the candle pyramid's (day and 4h at 09:00 KST)
+_BUCKET_ORIGIN_NS = 9 * 3600 * 10 ** 9
+
+def ticks_to_candles(ticks, interval):
+    """OHLCV candles of `interval` from ticks sorted by time (buckets without trades omitted)"""
+    if len(ticks) == 0:
+        return pd.DataFrame(columns=['datetime', 'open', 'high', 'low', 'close', 'volume'])
+    width = interval_minutes(interval) * 60 * 10 ** 9
+    times = ticks['datetime'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+    buckets = (times - _BUCKET_ORIGIN_NS) // width
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    price = ticks['price'].to_numpy(dtype=np.float64)
+    volume = ticks['volume'].to_numpy(dtype=np.float64)
+    ends = np.r_[starts[1:], len(price)] - 1
+    return pd.DataFrame({
+        'datetime': (buckets[starts] * width + _BUCKET_ORIGIN_NS).astype('datetime64[ns]'),
+        'open': price[starts],
+        'high': np.maximum.reduceat(price, starts),
+        'low': np.minimum.reduceat(price, starts),
+        'close': price[ends],
+        'volume': np.add.reduceat(volume, starts),
+    })
+
+def iter_tick_candles(market, interval, start=None, end=None, data_dir="data"):
+    """
+    Candles aggregated on the fly from stored ticks, one day of ticks at a time.
+    A bucket crossing midnight (4h, day) is completed with the next day's ticks
+    before it is yielded.
+    """
+    carry = None
+    for ticks in iter_ticks(market, start, end, data_dir):
+        if carry is not None:
+            ticks = pd.concat([carry, ticks], ignore_index=True)
+        candles = ticks_to_candles(ticks, interval)
+        last_bucket = candles['datetime'].iloc[-1]
+        carry = ticks[ticks['datetime'] >= last_bucket]
+        if len(candles) > 1:
+            yield candles.iloc[:-1].reset_index(drop=True)
+    if carry is not None and len(carry):
+        yield ticks_to_candles(carry, interval)